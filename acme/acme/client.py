@@ -5,6 +5,8 @@ import datetime
 from email.utils import parsedate_tz
 import heapq
 import logging
+from multiprocessing.pool import ThreadPool
+import threading
 import time
 
 import six
@@ -22,7 +24,7 @@ from acme import errors
 from acme import jws
 from acme import messages
 # pylint: disable=unused-import, no-name-in-module
-from acme.magic_typing import Dict, List, Set, Text
+from acme.magic_typing import Deque, Dict, List, Optional, Tuple
 
 
 logger = logging.getLogger(__name__)
@@ -40,6 +42,8 @@ if sys.version_info < (2, 7, 9):  # pragma: no cover
 
 DEFAULT_NETWORK_TIMEOUT = 45
 
+DEFAULT_AUTHZ_CONCURRENCY = 10
+
 DER_CONTENT_TYPE = 'application/pkix-cert'
 
 
@@ -561,16 +565,24 @@ class ClientV2(ClientBase):
 
     :ivar messages.Directory directory:
     :ivar .ClientNetwork net: Client network.
+    :ivar int authz_concurrency: Maximum number of authorizations
+        fetched at once.
     """
 
-    def __init__(self, directory, net):
+    def __init__(self, directory, net,
+                 authz_concurrency=DEFAULT_AUTHZ_CONCURRENCY):
         """Initialize.
 
         :param .messages.Directory directory: Directory Resource
         :param .ClientNetwork net: Client network.
+        :param int authz_concurrency: Maximum number of authorizations
+            fetched at once.
         """
         super(ClientV2, self).__init__(directory=directory,
             net=net, acme_version=2)
+        self.authz_concurrency = authz_concurrency
+        if hasattr(directory, 'newNonce'):
+            self.net.nonce_url = directory['newNonce']
 
     def new_account(self, new_account):
         """Register.
@@ -647,15 +659,36 @@ class ClientV2(ClientBase):
         order = messages.NewOrder(identifiers=identifiers)
         response = self._post(self.directory['newOrder'], order)
         body = messages.Order.from_json(response.json())
-        authorizations = []
-        for url in body.authorizations:
-            authorizations.append(self._authzr_from_response(self.net.get(url), uri=url))
         return messages.OrderResource(
             body=body,
             uri=response.headers.get('Location'),
-            authorizations=authorizations,
+            authorizations=self._get_authzrs(body.authorizations),
             csr_pem=csr_pem)
 
+    def _get_authzrs(self, urls):
+        """Fetch authorizations concurrently.
+
+        At most `authz_concurrency` requests are in flight at once.
+
+        :param list urls: URLs of the authorizations to fetch
+
+        :returns: `.AuthorizationResource` objects in the order of urls
+        :rtype: list
+
+        """
+        def _get_authzr(url):
+            return self._authzr_from_response(self.net.get(url), uri=url)
+
+        workers = min(len(urls), self.authz_concurrency)
+        if workers <= 1:
+            return [_get_authzr(url) for url in urls]
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(_get_authzr, urls)
+        finally:
+            pool.close()
+            pool.join()
+
     def poll_and_finalize(self, orderr, deadline=None):
         """Poll authorizations and finalize the order.
 
@@ -674,19 +707,71 @@ class ClientV2(ClientBase):
         orderr = self.poll_authorizations(orderr, deadline)
         return self.finalize_order(orderr, deadline)
 
-    def poll_authorizations(self, orderr, deadline):
-        """Poll Order Resource for status."""
-        responses = []
-        for url in orderr.body.authorizations:
-            while datetime.datetime.now() < deadline:
-                authzr = self._authzr_from_response(self.net.get(url), uri=url)
+    def poll_authorizations(self, orderr, deadline, mintime=1, maxtime=10):
+        """Poll Order Resource for status.
+
+        All pending authorizations are polled in every round, so the time
+        spent here is roughly that of the slowest validation rather than
+        the sum of all of them. A pending authorization is polled again
+        at the time given by the ``Retry-After`` header of its last
+        response, but no sooner than ``mintime`` seconds later. Without that
+        header, the delay starts at ``mintime`` seconds and doubles after
+        every poll, up to ``maxtime`` seconds.
+
+        :param messages.OrderResource orderr: order whose authorizations
+            should be polled
+        :param datetime.datetime deadline: when to stop polling and timeout
+        :param int mintime: minimum delay between polls of an
+            authorization, and initial delay if ``Retry-After`` is not
+            present
+        :param int maxtime: maximum delay between polls of an
+            authorization, used if ``Retry-After`` is not present
+
+        :returns: order with updated authorizations
+        :rtype: messages.OrderResource
+
+        :raises .TimeoutError: if some authorization is still pending
+            when the deadline is reached
+        :raises .ValidationError: if some authorization failed
+
+        """
+        urls = orderr.body.authorizations
+        responses = [None] * len(urls)  # type: List[messages.AuthorizationResource]
+        delays = [mintime] * len(urls)
+        next_poll = [datetime.datetime.now()] * len(urls)
+        pending = list(range(len(urls)))
+
+        now = datetime.datetime.now()
+        while pending and now < deadline:
+            still_pending = []
+            for index in pending:
+                if next_poll[index] > now:
+                    still_pending.append(index)
+                    continue
+                response = self.net.get(urls[index])
+                authzr = self._authzr_from_response(response, uri=urls[index])
                 if authzr.body.status != messages.STATUS_PENDING:
-                    responses.append(authzr)
-                    break
-                time.sleep(1)
-        # If we didn't get a response for every authorization, we fell through
-        # the bottom of the loop due to hitting the deadline.
-        if len(responses) < len(orderr.body.authorizations):
+                    responses[index] = authzr
+                else:
+                    still_pending.append(index)
+                    # Retry-After may be 0, negative or in the past
+                    next_poll[index] = max(
+                        self.retry_after(response, default=delays[index]),
+                        datetime.datetime.now() + datetime.timedelta(seconds=mintime))
+                    delays[index] = min(2 * delays[index], maxtime)
+            pending = still_pending
+            if pending:
+                wake_up = min(deadline, min(next_poll[index] for index in pending))
+                now = datetime.datetime.now()
+                if wake_up > now:
+                    seconds = (wake_up - now).total_seconds()
+                    logger.debug('Waiting %.1f seconds for %d pending '
+                                 'authorization(s)', seconds, len(pending))
+                    time.sleep(seconds)
+                now = datetime.datetime.now()
+        # If some authorization is still pending, we fell through the
+        # bottom of the loop due to hitting the deadline.
+        if pending:
             raise errors.TimeoutError()
         failed = []
         for authzr in responses:
@@ -888,6 +973,10 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
     JOSE_CONTENT_TYPE = 'application/jose+json'
     JSON_ERROR_CONTENT_TYPE = 'application/problem+json'
     REPLAY_NONCE_HEADER = 'Replay-Nonce'
+    # Servers eventually forget the nonces they have handed out, so
+    # pooled nonces older than this (in seconds) are discarded unused.
+    NONCE_MAX_AGE = 60
+    MAX_POOLED_NONCES = 32
 
     """Initialize.
 
@@ -901,23 +990,41 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
     :param float timeout: Timeout for requests.
     :param source_address: Optional source address to bind to when making requests.
     :type source_address: str or tuple(str, int)
+    :param int nonce_pool_size: Number of nonces to keep in stock by
+        prefetching them in the background from `nonce_url`. 0 disables
+        prefetching.
+    :param int pool_maxsize: Maximum number of connections per host kept
+        open for reuse. Raise it when sharing one instance between many
+        threads.
+    :param bool compact: Whether to serialize JWS without whitespace.
+        If ``False``, JWS and their payloads are pretty-printed.
     """
     def __init__(self, key, account=None, alg=jose.RS256, verify_ssl=True,
                  user_agent='acme-python', timeout=DEFAULT_NETWORK_TIMEOUT,
-                 source_address=None):
+                 source_address=None, nonce_pool_size=2,
+                 pool_maxsize=requests.adapters.DEFAULT_POOLSIZE, compact=True):
         # pylint: disable=too-many-arguments
         self.key = key
+        self.compact = compact
         self.account = account
         self.alg = alg
         self.verify_ssl = verify_ssl
-        self._nonces = set() # type: Set[Text]
+        # URL of the ACMEv2 newNonce resource, set by ClientV2. When
+        # unset, nonces are requested from the URL being POSTed to.
+        self.nonce_url = None  # type: Optional[str]
+        self._nonces = collections.deque(
+            maxlen=self.MAX_POOLED_NONCES)  # type: Deque[Tuple[bytes, float]]
+        self._nonce_lock = threading.Lock()
+        self._nonce_pool_size = nonce_pool_size
+        self._prefetching = False
         self.user_agent = user_agent
         self.session = requests.Session()
         self._default_timeout = timeout
-        adapter = HTTPAdapter()
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
 
         if source_address is not None:
-            adapter = SourceAddressAdapter(source_address)
+            adapter = SourceAddressAdapter(source_address,
+                                           pool_maxsize=pool_maxsize)
 
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
@@ -941,7 +1048,8 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
         :rtype: `josepy.JWS`
 
         """
-        jobj = obj.json_dumps(indent=2).encode()
+        dumps_kwargs = self._json_dumps_kwargs()
+        jobj = obj.json_dumps(**dumps_kwargs).encode()
         logger.debug('JWS payload:\n%s', jobj)
         kwargs = {
             "alg": self.alg,
@@ -955,7 +1063,12 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
                 kwargs["kid"] = self.account["uri"]
         kwargs["key"] = self.key
         # pylint: disable=star-args
-        return jws.JWS.sign(jobj, **kwargs).json_dumps(indent=2)
+        return jws.JWS.sign(jobj, **kwargs).json_dumps(**dumps_kwargs)
+
+    def _json_dumps_kwargs(self):
+        if self.compact:
+            return {'separators': (',', ':')}
+        return {'indent': 2}
 
     @classmethod
     def _check_response(cls, response, content_type=None):
@@ -1066,17 +1179,20 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
                 host, path, _err_no, err_msg = m.groups()
                 raise ValueError("Requesting {0}{1}:{2}".format(host, path, err_msg))
 
-        # If content is DER, log the base64 of it instead of raw bytes, to keep
-        # binary data out of the logs.
-        if response.headers.get("Content-Type") == DER_CONTENT_TYPE:
-            debug_content = base64.b64encode(response.content)
-        else:
-            debug_content = response.content.decode("utf-8")
-        logger.debug('Received response:\nHTTP %d\n%s\n\n%s',
-                     response.status_code,
-                     "\n".join(["{0}: {1}".format(k, v)
-                                for k, v in response.headers.items()]),
-                     debug_content)
+        # Formatting the response is costly for large bodies, so only do
+        # it if someone is listening.
+        if logger.isEnabledFor(logging.DEBUG):
+            # If content is DER, log the base64 of it instead of raw bytes, to keep
+            # binary data out of the logs.
+            if response.headers.get("Content-Type") == DER_CONTENT_TYPE:
+                debug_content = base64.b64encode(response.content)
+            else:
+                debug_content = response.content.decode("utf-8")
+            logger.debug('Received response:\nHTTP %d\n%s\n\n%s',
+                         response.status_code,
+                         "\n".join(["{0}: {1}".format(k, v)
+                                    for k, v in response.headers.items()]),
+                         debug_content)
         return response
 
     def head(self, *args, **kwargs):
@@ -1091,8 +1207,9 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
 
     def get(self, url, content_type=JSON_CONTENT_TYPE, **kwargs):
         """Send GET request and check response."""
-        return self._check_response(
-            self._send_request('GET', url, **kwargs), content_type=content_type)
+        response = self._send_request('GET', url, **kwargs)
+        self._harvest_nonce(response)
+        return self._check_response(response, content_type=content_type)
 
     def _add_nonce(self, response):
         if self.REPLAY_NONCE_HEADER in response.headers:
@@ -1102,15 +1219,78 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
             except jose.DeserializationError as error:
                 raise errors.BadNonce(nonce, error)
             logger.debug('Storing nonce: %s', nonce)
-            self._nonces.add(decoded_nonce)
+            with self._nonce_lock:
+                self._nonces.append((decoded_nonce, time.time()))
         else:
             raise errors.MissingNonce(response)
 
+    def _harvest_nonce(self, response):
+        """Store the nonce of a response that is not required to have one.
+
+        :returns: Whether a usable nonce was stored.
+        :rtype: bool
+
+        """
+        if self.REPLAY_NONCE_HEADER not in response.headers:
+            return False
+        try:
+            self._add_nonce(response)
+        except errors.BadNonce as error:
+            logger.debug('Ignoring unusable nonce: %s', error)
+            return False
+        return True
+
+    def _pop_nonce(self):
+        """Take the freshest pooled nonce, discarding stale ones.
+
+        :returns: Decoded nonce, or ``None`` if the pool is empty.
+
+        """
+        oldest = time.time() - self.NONCE_MAX_AGE
+        with self._nonce_lock:
+            while self._nonces and self._nonces[0][1] < oldest:
+                self._nonces.popleft()
+            if self._nonces:
+                return self._nonces.pop()[0]
+        return None
+
     def _get_nonce(self, url):
-        if not self._nonces:
+        nonce = self._pop_nonce()
+        while nonce is None:
             logger.debug('Requesting fresh nonce')
-            self._add_nonce(self.head(url))
-        return self._nonces.pop()
+            self._add_nonce(self.head(self.nonce_url or url))
+            nonce = self._pop_nonce()
+        self._prefetch_nonces()
+        return nonce
+
+    def _prefetch_nonces(self):
+        """Refill the nonce pool in the background if it is running low."""
+        if self.nonce_url is None or not self._nonce_pool_size:
+            return
+        with self._nonce_lock:
+            if self._prefetching or len(self._nonces) >= self._nonce_pool_size:
+                return
+            self._prefetching = True
+        thread = threading.Thread(target=self._refill_nonces)
+        thread.daemon = True
+        thread.start()
+
+    def _refill_nonces(self):
+        """Fetch nonces from `nonce_url` until the pool is stocked."""
+        try:
+            while True:
+                with self._nonce_lock:
+                    if len(self._nonces) >= self._nonce_pool_size:
+                        break
+                if not self._harvest_nonce(self.head(self.nonce_url)):
+                    break
+        except Exception as error:  # pylint: disable=broad-except
+            # Prefetching is an optimization; _get_nonce will fetch a
+            # nonce itself (and surface any error) when it needs one.
+            logger.debug('Failed to prefetch nonces: %s', error)
+        finally:
+            with self._nonce_lock:
+                self._prefetching = False
 
     def post(self, *args, **kwargs):
         """POST object wrapped in `.JWS` and check response.
@@ -2,6 +2,7 @@
 import copy
 import datetime
 import json
+from multiprocessing.pool import ThreadPool
 import unittest
 
 from six.moves import http_client  # pylint: disable=import-error
@@ -705,6 +706,9 @@ class ClientV2Test(ClientTestBase):
             uri='https://www.letsencrypt-demo.org/acme/acct/1/order/1',
             authorizations=[self.authzr, self.authzr2], csr_pem=CSR_SAN_PEM)
 
+    def test_init_nonce_url(self):
+        self.assertEqual(DIRECTORY_V2['newNonce'], self.net.nonce_url)
+
     def test_new_account(self):
         self.response.status_code = http_client.CREATED
         self.response.json.return_value = self.regr.body.to_json()
@@ -730,10 +734,35 @@ class ClientV2Test(ClientTestBase):
         authz_response2 = self.response
         authz_response2.json.return_value = self.authz2.to_json()
         authz_response2.headers['Location'] = self.authzr2.uri
-        self.net.get.side_effect = (authz_response, authz_response2)
+        # authorizations are fetched concurrently, so answer by URL
+        # rather than by call order
+        responses = {self.authzr.uri: authz_response,
+                     self.authzr2.uri: authz_response2}
+        self.net.get.side_effect = responses.get
 
         self.assertEqual(self.client.new_order(CSR_SAN_PEM), self.orderr)
 
+    @mock.patch('acme.client.ThreadPool')
+    def test_new_order_authz_concurrency(self, mock_pool):
+        self.client.authz_concurrency = 1
+        self.test_new_order()
+        self.assertFalse(mock_pool.called)
+        self.assertEqual(
+            [self.authzr.uri, self.authzr2.uri],
+            [call[0][0] for call in self.net.get.call_args_list])
+
+    def test_get_authzrs_preserves_order(self):
+        urls = ['https://www.letsencrypt-demo.org/acme/authz/{0}'.format(i)
+                for i in range(25)]
+        self.client.authz_concurrency = 4
+        self.response.json.return_value = self.authz.to_json()
+        with mock.patch('acme.client.ThreadPool', wraps=ThreadPool) as mock_pool:
+            # pylint: disable=protected-access
+            authzrs = self.client._get_authzrs(urls)
+        mock_pool.assert_called_once_with(4)
+        self.assertEqual(urls, [authzr.uri for authzr in authzrs])
+        self.assertEqual(len(urls), self.net.get.call_count)
+
     @mock.patch('acme.client.datetime')
     def test_poll_and_finalize(self, mock_datetime):
         mock_datetime.datetime.now.return_value = datetime.datetime(2018, 2, 15)
@@ -747,17 +776,31 @@ class ClientV2Test(ClientTestBase):
         self.client.poll_authorizations.assert_called_once_with(self.orderr, expected_deadline)
         self.client.finalize_order.assert_called_once_with(self.orderr, expected_deadline)
 
-    @mock.patch('acme.client.datetime')
-    def test_poll_authorizations_timeout(self, mock_datetime):
-        now_side_effect = [datetime.datetime(2018, 2, 15),
-                           datetime.datetime(2018, 2, 16),
-                           datetime.datetime(2018, 2, 17)]
-        mock_datetime.datetime.now.side_effect = now_side_effect
-        self.response.json.side_effect = [
-            self.authz.to_json(), self.authz2.to_json(), self.authz2.to_json()]
+    def _fake_clock(self):
+        """Make time.sleep advance datetime.datetime.now in acme.client."""
+        clock = [datetime.datetime(2018, 2, 15)]
+        mock_datetime = mock.patch('acme.client.datetime').start()
+        mock_datetime.datetime.now.side_effect = lambda: clock[0]
+        mock_datetime.timedelta = datetime.timedelta
+        mock_time = mock.patch('acme.client.time').start()
+        def sleep(seconds):
+            clock[0] += datetime.timedelta(seconds=seconds)
+        mock_time.sleep.side_effect = sleep
+        self.addCleanup(mock.patch.stopall)
+        return clock, mock_time.sleep
+
+    def test_poll_authorizations_timeout(self):
+        clock, _ = self._fake_clock()
+        self.response.json.side_effect = (
+            lambda: self.authz2.to_json() if self.net.get.call_count > 1
+            else self.authz.to_json())
 
+        deadline = clock[0] + datetime.timedelta(seconds=30)
         self.assertRaises(
-            errors.TimeoutError, self.client.poll_authorizations, self.orderr, now_side_effect[1])
+            errors.TimeoutError, self.client.poll_authorizations, self.orderr, deadline)
+        self.assertEqual(clock[0], deadline)
+        # polled at 0, 1, 3, 7, 15 and 25 seconds
+        self.assertEqual(self.net.get.call_count, 7)
 
     def test_poll_authorizations_failure(self):
         deadline = datetime.datetime(9999, 9, 9)
@@ -770,6 +813,7 @@ class ClientV2Test(ClientTestBase):
             errors.ValidationError, self.client.poll_authorizations, self.orderr, deadline)
 
     def test_poll_authorizations_success(self):
+        _, mock_sleep = self._fake_clock()
         deadline = datetime.datetime(9999, 9, 9)
         updated_authz2 = self.authz2.update(status=messages.STATUS_VALID)
         updated_authzr2 = messages.AuthorizationResource(
@@ -779,6 +823,42 @@ class ClientV2Test(ClientTestBase):
         self.response.json.side_effect = (
             self.authz.to_json(), self.authz2.to_json(), updated_authz2.to_json())
         self.assertEqual(self.client.poll_authorizations(self.orderr, deadline), updated_orderr)
+        mock_sleep.assert_called_once_with(1)
+
+    def test_poll_authorizations_together(self):
+        _, mock_sleep = self._fake_clock()
+        deadline = datetime.datetime(9999, 9, 9)
+        self.response.headers['Retry-After'] = '3'
+        updated_authz = self.authz.update(status=messages.STATUS_VALID)
+        updated_authz2 = self.authz2.update(status=messages.STATUS_VALID)
+        pending_authz = self.authz.update(status=messages.STATUS_PENDING)
+        self.response.json.side_effect = (
+            pending_authz.to_json(), self.authz2.to_json(),
+            updated_authz.to_json(), updated_authz2.to_json())
+
+        orderr = self.client.poll_authorizations(self.orderr, deadline)
+
+        self.assertEqual([authzr.body.status for authzr in orderr.authorizations],
+                         [messages.STATUS_VALID, messages.STATUS_VALID])
+        self.assertEqual(self.net.get.call_args_list, [
+            mock.call(self.authzr.uri), mock.call(self.authzr_uri2),
+            mock.call(self.authzr.uri), mock.call(self.authzr_uri2)])
+        # both authorizations are waited on at the same time
+        mock_sleep.assert_called_once_with(3)
+
+    def test_poll_authorizations_retry_after_zero(self):
+        clock, mock_sleep = self._fake_clock()
+        deadline = clock[0] + datetime.timedelta(seconds=30)
+        self.response.headers['Retry-After'] = '0'
+        self.response.json.side_effect = (
+            lambda: self.authz2.to_json() if self.net.get.call_count > 1
+            else self.authz.to_json())
+
+        self.assertRaises(
+            errors.TimeoutError, self.client.poll_authorizations, self.orderr, deadline)
+        # polled every second rather than as fast as possible
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(1)] * 30)
+        self.assertEqual(self.net.get.call_count, 31)
 
     def test_finalize_order_success(self):
         updated_order = self.order.update(
@@ -876,6 +956,25 @@ class ClientNetworkTest(unittest.TestCase):
         self.assertEqual(jws.signature.combined.url, u'url')
 
 
+    def test_wrap_in_jws_compact(self):
+        # pylint: disable=protected-access
+        jws_dump = self.net._wrap_in_jws(
+            MockJSONDeSerializable('foo'), nonce=b'Tg', url="url",
+            acme_version=1)
+        self.assertFalse(' ' in jws_dump or '\n' in jws_dump)
+        jws = acme_jws.JWS.json_loads(jws_dump)
+        self.assertEqual(b'{"foo":"foo"}', jws.payload)
+
+    def test_wrap_in_jws_pretty(self):
+        self.net.compact = False
+        # pylint: disable=protected-access
+        jws_dump = self.net._wrap_in_jws(
+            MockJSONDeSerializable('foo'), nonce=b'Tg', url="url",
+            acme_version=1)
+        self.assertTrue('\n' in jws_dump)
+        jws = acme_jws.JWS.json_loads(jws_dump)
+        self.assertEqual(b'{\n  "foo": "foo"\n}', jws.payload)
+
     def test_check_response_not_ok_jobj_no_error(self):
         self.response.ok = False
         self.response.json.return_value = {}
@@ -955,6 +1054,16 @@ class ClientNetworkTest(unittest.TestCase):
             'Received response:\nHTTP %d\n%s\n\n%s', 200,
             'Content-Type: application/pkix-cert', b'aGk=')
 
+    @mock.patch('acme.client.logger')
+    def test_send_request_no_debug(self, mock_logger):
+        mock_logger.isEnabledFor.return_value = False
+        self.net.session = mock.MagicMock()
+        self.net.session.request.return_value = self.response
+        # pylint: disable=protected-access
+        self.net._send_request('GET', 'http://example.com/')
+        self.assertFalse(self.response.content.decode.called)
+        self.assertEqual(1, mock_logger.debug.call_count)
+
     def test_send_request_post(self):
         self.net.session = mock.MagicMock()
         self.net.session.request.return_value = self.response
@@ -1152,6 +1261,74 @@ class ClientNetworkWithMockedResponseTest(unittest.TestCase):
         self.assertEqual(self.checked_response, self.net.post(
             'uri', self.obj, content_type=self.content_type))
 
+    def test_get_harvests_nonce(self):
+        self.net.get('http://example.com/', content_type=self.content_type)
+        self.content_type = self.net.JOSE_CONTENT_TYPE
+        self.net.post('uri', self.obj)
+        # pylint: disable=protected-access
+        self.net._wrap_in_jws.assert_called_once_with(
+            self.obj, jose.b64decode(self.all_nonces[-1]), "uri", 1)
+        self.assertEqual(
+            ['GET', 'POST'],
+            [call[0][0] for call in self.send_request.call_args_list])
+
+    def test_get_ignores_bad_nonce(self):
+        self.available_nonces = [b'f']
+        self.assertEqual(self.checked_response, self.net.get(
+            'http://example.com/', content_type=self.content_type))
+        self.assertEqual(None, self.net._pop_nonce())  # pylint: disable=protected-access
+
+    @mock.patch('acme.client.time')
+    def test_stale_nonce_discarded(self, mock_time):
+        mock_time.time.return_value = 0
+        self.net.head('uri')
+        self.net._add_nonce(self.response)  # pylint: disable=protected-access
+        mock_time.time.return_value = self.net.NONCE_MAX_AGE + 1
+        # pylint: disable=protected-access
+        self.assertEqual(jose.b64decode(self.all_nonces[1]),
+                         self.net._get_nonce('uri'))
+        self.assertEqual(2, self.send_request.call_count)
+
+    def test_get_nonce_from_nonce_url(self):
+        self.net.nonce_url = 'new-nonce'
+        with mock.patch('acme.client.threading') as mock_threading:
+            self.net._get_nonce('uri')  # pylint: disable=protected-access
+        self.send_request.assert_called_once_with('HEAD', 'new-nonce')
+        mock_threading.Thread.assert_called_once_with(
+            target=self.net._refill_nonces)  # pylint: disable=protected-access
+        mock_threading.Thread().start.assert_called_once_with()
+
+    def test_prefetch_disabled(self):
+        from acme.client import ClientNetwork
+        net = ClientNetwork(key=None, alg=None, nonce_pool_size=0)
+        net.nonce_url = 'new-nonce'
+        with mock.patch('acme.client.threading') as mock_threading:
+            net._prefetch_nonces()  # pylint: disable=protected-access
+        self.assertFalse(mock_threading.Thread.called)
+
+    def test_refill_nonces(self):
+        self.net.nonce_url = 'new-nonce'
+        # pylint: disable=protected-access
+        self.net._refill_nonces()
+        self.assertEqual(2, self.send_request.call_count)
+        self.send_request.assert_called_with('HEAD', 'new-nonce')
+        self.assertEqual(jose.b64decode(self.all_nonces[1]), self.net._pop_nonce())
+        self.assertEqual(jose.b64decode(self.all_nonces[2]), self.net._pop_nonce())
+        self.assertFalse(self.net._prefetching)
+
+    def test_refill_nonces_missing_nonce(self):
+        self.net.nonce_url = 'new-nonce'
+        self.available_nonces = []
+        self.net._refill_nonces()  # pylint: disable=protected-access
+        self.send_request.assert_called_once_with('HEAD', 'new-nonce')
+
+    def test_refill_nonces_error(self):
+        self.net.nonce_url = 'new-nonce'
+        self.send_request.side_effect = requests.exceptions.RequestException
+        self.net._refill_nonces()  # pylint: disable=protected-access
+        self.assertEqual(None, self.net._pop_nonce())  # pylint: disable=protected-access
+        self.assertFalse(self.net._prefetching)  # pylint: disable=protected-access
+
     def test_head_get_post_error_passthrough(self):
         self.send_request.side_effect = requests.exceptions.RequestException
         for method in self.net.head, self.net.get:
@@ -1173,6 +1350,14 @@ class ClientNetworkSourceAddressBindingTest(unittest.TestCase):
         for adapter in net.session.adapters.values():
             self.assertTrue(self.source_address in adapter.source_address)
 
+    def test_pool_maxsize(self):
+        from acme.client import ClientNetwork
+        for source_address in (None, self.source_address):
+            net = ClientNetwork(key=None, alg=None, source_address=source_address,
+                                pool_maxsize=42)
+            for adapter in net.session.adapters.values():
+                self.assertEqual(42, adapter._pool_maxsize)  # pylint: disable=protected-access
+
     def test_behavior_assumption(self):
         """This is a test that guardrails the HTTPAdapter behavior so that if the default for
         a Session() changes, the assumptions here aren't violated silently."""
@@ -27,6 +27,7 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         dns_test_common.write({"cloudflare_email": EMAIL, "cloudflare_api_key": API_KEY}, path)
 
         self.config = mock.MagicMock(cloudflare_credentials=path,
+                                     cloudflare_zone_cache_ttl=0,
                                      cloudflare_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "cloudflare")
@@ -30,6 +30,7 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         dns_test_common.write({"cloudxns_api_key": API_KEY, "cloudxns_secret_key": SECRET}, path)
 
         self.config = mock.MagicMock(cloudxns_credentials=path,
+                                     cloudxns_zone_cache_ttl=0,
                                      cloudxns_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "cloudxns")
@@ -29,6 +29,7 @@ class AuthenticatorTest(test_util.TempDirTestCase,
                               path)
 
         self.config = mock.MagicMock(dnsmadeeasy_credentials=path,
+                                     dnsmadeeasy_zone_cache_ttl=0,
                                      dnsmadeeasy_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "dnsmadeeasy")
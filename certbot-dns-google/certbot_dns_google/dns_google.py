@@ -1,4 +1,5 @@
 """DNS Authenticator for Google Cloud DNS."""
+import collections
 import json
 import logging
 
@@ -72,6 +73,12 @@ class Authenticator(dns_common.DNSAuthenticator):
     def _cleanup(self, domain, validation_name, validation):
         self._get_google_client().del_txt_record(domain, validation_name, validation, self.ttl)
 
+    def _perform_batch(self, records):
+        self._get_google_client().add_txt_records(records, self.ttl)
+
+    def _cleanup_batch(self, records):
+        self._get_google_client().del_txt_records(records, self.ttl)
+
     def _get_google_client(self):
         return _GoogleClient(self.conf('credentials'))
 
@@ -110,43 +117,69 @@ class _GoogleClient(object):
         :raises certbot.errors.PluginError: if an error occurs communicating with the Google API
         """
 
-        zone_id = self._find_managed_zone_id(domain)
-
-        record_contents = self.get_existing_txt_rrset(zone_id, record_name)
-        if record_contents is None:
-            record_contents = []
-        add_records = record_contents[:]
+        self.add_txt_records([(domain, record_name, record_content)], record_ttl)
 
-        if "\""+record_content+"\"" in record_contents:
-            # The process was interrupted previously and validation token exists
-            return
+    def add_txt_records(self, records, record_ttl):
+        """
+        Add several TXT records, making one change per managed zone.
 
-        add_records.append(record_content)
+        :param list records: (domain, record name, record content) tuples, where the domain is
+            used to look up the managed zone.
+        :param int record_ttl: The record TTL (number of seconds that the record may be cached).
+        :raises certbot.errors.PluginError: if an error occurs communicating with the Google API
+        """
 
-        data = {
-            "kind": "dns#change",
-            "additions": [
-                {
-                    "kind": "dns#resourceRecordSet",
-                    "type": "TXT",
-                    "name": record_name + ".",
-                    "rrdatas": add_records,
-                    "ttl": record_ttl,
-                },
-            ],
-        }
-
-        if record_contents:
-            # We need to remove old records in the same request
-            data["deletions"] = [
-                {
+        zones = collections.OrderedDict()
+        for domain, record_name, record_content in records:
+            zone_id = self._find_managed_zone_id(domain)
+            zones.setdefault(zone_id, []).append((record_name, record_content))
+
+        for zone_id, zone_records in zones.items():
+            data = {
+                "kind": "dns#change",
+                "additions": [],
+            }
+
+            for record_name, record_contents in _group_by_name(zone_records).items():
+                existing_contents = self.get_existing_txt_rrset(zone_id, record_name)
+                if existing_contents is None:
+                    existing_contents = []
+                new_contents = [record_content for record_content in record_contents
+                                if "\""+record_content+"\"" not in existing_contents]
+
+                if not new_contents:
+                    # The process was interrupted previously and validation tokens exist
+                    continue
+
+                data["additions"].append({
                     "kind": "dns#resourceRecordSet",
                     "type": "TXT",
                     "name": record_name + ".",
-                    "rrdatas": record_contents,
+                    "rrdatas": existing_contents + new_contents,
                     "ttl": record_ttl,
-                },
-            ]
+                })
+
+                if existing_contents:
+                    # We need to remove old records in the same request
+                    data.setdefault("deletions", []).append({
+                        "kind": "dns#resourceRecordSet",
+                        "type": "TXT",
+                        "name": record_name + ".",
+                        "rrdatas": existing_contents,
+                        "ttl": record_ttl,
+                    })
+
+            if data["additions"]:
+                self._add_change(zone_id, data)
+
+    def _add_change(self, zone_id, data):
+        """
+        Create a change in a managed zone and wait for it to be done.
+
+        :param str zone_id: The ID of the managed zone.
+        :param dict data: The change.
+        :raises certbot.errors.PluginError: if an error occurs communicating with the Google API
+        """
 
         changes = self.dns.changes()  # changes | pylint: disable=no-member
 
@@ -176,50 +209,68 @@ class _GoogleClient(object):
         :raises certbot.errors.PluginError: if an error occurs communicating with the Google API
         """
 
-        try:
-            zone_id = self._find_managed_zone_id(domain)
-        except errors.PluginError as e:
-            logger.warn('Error finding zone. Skipping cleanup.')
-            return
-
-        record_contents = self.get_existing_txt_rrset(zone_id, record_name)
-        if record_contents is None:
-            record_contents = ["\"" + record_content + "\""]
-
-        data = {
-            "kind": "dns#change",
-            "deletions": [
-                {
-                    "kind": "dns#resourceRecordSet",
-                    "type": "TXT",
-                    "name": record_name + ".",
-                    "rrdatas": record_contents,
-                    "ttl": record_ttl,
-                },
-            ],
-        }
-
-        # Remove the record being deleted from the list
-        readd_contents = [r for r in record_contents if r != "\"" + record_content + "\""]
-        if readd_contents:
-            # We need to remove old records in the same request
-            data["additions"] = [
-                {
+        self.del_txt_records([(domain, record_name, record_content)], record_ttl)
+
+    def del_txt_records(self, records, record_ttl):
+        """
+        Delete several TXT records, making one change per managed zone.
+
+        Records whose managed zone cannot be found are skipped.
+
+        :param list records: (domain, record name, record content) tuples, where the domain is
+            used to look up the managed zone.
+        :param int record_ttl: The record TTL (number of seconds that the record may be cached).
+        """
+
+        zones = collections.OrderedDict()
+        for domain, record_name, record_content in records:
+            try:
+                zone_id = self._find_managed_zone_id(domain)
+            except errors.PluginError as e:
+                logger.warn('Error finding zone. Skipping cleanup.')
+                continue
+            zones.setdefault(zone_id, []).append((record_name, record_content))
+
+        for zone_id, zone_records in zones.items():
+            data = {
+                "kind": "dns#change",
+                "deletions": [],
+            }
+
+            for record_name, record_contents in _group_by_name(zone_records).items():
+                quoted_contents = ["\"" + record_content + "\""
+                                   for record_content in record_contents]
+                existing_contents = self.get_existing_txt_rrset(zone_id, record_name)
+                if existing_contents is None:
+                    existing_contents = quoted_contents
+
+                data["deletions"].append({
                     "kind": "dns#resourceRecordSet",
                     "type": "TXT",
                     "name": record_name + ".",
-                    "rrdatas": readd_contents,
+                    "rrdatas": existing_contents,
                     "ttl": record_ttl,
-                },
-            ]
-
-        changes = self.dns.changes()  # changes | pylint: disable=no-member
+                })
+
+                # Remove the records being deleted from the list
+                readd_contents = [r for r in existing_contents if r not in quoted_contents]
+                if readd_contents:
+                    # We need to remove old records in the same request
+                    data.setdefault("additions", []).append({
+                        "kind": "dns#resourceRecordSet",
+                        "type": "TXT",
+                        "name": record_name + ".",
+                        "rrdatas": readd_contents,
+                        "ttl": record_ttl,
+                    })
+
+            changes = self.dns.changes()  # changes | pylint: disable=no-member
 
-        try:
-            request = changes.create(project=self.project_id, managedZone=zone_id, body=data)
-            request.execute()
-        except googleapiclient_errors.Error as e:
-            logger.warn('Encountered error deleting TXT record: %s', e)
+            try:
+                request = changes.create(project=self.project_id, managedZone=zone_id, body=data)
+                request.execute()
+            except googleapiclient_errors.Error as e:
+                logger.warn('Encountered error deleting TXT record: %s', e)
 
     def get_existing_txt_rrset(self, zone_id, record_name):
         """
@@ -305,3 +356,18 @@ class _GoogleClient(object):
             return content.decode()
         else:
             return content
+
+
+def _group_by_name(records):
+    """
+    Group the contents of records by record name.
+
+    :param list records: (record name, record content) tuples.
+    :returns: Lists of record contents, keyed by record name in the order of the records.
+    :rtype: collections.OrderedDict
+    """
+
+    names = collections.OrderedDict()
+    for record_name, record_content in records:
+        names.setdefault(record_name, []).append(record_content)
+    return names
@@ -32,6 +32,7 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
 
         super(AuthenticatorTest, self).setUp()
         self.config = mock.MagicMock(google_credentials=path,
+                                     google_zone_cache_ttl=0,
                                      google_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "google")
@@ -43,7 +44,8 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
     def test_perform(self):
         self.auth.perform([self.achall])
 
-        expected = [mock.call.add_txt_record(DOMAIN, '_acme-challenge.'+DOMAIN, mock.ANY, mock.ANY)]
+        expected = [mock.call.add_txt_records([(DOMAIN, '_acme-challenge.'+DOMAIN, mock.ANY)],
+                                              mock.ANY)]
         self.assertEqual(expected, self.mock_client.mock_calls)
 
     def test_cleanup(self):
@@ -51,7 +53,8 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         self.auth._attempt_cleanup = True
         self.auth.cleanup([self.achall])
 
-        expected = [mock.call.del_txt_record(DOMAIN, '_acme-challenge.'+DOMAIN, mock.ANY, mock.ANY)]
+        expected = [mock.call.del_txt_records([(DOMAIN, '_acme-challenge.'+DOMAIN, mock.ANY)],
+                                              mock.ANY)]
         self.assertEqual(expected, self.mock_client.mock_calls)
 
     @mock.patch('httplib2.Http.request', side_effect=ServerNotFoundError)
@@ -132,6 +135,39 @@ class GoogleClientTest(unittest.TestCase):
                                                managedZone=self.zone,
                                                project=PROJECT_ID)
 
+    @mock.patch('oauth2client.service_account.ServiceAccountCredentials.from_json_keyfile_name')
+    @mock.patch('certbot_dns_google.dns_google.open',
+                mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
+    def test_add_txt_records_one_change_per_zone(self, unused_credential_mock):
+        client, changes = self._setUp_client_with_mock(
+            [{'managedZones': [{'id': self.zone}]}] * 3)
+
+        client.add_txt_records([(DOMAIN, "foo", "bar"),
+                                (DOMAIN, "foo", "baz"),
+                                (DOMAIN, "qux", "bar")], self.record_ttl)
+
+        self.assertEqual(changes.create.call_count, 1)
+        additions = changes.create.call_args[1]["body"]["additions"]
+        self.assertEqual([(a["name"], a["rrdatas"]) for a in additions],
+                         [("foo.", ["bar", "baz"]), ("qux.", ["bar"])])
+
+    @mock.patch('oauth2client.service_account.ServiceAccountCredentials.from_json_keyfile_name')
+    @mock.patch('certbot_dns_google.dns_google.open',
+                mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
+    def test_del_txt_records_one_change_per_zone(self, unused_credential_mock):
+        client, changes = self._setUp_client_with_mock(
+            [{'managedZones': [{'id': self.zone}]}] * 2)
+
+        client.del_txt_records([(DOMAIN, "_acme-challenge.example.org", "example-txt-contents"),
+                                (DOMAIN, "foo", "bar")], self.record_ttl)
+
+        self.assertEqual(changes.create.call_count, 1)
+        deletions = changes.create.call_args[1]["body"]["deletions"]
+        self.assertEqual([(d["name"], d["rrdatas"]) for d in deletions],
+                         [("_acme-challenge.example.org.", ["\"example-txt-contents\""]),
+                          ("foo.", ["\"bar\""])])
+        self.assertFalse("additions" in changes.create.call_args[1]["body"])
+
     @mock.patch('oauth2client.service_account.ServiceAccountCredentials.from_json_keyfile_name')
     @mock.patch('certbot_dns_google.dns_google.open',
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
@@ -23,6 +23,7 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         dns_test_common.write({"linode_key": TOKEN}, path)
 
         self.config = mock.MagicMock(linode_credentials=path,
+                                     linode_zone_cache_ttl=0,
                                      linode_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "linode")
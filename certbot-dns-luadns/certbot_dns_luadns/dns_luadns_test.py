@@ -26,6 +26,7 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         dns_test_common.write({"luadns_email": EMAIL, "luadns_token": TOKEN}, path)
 
         self.config = mock.MagicMock(luadns_credentials=path,
+                                     luadns_zone_cache_ttl=0,
                                      luadns_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "luadns")
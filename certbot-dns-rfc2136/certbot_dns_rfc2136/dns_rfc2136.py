@@ -1,4 +1,5 @@
 """DNS Authenticator using RFC 2136 Dynamic Updates."""
+import collections
 import logging
 
 import dns.flags
@@ -78,6 +79,15 @@ class Authenticator(dns_common.DNSAuthenticator):
     def _cleanup(self, _domain, validation_name, validation):
         self._get_rfc2136_client().del_txt_record(validation_name, validation)
 
+    def _perform_batch(self, records):
+        self._get_rfc2136_client().add_txt_records(
+            [(validation_name, validation) for _, validation_name, validation in records],
+            self.ttl)
+
+    def _cleanup_batch(self, records):
+        self._get_rfc2136_client().del_txt_records(
+            [(validation_name, validation) for _, validation_name, validation in records])
+
     def _get_rfc2136_client(self):
         return _RFC2136Client(self.credentials.conf('server'),
                               int(self.credentials.conf('port') or self.PORT),
@@ -109,30 +119,37 @@ class _RFC2136Client(object):
         :raises certbot.errors.PluginError: if an error occurs communicating with the DNS server
         """
 
-        domain = self._find_domain(record_name)
+        self.add_txt_records([(record_name, record_content)], record_ttl)
 
-        n = dns.name.from_text(record_name)
-        o = dns.name.from_text(domain)
-        rel = n.relativize(o)
+    def add_txt_records(self, records, record_ttl):
+        """
+        Add several TXT records, sending one update per zone.
 
-        update = dns.update.Update(
-            domain,
-            keyring=self.keyring,
-            keyalgorithm=self.algorithm)
-        update.add(rel, record_ttl, dns.rdatatype.TXT, record_content)
+        :param list records: (record name, record content) tuples.
+        :param int record_ttl: The record TTL (number of seconds that the record may be cached).
+        :raises certbot.errors.PluginError: if an error occurs communicating with the DNS server
+        """
 
-        try:
-            response = dns.query.tcp(update, self.server, port=self.port)
-        except Exception as e:
-            raise errors.PluginError('Encountered error adding TXT record: {0}'
-                                     .format(e))
-        rcode = response.rcode()
+        for domain, zone_records in self._group_by_domain(records).items():
+            update = dns.update.Update(
+                domain,
+                keyring=self.keyring,
+                keyalgorithm=self.algorithm)
+            for rel, record_content in zone_records:
+                update.add(rel, record_ttl, dns.rdatatype.TXT, record_content)
+
+            try:
+                response = dns.query.tcp(update, self.server, port=self.port)
+            except Exception as e:
+                raise errors.PluginError('Encountered error adding TXT record: {0}'
+                                         .format(e))
+            rcode = response.rcode()
 
-        if rcode == dns.rcode.NOERROR:
-            logger.debug('Successfully added TXT record')
-        else:
-            raise errors.PluginError('Received response from server: {0}'
-                                     .format(dns.rcode.to_text(rcode)))
+            if rcode == dns.rcode.NOERROR:
+                logger.debug('Successfully added %d TXT record(s) to %s', len(zone_records), domain)
+            else:
+                raise errors.PluginError('Received response from server: {0}'
+                                         .format(dns.rcode.to_text(rcode)))
 
     def del_txt_record(self, record_name, record_content):
         """
@@ -144,30 +161,56 @@ class _RFC2136Client(object):
         :raises certbot.errors.PluginError: if an error occurs communicating with the DNS server
         """
 
-        domain = self._find_domain(record_name)
+        self.del_txt_records([(record_name, record_content)])
 
-        n = dns.name.from_text(record_name)
-        o = dns.name.from_text(domain)
-        rel = n.relativize(o)
+    def del_txt_records(self, records):
+        """
+        Delete several TXT records, sending one update per zone.
 
-        update = dns.update.Update(
-            domain,
-            keyring=self.keyring,
-            keyalgorithm=self.algorithm)
-        update.delete(rel, dns.rdatatype.TXT, record_content)
+        :param list records: (record name, record content) tuples.
+        :raises certbot.errors.PluginError: if an error occurs communicating with the DNS server
+        """
 
-        try:
-            response = dns.query.tcp(update, self.server, port=self.port)
-        except Exception as e:
-            raise errors.PluginError('Encountered error deleting TXT record: {0}'
-                                     .format(e))
-        rcode = response.rcode()
+        for domain, zone_records in self._group_by_domain(records).items():
+            update = dns.update.Update(
+                domain,
+                keyring=self.keyring,
+                keyalgorithm=self.algorithm)
+            for rel, record_content in zone_records:
+                update.delete(rel, dns.rdatatype.TXT, record_content)
+
+            try:
+                response = dns.query.tcp(update, self.server, port=self.port)
+            except Exception as e:
+                raise errors.PluginError('Encountered error deleting TXT record: {0}'
+                                         .format(e))
+            rcode = response.rcode()
+
+            if rcode == dns.rcode.NOERROR:
+                logger.debug('Successfully deleted %d TXT record(s) from %s',
+                             len(zone_records), domain)
+            else:
+                raise errors.PluginError('Received response from server: {0}'
+                                         .format(dns.rcode.to_text(rcode)))
+
+    def _group_by_domain(self, records):
+        """
+        Group records by the closest domain with an SOA record.
+
+        :param list records: (record name, record content) tuples.
+        :returns: Lists of (record name relative to the domain, record content) tuples, keyed
+            by domain in the order of the records.
+        :rtype: collections.OrderedDict
+        """
+
+        domains = collections.OrderedDict()
+        for record_name, record_content in records:
+            domain = self._find_domain(record_name)
 
-        if rcode == dns.rcode.NOERROR:
-            logger.debug('Successfully deleted TXT record')
-        else:
-            raise errors.PluginError('Received response from server: {0}'
-                                     .format(dns.rcode.to_text(rcode)))
+            n = dns.name.from_text(record_name)
+            o = dns.name.from_text(domain)
+            domains.setdefault(domain, []).append((n.relativize(o), record_content))
+        return domains
 
     def _find_domain(self, record_name):
         """
@@ -180,11 +223,13 @@ class _RFC2136Client(object):
         """
 
         domain_name_guesses = dns_common.base_domain_name_guesses(record_name)
+        namespace = dns_common.zone_cache_namespace('rfc2136', self.server, self.port)
 
-        # Loop through until we find an authoritative SOA record
-        for guess in domain_name_guesses:
-            if self._query_soa(guess):
-                return guess
+        # Loop through until we find an authoritative SOA record, skipping names already probed
+        found = dns_common.zone_cache().find_zone(
+            namespace, record_name, lambda guess: True if self._query_soa(guess) else None)
+        if found is not None:
+            return found[0]
 
         raise errors.PluginError('Unable to determine base domain for {0} using names: {1}.'
                                  .format(record_name, domain_name_guesses))
@@ -9,6 +9,7 @@ import dns.tsig
 import mock
 
 from certbot import errors
+from certbot.plugins import dns_common
 from certbot.plugins import dns_test_common
 from certbot.plugins.dns_test_common import DOMAIN
 from certbot.tests import util as test_util
@@ -31,6 +32,7 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         dns_test_common.write(VALID_CONFIG, path)
 
         self.config = mock.MagicMock(rfc2136_credentials=path,
+                                     rfc2136_zone_cache_ttl=0,
                                      rfc2136_propagation_seconds=0)  # don't wait during tests
 
         self.auth = Authenticator(self.config, "rfc2136")
@@ -42,7 +44,7 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
     def test_perform(self):
         self.auth.perform([self.achall])
 
-        expected = [mock.call.add_txt_record('_acme-challenge.'+DOMAIN, mock.ANY, mock.ANY)]
+        expected = [mock.call.add_txt_records([('_acme-challenge.'+DOMAIN, mock.ANY)], mock.ANY)]
         self.assertEqual(expected, self.mock_client.mock_calls)
 
     def test_cleanup(self):
@@ -50,7 +52,7 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         self.auth._attempt_cleanup = True
         self.auth.cleanup([self.achall])
 
-        expected = [mock.call.del_txt_record('_acme-challenge.'+DOMAIN, mock.ANY)]
+        expected = [mock.call.del_txt_records([('_acme-challenge.'+DOMAIN, mock.ANY)])]
         self.assertEqual(expected, self.mock_client.mock_calls)
 
     def test_invalid_algorithm_raises(self):
@@ -88,6 +90,36 @@ class RFC2136ClientTest(unittest.TestCase):
         query_mock.assert_called_with(mock.ANY, SERVER, port=PORT)
         self.assertTrue("bar. 42 IN TXT \"baz\"" in str(query_mock.call_args[0][0]))
 
+    @mock.patch("dns.query.tcp")
+    def test_add_txt_records_one_update_per_zone(self, query_mock):
+        query_mock.return_value.rcode.return_value = dns.rcode.NOERROR
+        # _find_domain | pylint: disable=protected-access
+        self.rfc2136_client._find_domain = mock.MagicMock(
+            side_effect=lambda name: name.split('.', 1)[1])
+
+        self.rfc2136_client.add_txt_records([("bar.example.com", "baz"),
+                                             ("qux.example.com", "quux"),
+                                             ("bar.example.net", "baz")], 42)
+
+        self.assertEqual(query_mock.call_count, 2)
+        update = str(query_mock.call_args_list[0][0][0])
+        self.assertTrue("bar 42 IN TXT \"baz\"" in update)
+        self.assertTrue("qux 42 IN TXT \"quux\"" in update)
+
+    @mock.patch("dns.query.tcp")
+    def test_del_txt_records_one_update_per_zone(self, query_mock):
+        query_mock.return_value.rcode.return_value = dns.rcode.NOERROR
+        # _find_domain | pylint: disable=protected-access
+        self.rfc2136_client._find_domain = mock.MagicMock(return_value="example.com")
+
+        self.rfc2136_client.del_txt_records([("bar.example.com", "baz"),
+                                             ("qux.example.com", "quux")])
+
+        self.assertEqual(query_mock.call_count, 1)
+        update = str(query_mock.call_args[0][0])
+        self.assertTrue("bar 0 NONE TXT \"baz\"" in update)
+        self.assertTrue("qux 0 NONE TXT \"quux\"" in update)
+
     @mock.patch("dns.query.tcp")
     def test_add_txt_record_wraps_errors(self, query_mock):
         query_mock.side_effect = Exception
@@ -152,6 +184,18 @@ class RFC2136ClientTest(unittest.TestCase):
 
         self.assertTrue(domain == DOMAIN)
 
+    def test_find_domain_shared_zone_cache(self):
+        # _query_soa | pylint: disable=protected-access
+        self.rfc2136_client._query_soa = mock.MagicMock(side_effect=[False, False, True])
+
+        with dns_common.shared_zone_cache():
+            # _find_domain | pylint: disable=protected-access
+            self.rfc2136_client._find_domain('foo.bar.'+DOMAIN)
+            domain = self.rfc2136_client._find_domain('foo.bar.'+DOMAIN)
+
+        self.assertTrue(domain == DOMAIN)
+        self.assertEqual(self.rfc2136_client._query_soa.call_count, 3)
+
     def test_find_domain_wraps_errors(self):
         # _query_soa | pylint: disable=protected-access
         self.rfc2136_client._query_soa = mock.MagicMock(return_value=False)
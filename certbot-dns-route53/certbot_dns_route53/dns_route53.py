@@ -11,7 +11,7 @@ from certbot import errors
 from certbot import interfaces
 from certbot.plugins import dns_common
 
-from acme.magic_typing import DefaultDict, List, Dict # pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import DefaultDict, List, Dict, Optional, Tuple # pylint: disable=unused-import, no-name-in-module
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +20,8 @@ INSTRUCTIONS = (
     "https://boto3.readthedocs.io/en/latest/guide/configuration.html#best-practices-for-configuring-credentials "  # pylint: disable=line-too-long
     "and add the necessary permissions for Route53 access.")
 
+ZONE_CACHE_NAMESPACE = "route53"
+
 @zope.interface.implementer(interfaces.IAuthenticator)
 @zope.interface.provider(interfaces.IPluginFactory)
 class Authenticator(dns_common.DNSAuthenticator):
@@ -32,10 +34,17 @@ class Authenticator(dns_common.DNSAuthenticator):
     description = ("Obtain certificates using a DNS TXT record (if you are using AWS Route53 for "
                    "DNS).")
     ttl = 10
+    # boto3 clients and the zone cache can be used from several threads.
+    max_concurrency = 4
+    # Route53 allows five API requests per second per account.
+    max_requests_per_second = 5
 
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
         self.r53 = boto3.client("route53")
+        self.sts = boto3.client("sts")
+        self._namespace = None  # type: Optional[str]
+        self._private_zone_cache = None  # type: Optional[dns_common.ZoneCache]
         self._resource_records = collections.defaultdict(list) # type: DefaultDict[str, List[Dict[str, str]]]
 
     def more_info(self):  # pylint: disable=missing-docstring,no-self-use
@@ -51,12 +60,12 @@ class Authenticator(dns_common.DNSAuthenticator):
         self._attempt_cleanup = True
 
         try:
-            change_ids = [
-                self._change_txt_record("UPSERT",
-                  achall.validation_domain_name(achall.domain),
-                  achall.validation(achall.account_key))
-                for achall in achalls
-            ]
+            with self._shared_zone_cache():
+                change_ids = self._change_txt_records("UPSERT", [
+                    (achall.validation_domain_name(achall.domain),
+                     achall.validation(achall.account_key))
+                    for achall in achalls
+                ])
 
             for change_id in change_ids:
                 self._wait_for_change(change_id)
@@ -66,75 +75,162 @@ class Authenticator(dns_common.DNSAuthenticator):
         return [achall.response(achall.account_key) for achall in achalls]
 
     def _cleanup(self, domain, validation_domain_name, validation):
-        try:
-            self._change_txt_record("DELETE", validation_domain_name, validation)
-        except (NoCredentialsError, ClientError) as e:
-            logger.debug('Encountered error during cleanup: %s', e, exc_info=True)
+        self._cleanup_batch([(domain, validation_domain_name, validation)])
+
+    def _cleanup_batch(self, records):
+        # A record whose zone can't be found is skipped, the others are
+        # still deleted.
+        zones = collections.OrderedDict()  # type: Dict[str, List[Tuple[str, str]]]
+        for _, validation_domain_name, validation in records:
+            try:
+                zone_id = self._find_zone_id_for_domain(validation_domain_name)
+            except (NoCredentialsError, ClientError, errors.PluginError) as e:
+                logger.debug('Encountered error during cleanup: %s', e, exc_info=True)
+                continue
+            zones.setdefault(zone_id, []).append((validation_domain_name, validation))
+
+        def delete(zone):  # pylint: disable=missing-docstring
+            try:
+                self._change_zone_txt_records(zone[0], "DELETE", zone[1])
+            except (NoCredentialsError, ClientError) as e:
+                logger.debug('Encountered error during cleanup: %s', e, exc_info=True)
+
+        self._for_each(delete, list(zones.items()))
 
     def _find_zone_id_for_domain(self, domain):
         """Find the zone id responsible a given FQDN.
 
            That is, the id for the zone whose name is the longest parent of the
-           domain.
+           domain. Hosted zones are only listed if the shared zone cache does
+           not know the zone of the domain yet.
+        """
+        listing = []  # type: List[Dict[str, str]]
+
+        def probe(guess):  # pylint: disable=missing-docstring
+            if not listing:
+                listing.append(self._list_public_zones())
+            return listing[0].get(guess)
+
+        cache, namespace = self._route53_zone_cache()
+        found = cache.find_zone(namespace, domain, probe)
+        if found is None:
+            raise errors.PluginError(
+                "Unable to find a Route53 hosted zone for {0}".format(domain)
+            )
+        return found[1]
+
+    def _route53_zone_cache(self):
+        """Get the zone cache to use and the namespace of the zones in it.
+
+           Hosted zone ids are only valid within an AWS account. When the
+           cache is persisted, and so may be used by runs with the credentials
+           of another account, the namespace identifies the account. If the
+           account can't be found, a private cache that isn't persisted is
+           used instead.
+        """
+        if self._namespace is None:
+            self._namespace = ZONE_CACHE_NAMESPACE
+            if self.conf("zone-cache-ttl"):
+                try:
+                    account = self.sts.get_caller_identity()["Account"]
+                    self._namespace = dns_common.zone_cache_namespace("route53", account)
+                except (NoCredentialsError, ClientError) as e:
+                    logger.debug("Unable to find the AWS account, not persisting "
+                                 "Route53 zones: %s", e, exc_info=True)
+                    self._private_zone_cache = dns_common.ZoneCache()
+        if self._private_zone_cache is not None:
+            return self._private_zone_cache, self._namespace
+        return dns_common.zone_cache(), self._namespace
+
+    def _list_public_zones(self):
+        """List the public hosted zones.
+
+        :returns: The ids of the zones, keyed by their lowercase names
+            without a trailing dot.
+        :rtype: dict
         """
         paginator = self.r53.get_paginator("list_hosted_zones")
-        zones = []
-        target_labels = domain.rstrip(".").split(".")
+        zones = {}
         for page in paginator.paginate():
             for zone in page["HostedZones"]:
                 if zone["Config"]["PrivateZone"]:
                     continue
 
-                candidate_labels = zone["Name"].rstrip(".").split(".")
-                if candidate_labels == target_labels[-len(candidate_labels):]:
-                    zones.append((zone["Name"], zone["Id"]))
+                zones[zone["Name"].rstrip(".").lower()] = zone["Id"]
+        return zones
 
-        if not zones:
-            raise errors.PluginError(
-                "Unable to find a Route53 hosted zone for {0}".format(domain)
-            )
+    def _change_txt_record(self, action, validation_domain_name, validation):
+        return self._change_txt_records(action, [(validation_domain_name, validation)])[0]
 
-        # Order the zones that are suffixes for our desired to domain by
-        # length, this puts them in an order like:
-        # ["foo.bar.baz.com", "bar.baz.com", "baz.com", "com"]
-        # And then we choose the first one, which will be the most specific.
-        zones.sort(key=lambda z: len(z[0]), reverse=True)
-        return zones[0][1]
+    def _change_txt_records(self, action, records):
+        """Change TXT records, submitting one change batch per hosted zone.
 
-    def _change_txt_record(self, action, validation_domain_name, validation):
-        zone_id = self._find_zone_id_for_domain(validation_domain_name)
-
-        rrecords = self._resource_records[validation_domain_name]
-        challenge = {"Value": '"{0}"'.format(validation)}
-        if action == "DELETE":
-            # Remove the record being deleted from the list of tracked records
-            rrecords.remove(challenge)
-            if rrecords:
-                # Need to update instead, as we're not deleting the rrset
-                action = "UPSERT"
+        :param str action: "UPSERT" or "DELETE".
+        :param list records: (validation domain name, validation) tuples.
+
+        :returns: The ids of the changes, one per hosted zone.
+        :rtype: list
+        """
+        return self._for_each(lambda zone: self._change_zone_txt_records(zone[0], action, zone[1]),
+                              list(self._group_by_zone(records).items()))
+
+    def _group_by_zone(self, records):
+        zones = collections.OrderedDict()  # type: Dict[str, List[Tuple[str, str]]]
+        for validation_domain_name, validation in records:
+            zone_id = self._find_zone_id_for_domain(validation_domain_name)
+            zones.setdefault(zone_id, []).append((validation_domain_name, validation))
+        return zones
+
+    def _change_zone_txt_records(self, zone_id, action, records):
+        # Route53 rejects a batch changing the same record set twice, so the
+        # values are merged per name first.
+        names = collections.OrderedDict()  # type: Dict[str, List[Dict[str, str]]]
+        for validation_domain_name, validation in records:
+            rrecords = self._resource_records[validation_domain_name]
+            challenge = {"Value": '"{0}"'.format(validation)}
+            if action == "DELETE":
+                # Remove the record being deleted from the list of tracked records
+                rrecords.remove(challenge)
             else:
-                # Create a new list containing the record to use with DELETE
-                rrecords = [challenge]
-        else:
-            rrecords.append(challenge)
-
-        response = self.r53.change_resource_record_sets(
-            HostedZoneId=zone_id,
-            ChangeBatch={
-                "Comment": "certbot-dns-route53 certificate validation " + action,
-                "Changes": [
-                    {
-                        "Action": action,
-                        "ResourceRecordSet": {
-                            "Name": validation_domain_name,
-                            "Type": "TXT",
-                            "TTL": self.ttl,
-                            "ResourceRecords": rrecords,
-                        }
-                    }
-                ]
-            }
-        )
+                rrecords.append(challenge)
+            names.setdefault(validation_domain_name, []).append(challenge)
+
+        changes = []
+        for validation_domain_name, challenges in names.items():
+            name_action = action
+            rrecords = self._resource_records[validation_domain_name]
+            if action == "DELETE":
+                if rrecords:
+                    # Need to update instead, as we're not deleting the rrset
+                    name_action = "UPSERT"
+                else:
+                    # Create a new list containing the records to use with DELETE
+                    rrecords = challenges
+            changes.append({
+                "Action": name_action,
+                "ResourceRecordSet": {
+                    "Name": validation_domain_name,
+                    "Type": "TXT",
+                    "TTL": self.ttl,
+                    "ResourceRecords": list(rrecords),
+                }
+            })
+
+        try:
+            response = self.r53.change_resource_record_sets(
+                HostedZoneId=zone_id,
+                ChangeBatch={
+                    "Comment": "certbot-dns-route53 certificate validation " + action,
+                    "Changes": changes,
+                }
+            )
+        except ClientError:
+            # The zone may be gone, do not keep using its cached id.
+            if self._namespace is not None:
+                cache, namespace = self._route53_zone_cache()
+                for validation_domain_name in names:
+                    cache.invalidate(namespace, validation_domain_name)
+            raise
         return response["ChangeInfo"]["Id"]
 
     def _wait_for_change(self, change_id):
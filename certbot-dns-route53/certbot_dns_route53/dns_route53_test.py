@@ -6,6 +6,7 @@ import mock
 from botocore.exceptions import NoCredentialsError, ClientError
 
 from certbot import errors
+from certbot.plugins import dns_common
 from certbot.plugins import dns_test_common
 from certbot.plugins.dns_test_common import DOMAIN
 
@@ -18,30 +19,29 @@ class AuthenticatorTest(unittest.TestCase, dns_test_common.BaseAuthenticatorTest
 
         super(AuthenticatorTest, self).setUp()
 
-        self.config = mock.MagicMock()
+        self.config = mock.MagicMock(route53_zone_cache_ttl=0)
 
         self.auth = Authenticator(self.config, "route53")
 
     def test_perform(self):
-        self.auth._change_txt_record = mock.MagicMock()
+        self.auth._change_txt_records = mock.MagicMock(return_value=[1])
         self.auth._wait_for_change = mock.MagicMock()
 
         self.auth.perform([self.achall])
 
-        self.auth._change_txt_record.assert_called_once_with("UPSERT",
-                                                             '_acme-challenge.' + DOMAIN,
-                                                             mock.ANY)
+        self.auth._change_txt_records.assert_called_once_with(
+            "UPSERT", [('_acme-challenge.' + DOMAIN, mock.ANY)])
         self.assertEqual(self.auth._wait_for_change.call_count, 1)
 
     def test_perform_no_credentials_error(self):
-        self.auth._change_txt_record = mock.MagicMock(side_effect=NoCredentialsError)
+        self.auth._change_txt_records = mock.MagicMock(side_effect=NoCredentialsError)
 
         self.assertRaises(errors.PluginError,
                           self.auth.perform,
                           [self.achall])
 
     def test_perform_client_error(self):
-        self.auth._change_txt_record = mock.MagicMock(
+        self.auth._change_txt_records = mock.MagicMock(
             side_effect=ClientError({"Error": {"Code": "foo"}}, "bar"))
 
         self.assertRaises(errors.PluginError,
@@ -51,29 +51,50 @@ class AuthenticatorTest(unittest.TestCase, dns_test_common.BaseAuthenticatorTest
     def test_cleanup(self):
         self.auth._attempt_cleanup = True
 
-        self.auth._change_txt_record = mock.MagicMock()
+        self.auth._find_zone_id_for_domain = mock.MagicMock(return_value="EXAMPLE")
+        self.auth._change_zone_txt_records = mock.MagicMock()
 
         self.auth.cleanup([self.achall])
 
-        self.auth._change_txt_record.assert_called_once_with("DELETE",
-                                                             '_acme-challenge.'+DOMAIN,
-                                                             mock.ANY)
+        self.auth._change_zone_txt_records.assert_called_once_with(
+            "EXAMPLE", "DELETE", [('_acme-challenge.'+DOMAIN, mock.ANY)])
 
     def test_cleanup_no_credentials_error(self):
         self.auth._attempt_cleanup = True
 
-        self.auth._change_txt_record = mock.MagicMock(side_effect=NoCredentialsError)
+        self.auth._find_zone_id_for_domain = mock.MagicMock(side_effect=NoCredentialsError)
 
         self.auth.cleanup([self.achall])
 
     def test_cleanup_client_error(self):
         self.auth._attempt_cleanup = True
 
-        self.auth._change_txt_record = mock.MagicMock(
+        self.auth._find_zone_id_for_domain = mock.MagicMock(return_value="EXAMPLE")
+        self.auth._change_zone_txt_records = mock.MagicMock(
             side_effect=ClientError({"Error": {"Code": "foo"}}, "bar"))
 
         self.auth.cleanup([self.achall])
 
+    def test_cleanup_batch_zone_not_found(self):
+        zones = {"_acme-challenge.example.com": "EXAMPLE",
+                 "_acme-challenge.example.net": errors.PluginError("not found"),
+                 "_acme-challenge.example.org": NoCredentialsError(),
+                 "_acme-challenge.www.example.com": "EXAMPLE"}
+
+        def find_zone(name):  # pylint: disable=missing-docstring
+            if isinstance(zones[name], Exception):
+                raise zones[name]
+            return zones[name]
+
+        self.auth._find_zone_id_for_domain = mock.MagicMock(side_effect=find_zone)
+        self.auth._change_zone_txt_records = mock.MagicMock()
+
+        self.auth._cleanup_batch([(DOMAIN, name, "foo") for name in sorted(zones)])
+
+        self.auth._change_zone_txt_records.assert_called_once_with(
+            "EXAMPLE", "DELETE", [("_acme-challenge.example.com", "foo"),
+                                  ("_acme-challenge.www.example.com", "foo")])
+
 
 class ClientTest(unittest.TestCase):
     # pylint: disable=protected-access
@@ -118,6 +139,8 @@ class ClientTest(unittest.TestCase):
         self.config = mock.MagicMock()
 
         self.client = Authenticator(self.config, "route53")
+        self.client.sts.get_caller_identity = mock.MagicMock(
+            return_value={"Account": "123456789012"})
 
     def test_find_zone_id_for_domain(self):
         self.client.r53.get_paginator = mock.MagicMock()
@@ -153,6 +176,67 @@ class ClientTest(unittest.TestCase):
         result = self.client._find_zone_id_for_domain("foo.example.com")
         self.assertEqual(result, "FOO")
 
+    def test_find_zone_id_for_domain_shared_zone_cache(self):
+        self.client.r53.get_paginator = mock.MagicMock()
+        self.client.r53.get_paginator().paginate.return_value = [
+            {
+                "HostedZones": [
+                    self.EXAMPLE_COM_ZONE,
+                ]
+            }
+        ]
+
+        with dns_common.shared_zone_cache():
+            self.client._find_zone_id_for_domain("foo.example.com")
+            result = self.client._find_zone_id_for_domain("foo.example.com")
+
+        self.assertEqual(result, "EXAMPLE")
+        self.assertEqual(self.client.r53.get_paginator().paginate.call_count, 1)
+
+    def test_find_zone_id_for_domain_zone_cache_per_account(self):
+        from certbot_dns_route53.dns_route53 import Authenticator
+
+        other = Authenticator(self.config, "route53")
+        other.sts.get_caller_identity = mock.MagicMock(
+            return_value={"Account": "210987654321"})
+        for client, zone in ((self.client, self.EXAMPLE_COM_ZONE),
+                             (other, self.FOO_EXAMPLE_COM_ZONE)):
+            client.r53.get_paginator = mock.MagicMock()
+            client.r53.get_paginator().paginate.return_value = [{"HostedZones": [zone]}]
+
+        with dns_common.shared_zone_cache():
+            self.assertEqual(self.client._find_zone_id_for_domain("foo.example.com"), "EXAMPLE")
+            self.assertEqual(other._find_zone_id_for_domain("foo.example.com"), "FOO")
+            self.assertEqual(self.client._find_zone_id_for_domain("foo.example.com"), "EXAMPLE")
+
+        self.assertEqual(self.client.r53.get_paginator().paginate.call_count, 1)
+        self.assertEqual(other.r53.get_paginator().paginate.call_count, 1)
+        self.assertEqual(self.client.sts.get_caller_identity.call_count, 1)
+
+    def test_find_zone_id_for_domain_zone_cache_not_persisted(self):
+        self.config.route53_zone_cache_ttl = 0
+        self.client.r53.get_paginator = mock.MagicMock()
+        self.client.r53.get_paginator().paginate.return_value = [
+            {"HostedZones": [self.EXAMPLE_COM_ZONE]}]
+
+        self.assertEqual(self.client._find_zone_id_for_domain("foo.example.com"), "EXAMPLE")
+        self.assertFalse(self.client.sts.get_caller_identity.called)
+
+    def test_find_zone_id_for_domain_unknown_account(self):
+        self.client.sts.get_caller_identity.side_effect = NoCredentialsError
+        self.client.r53.get_paginator = mock.MagicMock()
+        self.client.r53.get_paginator().paginate.return_value = [
+            {"HostedZones": [self.EXAMPLE_COM_ZONE]}]
+
+        with dns_common.shared_zone_cache() as shared:
+            self.client._find_zone_id_for_domain("foo.example.com")
+            result = self.client._find_zone_id_for_domain("foo.example.com")
+
+        self.assertEqual(result, "EXAMPLE")
+        self.assertEqual(self.client.r53.get_paginator().paginate.call_count, 1)
+        self.assertEqual(self.client.sts.get_caller_identity.call_count, 1)
+        self.assertFalse(shared.find_zone("route53", "foo.example.com", lambda guess: None))
+
     def test_find_zone_id_for_domain_no_results(self):
         self.client.r53.get_paginator = mock.MagicMock()
         self.client.r53.get_paginator().paginate.return_value = []
@@ -228,6 +312,69 @@ class ClientTest(unittest.TestCase):
 
         self.assertEqual(call_count, 1)
 
+    def test_change_txt_records_batches_per_zone(self):
+        zones = {"_acme-challenge.example.com": "EXAMPLE",
+                 "_acme-challenge.www.example.com": "EXAMPLE",
+                 "_acme-challenge.example.net": "NET"}
+        self.client._find_zone_id_for_domain = mock.MagicMock(side_effect=zones.get)
+        self.client.r53.change_resource_record_sets = mock.MagicMock(
+            side_effect=lambda **kwargs: {"ChangeInfo": {"Id": kwargs["HostedZoneId"] + "-1"}})
+
+        change_ids = self.client._change_txt_records("UPSERT", [
+            ("_acme-challenge.example.com", "foo"),
+            ("_acme-challenge.example.net", "bar"),
+            ("_acme-challenge.www.example.com", "baz"),
+            ("_acme-challenge.example.com", "qux"),
+        ])
+
+        self.assertEqual(change_ids, ["EXAMPLE-1", "NET-1"])
+        calls = dict((c[1]["HostedZoneId"], c[1]["ChangeBatch"]["Changes"])
+                     for c in self.client.r53.change_resource_record_sets.call_args_list)
+        self.assertEqual(len(calls), 2)
+        changes = calls["EXAMPLE"]
+        self.assertEqual([c["ResourceRecordSet"]["Name"] for c in changes],
+                         ["_acme-challenge.example.com", "_acme-challenge.www.example.com"])
+        self.assertEqual(changes[0]["ResourceRecordSet"]["ResourceRecords"],
+                         [{"Value": '"foo"'}, {"Value": '"qux"'}])
+
+    def test_change_txt_record_client_error(self):
+        self.client._find_zone_id_for_domain = mock.MagicMock(return_value="EXAMPLE")
+        self.client.r53.change_resource_record_sets = mock.MagicMock(
+            side_effect=ClientError({"Error": {}}, "change_resource_record_sets"))
+
+        self.assertRaises(ClientError, self.client._change_txt_record, "UPSERT", DOMAIN, "foo")
+        self.assertFalse(self.client.sts.get_caller_identity.called)
+
+    def test_change_txt_record_client_error_invalidates_zone(self):
+        self.client.r53.get_paginator = mock.MagicMock()
+        self.client.r53.get_paginator().paginate.return_value = [
+            {"HostedZones": [self.EXAMPLE_COM_ZONE]}]
+        self.client.r53.change_resource_record_sets = mock.MagicMock(
+            side_effect=ClientError({"Error": {}}, "change_resource_record_sets"))
+
+        with dns_common.shared_zone_cache():
+            for _ in range(2):
+                self.assertRaises(ClientError, self.client._change_txt_record,
+                                  "UPSERT", "_acme-challenge.example.com", "foo")
+
+        self.assertEqual(self.client.r53.get_paginator().paginate.call_count, 2)
+        self.assertEqual(self.client.sts.get_caller_identity.call_count, 1)
+
+    def test_change_txt_records_delete_merged(self):
+        self.client._find_zone_id_for_domain = mock.MagicMock(return_value="EXAMPLE")
+        self.client._resource_records[DOMAIN] = [{"Value": '"foo"'}, {"Value": '"bar"'}]
+        self.client.r53.change_resource_record_sets = mock.MagicMock(
+            return_value={"ChangeInfo": {"Id": 1}})
+
+        self.client._change_txt_records("DELETE", [(DOMAIN, "foo"), (DOMAIN, "bar")])
+
+        call_args = self.client.r53.change_resource_record_sets.call_args_list[0][1]
+        changes = call_args["ChangeBatch"]["Changes"]
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["Action"], "DELETE")
+        self.assertEqual(changes[0]["ResourceRecordSet"]["ResourceRecords"],
+                         [{"Value": '"foo"'}, {"Value": '"bar"'}])
+
     def test_wait_for_change(self):
         self.client.r53.get_change = mock.MagicMock(
             side_effect=[{"ChangeInfo": {"Status": "PENDING"}},
@@ -7,7 +7,7 @@ version = '0.28.0.dev0'
 # acme/certbot version.
 install_requires = [
     'acme>=0.25.0',
-    'certbot>=0.21.1',
+    'certbot>=0.28.0.dev0',
     'boto3',
     'mock',
     'setuptools',
@@ -144,7 +144,9 @@ class NginxConfigurator(common.Installer):
         self.config_test()
 
 
-        self.parser = parser.NginxParser(self.conf('server-root'))
+        self.parser = parser.NginxParser(
+            self.conf('server-root'),
+            cache_dir=os.path.join(self.config.work_dir, constants.PARSE_CACHE_DIR))
 
         install_ssl_options_conf(self.mod_ssl_conf, self.updated_mod_ssl_conf_digest)
 
@@ -391,7 +393,7 @@ class NginxConfigurator(common.Installer):
         :rtype: list
 
         """
-        vhost_list = self.parser.get_vhosts()
+        vhost_list = self.parser.get_vhosts_by_name(target_name)
         return self._rank_matches_by_name_and_ssl(vhost_list, target_name)
 
     def _select_best_name_match(self, matches):
@@ -524,7 +526,7 @@ class NginxConfigurator(common.Installer):
         :rtype: list
 
         """
-        all_vhosts = self.parser.get_vhosts()
+        all_vhosts = self.parser.get_vhosts_by_name(target_name)
 
         def _vhost_matches(vhost, port):
             return self._vhost_listening_on_port_no_ssl(vhost, port)
@@ -970,7 +972,7 @@ class NginxConfigurator(common.Installer):
             checkpoint
 
         """
-        save_files = set(self.parser.parsed.keys())
+        save_files = set(self.parser.get_dirty_files())
         self.add_to_checkpoint(save_files, self.save_notes, temporary)
         self.save_notes = ""
 
@@ -28,6 +28,10 @@ distribution."""
 UPDATED_MOD_SSL_CONF_DIGEST = ".updated-options-ssl-nginx-conf-digest.txt"
 """Name of the hash of the updated or informed mod_ssl_conf as saved in `IConfig.config_dir`."""
 
+PARSE_CACHE_DIR = "nginx-parse-cache"
+"""Name of the directory where parsed configuration files are cached, as
+saved in `IConfig.work_dir`."""
+
 
 ALL_SSL_OPTIONS_HASHES = [
     '0f81093a1465e3d4eaa8b0c14e77b2a2e93568b0fc1351c2b87893a95f0de87c',
@@ -1,14 +1,18 @@
-"""Very low-level nginx config parser based on pyparsing."""
+"""Very low-level nginx config parser."""
 # Forked from https://github.com/fatiherikli/nginxparser (MIT Licensed)
-import copy
+import bisect
 import logging
+import re
 
 from pyparsing import (
     Literal, White, Forward, Group, Optional, OneOrMore, QuotedString, Regex, ZeroOrMore, Combine)
+from pyparsing import ParseException
 from pyparsing import stringEnd
 from pyparsing import restOfLine
 import six
 
+from acme.magic_typing import List # pylint: disable=unused-import, no-name-in-module
+
 logger = logging.getLogger(__name__)
 
 class RawNginxParser(object):
@@ -62,6 +66,121 @@ class RawNginxParser(object):
         """Returns the parsed tree as a list."""
         return self.parse().asList()
 
+class FastNginxParser(object):
+    """A hand-written parser accepting the grammar of `RawNginxParser`.
+
+    It produces the same tree as `RawNginxParser.as_list`, including
+    whitespace and comments, in a single pass over the source, and
+    raises the same `pyparsing.ParseException` on invalid input.
+
+    """
+    # Optional(White())
+    _space = re.compile(r"[ \t\r\n]+")
+    # QuotedString('"' or "'", multiline=True, escChar='\\')
+    _quoted = r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'"
+    _tail_tokenchars = r"(?:\$\{|[^{;\s])*"
+    # paren_quote_extend | tokenchars | quoted
+    _token = re.compile(
+        r"(?:{quoted})\){tail}|[^{{}};\s'\"]{tail}|{quoted}".format(
+            quoted=_quoted, tail=_tail_tokenchars),
+        re.DOTALL)
+    _rest_of_line = re.compile(r".*")
+
+    def __init__(self, source):
+        self.source = source
+
+    def parse(self):
+        """Returns the parsed tree.
+
+        :raises pyparsing.ParseException: if the source is invalid
+
+        """
+        contents, pos = self._contents(0)
+        if not any(isinstance(item, list) for item in contents):
+            self._fail(pos, "Expected a statement")
+        if pos != len(self.source):
+            self._fail(pos, "Expected end of text")
+        return contents
+
+    def as_list(self):
+        """Returns the parsed tree as a list."""
+        return self.parse()
+
+    def _fail(self, pos, msg):
+        raise ParseException(self.source, pos, msg)
+
+    def _contents(self, pos):
+        """Parse statements, and the whitespace after them, from pos."""
+        contents = []
+        while True:
+            statement, pos = self._statement(pos)
+            if statement is None:
+                break
+            contents.append(statement)
+        space = self._space.match(self.source, pos)
+        if space:
+            contents.append(space.group())
+            pos = space.end()
+        return contents, pos
+
+    def _statement(self, pos):
+        """Parse a comment, block or assignment starting at pos.
+
+        :returns: the statement or None if there is none at pos, and
+            the position after it
+        :rtype: tuple
+
+        """
+        space = self._space.match(self.source, pos)
+        start = space.end() if space else pos
+        if self.source.startswith("#", start):
+            rest = self._rest_of_line.match(self.source, start + 1)
+            comment = [space.group()] if space else []
+            return comment + ["#", rest.group()], rest.end()
+
+        tokens, end = self._tokens(pos)
+        if tokens is None:
+            return None, pos
+        if self.source.startswith(";", end):
+            return tokens, end + 1
+        if self.source.startswith("{", end):
+            contents, end = self._contents(end + 1)
+            if not self.source.startswith("}", end):
+                self._fail(end, "Expected }")
+            return [tokens, contents], end + 1
+        return self._fail(end, "Expected ; or {")
+
+    def _tokens(self, pos):
+        """Parse whitespace separated tokens starting at pos.
+
+        :returns: the tokens and whitespace or None if there is no
+            token at pos, and the position after them
+        :rtype: tuple
+
+        """
+        tokens = []
+        space = self._space.match(self.source, pos)
+        if space:
+            tokens.append(space.group())
+            pos = space.end()
+        token = self._token.match(self.source, pos)
+        if token is None:
+            return None, pos
+        tokens.append(token.group())
+        pos = token.end()
+        while True:
+            space = self._space.match(self.source, pos)
+            if space is None:
+                break
+            token = self._token.match(self.source, space.end())
+            if token is None:
+                tokens.append(space.group())
+                pos = space.end()
+                break
+            tokens.extend((space.group(), token.group()))
+            pos = token.end()
+        return tokens, pos
+
 class RawNginxDumper(object):
     # pylint: disable=too-few-public-methods
     """A class that dumps nginx configuration from the provided tree."""
@@ -75,23 +194,24 @@ class RawNginxDumper(object):
             if isinstance(b0, six.string_types):
                 yield b0
                 continue
-            item = copy.deepcopy(b0)
-            if spacey(item[0]):
-                yield item.pop(0) # indentation
-                if not item:
+            start = 0
+            if spacey(b0[0]):
+                yield b0[0] # indentation
+                start = 1
+                if len(b0) == 1:
                     continue
 
-            if isinstance(item[0], list): # block
-                yield "".join(item.pop(0)) + '{'
-                for parameter in item.pop(0):
+            if isinstance(b0[start], list): # block
+                yield "".join(b0[start]) + '{'
+                for parameter in b0[start + 1]:
                     for line in self.__iter__([parameter]): # negate "for b0 in blocks"
                         yield line
                 yield '}'
             else: # not a block - list of strings
                 semicolon = ";"
-                if isinstance(item[0], six.string_types) and item[0].strip() == '#': # comment
+                if isinstance(b0[start], six.string_types) and b0[start].strip() == '#': # comment
                     semicolon = ""
-                yield "".join(item) + semicolon
+                yield "".join(b0[start:]) + semicolon
 
     def __str__(self):
         """Return the parsed block as a string."""
@@ -109,7 +229,7 @@ def loads(source):
     :rtype: list
 
     """
-    return UnspacedList(RawNginxParser(source).as_list())
+    return UnspacedList(FastNginxParser(source).as_list())
 
 
 def load(_file):
@@ -151,23 +271,44 @@ spacey = lambda x: (isinstance(x, six.string_types) and x.isspace()) or x == ''
 class UnspacedList(list):
     """Wrap a list [of lists], making any whitespace entries magically invisible"""
 
+    generation = 0
+    """Number of modifications made to any UnspacedList so far, which lets
+    data derived from parsed trees tell whether it is out of date."""
+
     def __init__(self, list_source):
-        # ensure our argument is not a generator, and duplicate any sublists
-        self.spaced = copy.deepcopy(list(list_source))
+        # ensure our argument is not a generator; the sublists are rebuilt
+        # below, so the source itself is never modified nor shared
+        source = list(list_source)
+        self.spaced = list(source)
         self.dirty = False
+        # Whether some descendant was modified, kept up to date by the
+        # descendants themselves so that is_dirty() doesn't walk the tree
+        self._dirty_below = False
+        # UnspacedLists this list was added to
+        self._parents = []  # type: List[UnspacedList]
+        # Sorted positions of the whitespace entries of self.spaced, which
+        # map indexes in the unspaced list to positions in the spaced one
+        self._spaces = []  # type: List[int]
+        self._spaced_len = len(self.spaced)
 
         # Turn self into a version of the source list that has spaces removed
         # and all sub-lists also UnspacedList()ed
-        list.__init__(self, list_source)
-        for i, entry in reversed(list(enumerate(self))):
+        unspaced = []
+        comment = False
+        for i, entry in enumerate(source):
             if isinstance(entry, list):
-                sublist = UnspacedList(entry)
-                list.__setitem__(self, i, sublist)
-                self.spaced[i] = sublist.spaced
+                entry = UnspacedList(entry)
+                entry._parents.append(self)  # pylint: disable=protected-access
+                self.spaced[i] = entry.spaced
             elif spacey(entry):
+                self._spaces.append(i)
                 # don't delete comments
-                if "#" not in self[:i]:
-                    list.__delitem__(self, i)
+                if not comment:
+                    continue
+            elif entry == "#":
+                comment = True
+            unspaced.append(entry)
+        list.__init__(self, unspaced)
 
     def _coerce(self, inbound):
         """
@@ -185,30 +326,53 @@ class UnspacedList(list):
                 inbound = UnspacedList(inbound)
             return (inbound, inbound.spaced)
 
+    def _adopt(self, item):
+        """Record self as a parent of item if it is an UnspacedList."""
+        if isinstance(item, UnspacedList):
+            item._parents.append(self)  # pylint: disable=protected-access
 
     def insert(self, i, x):
         item, spaced_item = self._coerce(x)
+        spaces = self._space_positions()
         slicepos = self._spaced_position(i) if i < len(self) else len(self.spaced)
         self.spaced.insert(slicepos, spaced_item)
-        if not spacey(item):
+        first = bisect.bisect_left(spaces, slicepos)
+        spaces[first:] = [pos + 1 for pos in spaces[first:]]
+        if spacey(item):
+            spaces.insert(first, slicepos)
+        else:
             list.insert(self, i, item)
-        self.dirty = True
+            self._adopt(item)
+        self._spaced_len += 1
+        self._mark_dirty()
 
     def append(self, x):
         item, spaced_item = self._coerce(x)
+        spaces = self._space_positions()
         self.spaced.append(spaced_item)
-        if not spacey(item):
+        if spacey(item):
+            spaces.append(len(self.spaced) - 1)
+        else:
             list.append(self, item)
-        self.dirty = True
+            self._adopt(item)
+        self._spaced_len += 1
+        self._mark_dirty()
 
     def extend(self, x):
         item, spaced_item = self._coerce(x)
+        spaces = self._space_positions()
+        start = len(self.spaced)
         self.spaced.extend(spaced_item)
+        spaces.extend(pos for pos in six.moves.range(start, len(self.spaced))
+                      if spacey(self.spaced[pos]))
+        self._spaced_len = len(self.spaced)
         list.extend(self, item)
-        self.dirty = True
+        for child in item:
+            self._adopt(child)
+        self._mark_dirty()
 
     def __add__(self, other):
-        l = copy.deepcopy(self)
+        l = UnspacedList(self.spaced)
         l.extend(other)
         l.dirty = True
         return l
@@ -228,42 +392,87 @@ class UnspacedList(list):
         if isinstance(i, slice):
             raise NotImplementedError("Slice operations on UnspacedLists not yet implemented")
         item, spaced_item = self._coerce(value)
-        self.spaced.__setitem__(self._spaced_position(i), spaced_item)
-        if not spacey(item):
+        spaces = self._space_positions()
+        pos = self._spaced_position(i)
+        self.spaced.__setitem__(pos, spaced_item)
+        if spacey(item):
+            bisect.insort(spaces, pos)
+        else:
             list.__setitem__(self, i, item)
-        self.dirty = True
+            self._adopt(item)
+        self._mark_dirty()
 
     def __delitem__(self, i):
-        self.spaced.__delitem__(self._spaced_position(i))
+        spaces = self._space_positions()
+        pos = self._spaced_position(i)
+        self.spaced.__delitem__(pos)
         list.__delitem__(self, i)
-        self.dirty = True
-
-    def __deepcopy__(self, memo):
-        new_spaced = copy.deepcopy(self.spaced, memo=memo)
-        l = UnspacedList(new_spaced)
+        first = bisect.bisect_left(spaces, pos)
+        spaces[first:] = [space - 1 for space in spaces[first:]]
+        self._spaced_len -= 1
+        self._mark_dirty()
+
+    def __deepcopy__(self, memo):  # pylint: disable=unused-argument
+        # The constructor rebuilds every sublist of the spaced list, and the
+        # other entries are immutable strings, so nothing is left shared
+        l = UnspacedList(self.spaced)
         l.dirty = self.dirty
         return l
 
+    def _mark_dirty(self):
+        self.dirty = True
+        UnspacedList.generation += 1
+        parents = list(self._parents)
+        while parents:
+            parent = parents.pop()
+            # ancestors of a parent marked before are already marked
+            if not parent._dirty_below:  # pylint: disable=protected-access
+                parent._dirty_below = True  # pylint: disable=protected-access
+                parents.extend(parent._parents)  # pylint: disable=protected-access
+
     def is_dirty(self):
-        """Recurse through the parse tree to figure out if any sublists are dirty"""
-        if self.dirty:
-            return True
-        return any((isinstance(x, UnspacedList) and x.is_dirty() for x in self))
+        """Figure out if this list or any of its sublists are dirty"""
+        return self.dirty or self._dirty_below
+
+    def mark_clean(self):
+        """Mark this list and its sublists as not modified, eg once saved"""
+        lists = [self]
+        while lists:
+            l = lists.pop()
+            if l.is_dirty():
+                l.dirty = l._dirty_below = False  # pylint: disable=protected-access
+                lists.extend(x for x in l if isinstance(x, UnspacedList))
+
+    def _space_positions(self):
+        """Get the sorted positions of the whitespace entries of self.spaced.
+
+        The positions are recomputed if self.spaced was modified directly.
+
+        """
+        if self._spaced_len != len(self.spaced):
+            self._spaces = [pos for pos, entry in enumerate(self.spaced) if spacey(entry)]
+            self._spaced_len = len(self.spaced)
+        return self._spaces
 
     def _spaced_position(self, idx):
         "Convert from indexes in the unspaced list to positions in the spaced one"
-        pos = spaces = 0
         # Normalize indexes like list[-1] etc, and save the result
         if idx < 0:
             idx = len(self) + idx
         if not 0 <= idx < len(self):
             raise IndexError("list index out of range")
-        idx0 = idx
-        # Count the number of spaces in the spaced list before idx in the unspaced one
-        while idx != -1:
-            if spacey(self.spaced[pos]):
-                spaces += 1
+        # Count the number of spaces in the spaced list before idx in the
+        # unspaced one. spaces[k] - k, the number of other entries before the
+        # k-th space, never decreases, so the count is found by bisection.
+        spaces = self._space_positions()
+        low, high = 0, len(spaces)
+        while low < high:
+            mid = (low + high) // 2
+            if spaces[mid] - mid <= idx:
+                low = mid + 1
             else:
-                idx -= 1
-            pos += 1
-        return idx0 + spaces
+                high = mid
+        pos = idx + low
+        if pos >= len(self.spaced):
+            raise IndexError("list index out of range")
+        return pos
@@ -2,18 +2,23 @@
 import copy
 import functools
 import glob
+import hashlib
+import json
 import logging
 import os
 import pyparsing
 import re
+import shutil
+import tempfile
 
 import six
 
 from certbot import errors
+from certbot import util
 
 from certbot_nginx import obj
 from certbot_nginx import nginxparser
-from acme.magic_typing import Union, Dict, Set, Any, List, Tuple # pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Union, Dict, Set, Any, List, Tuple, Optional # pylint: disable=unused-import, no-name-in-module
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +29,17 @@ class NginxParser(object):
     :ivar str root: Normalized absolute path to the server root
         directory. Without trailing slash.
     :ivar dict parsed: Mapping of file paths to parsed trees
+    :ivar str cache_dir: Directory where parsed trees are cached across
+        runs, or None to always parse files
 
     """
 
-    def __init__(self, root):
+    def __init__(self, root, cache_dir=None):
         self.parsed = {} # type: Dict[str, Union[List, nginxparser.UnspacedList]]
         self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir
+        self._vhost_index = None # type: Optional[VhostIndex]
+        self._vhost_index_generation = None # type: Optional[int]
         self.config_root = self._find_config_root()
 
         # Parse nginx.conf and included files.
@@ -42,6 +52,7 @@ class NginxParser(object):
 
         """
         self.parsed = {}
+        self._vhost_index = None
         self._parse_recursively(self.config_root)
 
     def _parse_recursively(self, filepath):
@@ -88,19 +99,22 @@ class NginxParser(object):
     def _build_addr_to_ssl(self):
         """Builds a map from address to whether it listens on ssl in any server block
         """
-        servers = self._get_raw_servers()
+        return self._get_vhost_index().addr_to_ssl
 
-        addr_to_ssl = {} # type: Dict[Tuple[str, str], bool]
-        for filename in servers:
-            for server, _ in servers[filename]:
-                # Parse the server block to save addr info
-                parsed_server = _parse_server_raw(server)
-                for addr in parsed_server['addrs']:
-                    addr_tuple = addr.normalized_tuple()
-                    if addr_tuple not in addr_to_ssl:
-                        addr_to_ssl[addr_tuple] = addr.ssl
-                    addr_to_ssl[addr_tuple] = addr.ssl or addr_to_ssl[addr_tuple]
-        return addr_to_ssl
+    def _get_vhost_index(self):
+        """Get the index of the virtual hosts of the parsed configuration.
+
+        The index is built once and reused until a parsed tree is
+        modified or more files are parsed.
+
+        :rtype: `VhostIndex`
+
+        """
+        if (self._vhost_index is None or
+                self._vhost_index_generation != nginxparser.UnspacedList.generation):
+            self._vhost_index = VhostIndex(self._get_raw_servers())
+            self._vhost_index_generation = nginxparser.UnspacedList.generation
+        return self._vhost_index
 
     def _get_raw_servers(self):
         # pylint: disable=cell-var-from-loop
@@ -134,37 +148,21 @@ class NginxParser(object):
         :rtype: list
 
         """
-        enabled = True  # We only look at enabled vhosts for now
-        servers = self._get_raw_servers()
+        return list(self._get_vhost_index().vhosts)
 
-        vhosts = []
-        for filename in servers:
-            for server, path in servers[filename]:
-                # Parse the server block into a VirtualHost object
-
-                parsed_server = _parse_server_raw(server)
-                vhost = obj.VirtualHost(filename,
-                                        parsed_server['addrs'],
-                                        parsed_server['ssl'],
-                                        enabled,
-                                        parsed_server['names'],
-                                        server,
-                                        path)
-                vhosts.append(vhost)
+    def get_vhosts_by_name(self, target_name):
+        """Gets the 'virtual hosts' with a server name that may match target_name.
 
-        self._update_vhosts_addrs_ssl(vhosts)
+        Every vhost for which `get_best_match` finds a match for
+        target_name is returned, without looking at the others.
 
-        return vhosts
+        :param str target_name: The name to match
+        :returns: List of :class:`~certbot_nginx.obj.VirtualHost`
+            objects, in the order of `get_vhosts`
+        :rtype: list
 
-    def _update_vhosts_addrs_ssl(self, vhosts):
-        """Update a list of raw parsed vhosts to include global address sslishness
         """
-        addr_to_ssl = self._build_addr_to_ssl()
-        for vhost in vhosts:
-            for addr in vhost.addrs:
-                addr.ssl = addr_to_ssl[addr.normalized_tuple()]
-                if addr.ssl:
-                    vhost.ssl = True
+        return self._get_vhost_index().get_candidates(target_name)
 
     def _get_included_directives(self, block):
         """Returns array with the "include" directives expanded out by
@@ -204,15 +202,64 @@ class NginxParser(object):
                 continue
             try:
                 with open(item) as _file:
-                    parsed = nginxparser.load(_file)
-                    self.parsed[item] = parsed
-                    trees.append(parsed)
+                    source = _file.read()
+                parsed = self._load_cached_tree(item, source)
+                if parsed is None:
+                    parsed = nginxparser.loads(source)
+                    self._save_cached_tree(item, source, parsed)
+                self.parsed[item] = parsed
+                self._vhost_index = None
+                trees.append(parsed)
             except IOError:
                 logger.warning("Could not open file: %s", item)
             except pyparsing.ParseException as err:
                 logger.debug("Could not parse file: %s due to %s", item, err)
         return trees
 
+    def _cache_path(self, filepath):
+        """Path of the cached tree of filepath in cache_dir."""
+        key = hashlib.sha256(filepath.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _load_cached_tree(self, filepath, source):
+        """Load the cached tree of filepath, if it was parsed from source.
+
+        :param str filepath: Nginx config file path
+        :param str source: Current contents of the file
+        :returns: the parsed tree or None if it is not cached
+        :rtype: nginxparser.UnspacedList
+
+        """
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._cache_path(filepath)) as f:
+                cached = json.load(f)
+            if cached["path"] != filepath or cached["sha256"] != _source_digest(source):
+                return None
+            tree = cached["tree"]
+            if six.PY2:  # pragma: no cover
+                tree = _native_strings(tree)
+            return nginxparser.UnspacedList(tree)
+        except (IOError, OSError, ValueError, KeyError, TypeError, UnicodeError):
+            return None
+
+    def _save_cached_tree(self, filepath, source, tree):
+        """Cache the tree parsed from the source of filepath."""
+        if self.cache_dir is None:
+            return
+        cached = {"path": filepath, "sha256": _source_digest(source), "tree": tree.spaced}
+        try:
+            # On Python 2, this fails for files that aren't UTF-8
+            data = json.dumps(cached)
+            util.make_or_verify_dir(self.cache_dir, 0o700)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.rename(temp_path, self._cache_path(filepath))
+        except (IOError, OSError, ValueError, UnicodeError, errors.Error) as err:
+            logger.debug("Unable to cache the parsed tree of %s: %s", filepath, err)
+
     def _find_config_root(self):
         """Return the Nginx Configuration Root file."""
         location = ['nginx.conf']
@@ -224,29 +271,36 @@ class NginxParser(object):
         raise errors.NoInstallationError(
             "Could not find Nginx root configuration file (nginx.conf)")
 
+    def get_dirty_files(self):
+        """Get the parsed files that were modified since they were saved.
+
+        :returns: paths of the modified files
+        :rtype: list
+
+        """
+        return [filename for filename, tree in six.iteritems(self.parsed) if tree.is_dirty()]
+
     def filedump(self, ext='tmp', lazy=True):
         """Dumps parsed configurations into files.
 
+        Each file is replaced atomically. Files dumped in place are then
+        marked as saved, so later calls only dump them if they are modified
+        again.
+
         :param str ext: The file extension to use for the dumped files. If
             empty, this overrides the existing conf files.
         :param bool lazy: Only write files that have been modified
 
         """
-        # Best-effort atomicity is enforced above us by reverter.py
-        for filename in self.parsed:
+        filenames = self.get_dirty_files() if lazy else list(self.parsed)
+        for filename in filenames:
             tree = self.parsed[filename]
+            out = nginxparser.dumps(tree)
             if ext:
                 filename = filename + os.path.extsep + ext
-            try:
-                if lazy and not tree.is_dirty():
-                    continue
-                out = nginxparser.dumps(tree)
-                logger.debug('Writing nginx conf tree to %s:\n%s', filename, out)
-                with open(filename, 'w') as _file:
-                    _file.write(out)
-
-            except IOError:
-                logger.error("Could not open file for writing: %s", filename)
+            logger.debug('Writing nginx conf tree to %s:\n%s', filename, out)
+            if _write_file(filename, out) and not ext:
+                tree.mark_clean()
 
     def parse_server(self, server):
         """Parses a list of server directives, accounting for global address sslishness.
@@ -349,8 +403,17 @@ class NginxParser(object):
             if not isinstance(result, list) or len(result) != 2:
                 raise errors.MisconfigurationError("Not a server block.")
             result = result[1]
+            index_is_current = (
+                self._vhost_index is not None and
+                self._vhost_index_generation == nginxparser.UnspacedList.generation)
             block_func(result)
 
+            # Only this server block changed, so the index can be updated
+            # instead of being rebuilt from every parsed tree
+            if index_is_current and self._vhost_index.update(
+                    filename, vhost.path, self._get_included_directives(result)):
+                self._vhost_index_generation = nginxparser.UnspacedList.generation
+
             self._update_vhost_based_on_new_directives(vhost, result)
         except errors.MisconfigurationError as err:
             raise errors.MisconfigurationError("Problem in %s: %s" % (filename, str(err)))
@@ -409,6 +472,146 @@ class NginxParser(object):
         return new_vhost
 
 
+class VhostIndex(object):
+    """Virtual hosts of a parsed configuration, indexed by server name.
+
+    Lookups follow the name matching rules of `get_best_match`: exact
+    names are found in a dict, wildcard names in dicts keyed by the part
+    of the name around the wildcard, which are probed with each suffix or
+    prefix of the target name, and regular expressions are compiled once.
+
+    :ivar list vhosts: All :class:`~certbot_nginx.obj.VirtualHost` objects
+    :ivar dict addr_to_ssl: Map from normalized address to whether any
+        server block listens on it with ssl
+
+    """
+
+    def __init__(self, servers):
+        """Initialize the index.
+
+        :param dict servers: Map from file path to the list of
+            (server block, path) tuples found in it, as returned by
+            `NginxParser._get_raw_servers`
+
+        """
+        self.vhosts = [] # type: List[obj.VirtualHost]
+        self.addr_to_ssl = {} # type: Dict[Tuple[str, str], bool]
+        # sslishness of each vhost and its addresses on their own
+        self._own_ssl = [] # type: List[Tuple[bool, List[Tuple[Tuple[str, str], bool]]]]
+        self._positions = {} # type: Dict[Tuple[str, Tuple[int, ...]], int]
+        self._exact = {} # type: Dict[str, List[int]]
+        self._wildcard_start = {} # type: Dict[str, List[int]]
+        self._wildcard_end = {} # type: Dict[str, List[int]]
+        self._catch_all = [] # type: List[int]
+        self._regexes = [] # type: List[Tuple[Any, int]]
+
+        enabled = True  # We only look at enabled vhosts for now
+        for filename in servers:
+            for server, path in servers[filename]:
+                parsed_server = _parse_server_raw(server)
+                vhost = obj.VirtualHost(filename,
+                                        parsed_server['addrs'],
+                                        parsed_server['ssl'],
+                                        enabled,
+                                        parsed_server['names'],
+                                        server,
+                                        path)
+                self._positions[(filename, tuple(path))] = len(self.vhosts)
+                self.vhosts.append(vhost)
+                self._own_ssl.append(_own_ssl(parsed_server))
+        self._apply_addr_ssl()
+        self._index_names()
+
+    def update(self, filep, path, server):
+        """Update the vhost of a server block after it was modified.
+
+        :param str filep: Path of the file holding the server block
+        :param list path: Indices of the server block in the file
+        :param list server: The new directives of the server block, with
+            includes expanded
+        :returns: Whether the server block was indexed
+        :rtype: bool
+
+        """
+        position = self._positions.get((filep, tuple(path)))
+        if position is None:
+            return False
+        parsed_server = _parse_server_raw(server)
+        vhost = self.vhosts[position]
+        vhost.addrs = parsed_server['addrs']
+        vhost.names = parsed_server['names']
+        vhost.raw = server
+        self._own_ssl[position] = _own_ssl(parsed_server)
+        self._apply_addr_ssl()
+        self._index_names()
+        return True
+
+    def get_candidates(self, target_name):
+        """Get the vhosts with a name that may match target_name.
+
+        :param str target_name: The name to match
+        :returns: the vhosts, in the order of `vhosts`
+        :rtype: list
+
+        """
+        positions = set(self._catch_all)
+        positions.update(self._exact.get(target_name, ()))
+        positions.update(self._exact.get('.' + target_name, ()))
+        for i, char in enumerate(target_name):
+            if char == '.':
+                positions.update(self._wildcard_start.get(target_name[i + 1:], ()))
+                positions.update(self._wildcard_end.get(target_name[:i], ()))
+        for regex, position in self._regexes:
+            if position not in positions and regex.match(target_name):
+                positions.add(position)
+        return [self.vhosts[position] for position in sorted(positions)]
+
+    def _apply_addr_ssl(self):
+        """Apply global address sslishness to every vhost."""
+        self.addr_to_ssl = {}
+        for _, addrs in self._own_ssl:
+            for addr_tuple, ssl in addrs:
+                self.addr_to_ssl[addr_tuple] = ssl or self.addr_to_ssl.get(addr_tuple, False)
+        for vhost, (ssl, _) in zip(self.vhosts, self._own_ssl):
+            vhost.ssl = ssl
+            for addr in vhost.addrs:
+                addr.ssl = self.addr_to_ssl[addr.normalized_tuple()]
+                if addr.ssl:
+                    vhost.ssl = True
+
+    def _index_names(self):
+        """Index the server names of every vhost."""
+        self._exact = {}
+        self._wildcard_start = {}
+        self._wildcard_end = {}
+        self._catch_all = []
+        self._regexes = []
+        for position, vhost in enumerate(self.vhosts):
+            for name in vhost.names:
+                if name == '*':
+                    self._catch_all.append(position)
+                    continue
+                self._exact.setdefault(name, []).append(position)
+                labels = name.split('.')
+                if labels[0] in ('*', ''):
+                    self._wildcard_start.setdefault(
+                        '.'.join(labels[1:]), []).append(position)
+                if labels[-1] in ('*', ''):
+                    self._wildcard_end.setdefault(
+                        '.'.join(labels[:-1]), []).append(position)
+                if len(name) >= 2 and name[0] == '~':
+                    try:
+                        self._regexes.append((re.compile(name[1:]), position))
+                    except re.error:  # pragma: no cover
+                        pass
+
+
+def _own_ssl(parsed_server):
+    """Sslishness of a parsed server block and its addresses on their own."""
+    return (parsed_server['ssl'],
+            [(addr.normalized_tuple(), addr.ssl) for addr in parsed_server['addrs']])
+
+
 def _parse_ssl_options(ssl_options):
     if ssl_options is not None:
         try:
@@ -420,6 +623,104 @@ def _parse_ssl_options(ssl_options):
             logger.debug("Could not parse file: %s due to %s", ssl_options, err)
     return []
 
+def _source_digest(source):
+    """sha256 digest of the contents of a config file."""
+    if isinstance(source, six.text_type):
+        source = source.encode("utf-8")
+    return hashlib.sha256(source).hexdigest()
+
+
+def _write_file(filename, contents):
+    """Atomically replace the contents of filename.
+
+    The contents are written to a temporary file in the directory of the
+    file, symlinks followed, which is then given the mode and owner of the
+    file and renamed over it. When that temporary file can't be created,
+    or given the owner of the file, as when a file of another user is
+    writable by our group, the file is written in place instead.
+
+    :param str filename: Path of the file
+    :param str contents: New contents of the file
+    :returns: whether the file was written
+    :rtype: bool
+
+    """
+    path = os.path.realpath(filename)
+    file_stat = os.stat(path) if os.path.exists(path) else None
+    if file_stat is not None and not _can_chown(file_stat):
+        logger.debug("Writing %s in place as its owner can't be kept", filename)
+        return _write_file_in_place(filename, path, contents)
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=os.path.basename(path) + ".")
+    except OSError as err:
+        logger.debug("Writing %s in place: %s", filename, err)
+        return _write_file_in_place(filename, path, contents)
+    try:
+        with os.fdopen(fd, "w") as _file:
+            _file.write(contents)
+        if file_stat is None:
+            os.chmod(temp_path, 0o644)
+        else:
+            shutil.copymode(path, temp_path)
+            temp_stat = os.stat(temp_path)
+            owner = (file_stat.st_uid, file_stat.st_gid)
+            if owner != (temp_stat.st_uid, temp_stat.st_gid):
+                try:
+                    os.chown(temp_path, *owner)
+                except OSError as err:
+                    logger.debug("Writing %s in place as its owner can't be kept: %s",
+                                 filename, err)
+                    os.remove(temp_path)
+                    return _write_file_in_place(filename, path, contents)
+        os.rename(temp_path, path)
+    except (IOError, OSError):
+        logger.error("Could not open file for writing: %s", filename)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+def _can_chown(file_stat):
+    """Can we give a file we create the owner and group of file_stat?"""
+    euid = os.geteuid()
+    if euid == 0:
+        return True
+    return file_stat.st_uid == euid and (
+        file_stat.st_gid == os.getegid() or file_stat.st_gid in os.getgroups())
+
+
+def _write_file_in_place(filename, path, contents):
+    """Overwrite the contents of path, the real path of filename.
+
+    :returns: whether the file was written
+    :rtype: bool
+
+    """
+    try:
+        with open(path, "w") as _file:
+            _file.write(contents)
+    except IOError:
+        logger.error("Could not open file for writing: %s", filename)
+        return False
+    return True
+
+
+def _native_strings(tree):
+    """Convert the strings of a tree loaded from JSON to native strings.
+
+    On Python 2, json returns unicode strings while the parser produces
+    byte strings, which the cached tree was encoded from as UTF-8.
+
+    """
+    if isinstance(tree, list):
+        return [_native_strings(entry) for entry in tree]
+    if isinstance(tree, six.text_type):
+        return tree.encode("utf-8")
+    return tree
+
+
 def _do_for_subarray(entry, condition, func, path=None):
     """Executes a function for a subarray of a nested array if it matches
     the given condition.
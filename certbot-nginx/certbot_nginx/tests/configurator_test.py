@@ -446,6 +446,15 @@ class NginxConfiguratorTest(util.NginxTest):
         mock_add_to_checkpoint.side_effect = errors.ReverterError("foo")
         self.assertRaises(errors.PluginError, self.config.save)
 
+    @mock.patch("certbot.reverter.Reverter.add_to_checkpoint")
+    def test_save_modified_files(self, mock_add_to_checkpoint):
+        example_com = self.config.parser.abs_path('sites-enabled/example.com')
+        self.config.parser.parsed[example_com].append(['root', ' ', '/srv/www'])
+        self.config.save()
+        mock_add_to_checkpoint.assert_called_once_with(set([example_com]), mock.ANY)
+        self.config.save()
+        mock_add_to_checkpoint.assert_called_with(set(), mock.ANY)
+
     def test_get_snakeoil_paths(self):
         # pylint: disable=protected-access
         cert, key = self.config._get_snakeoil_paths()
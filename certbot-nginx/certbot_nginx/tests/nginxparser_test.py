@@ -1,13 +1,14 @@
 """Test for certbot_nginx.nginxparser."""
 import copy
 import operator
+import os
 import tempfile
 import unittest
 
 from pyparsing import ParseException
 
 from certbot_nginx.nginxparser import (
-    RawNginxParser, loads, load, dumps, dump, UnspacedList)
+    FastNginxParser, RawNginxParser, loads, load, dumps, dump, UnspacedList)
 from certbot_nginx.tests import util
 
 
@@ -350,6 +351,38 @@ class TestRawNginxParser(unittest.TestCase):
         self.assertRaises(ParseException, loads, "blag${dfgdf{g};")
 
 
+class TestFastNginxParser(unittest.TestCase):
+    """Test that the hand-written parser matches the pyparsing one."""
+
+    def _assert_parity(self, source):
+        try:
+            expected = RawNginxParser(source).as_list()
+        except ParseException:
+            self.assertRaises(ParseException, FastNginxParser(source).as_list)
+        else:
+            self.assertEqual(FastNginxParser(source).as_list(), expected)
+
+    def test_testdata(self):
+        testdata = os.path.dirname(util.get_data_filename("nginx.conf"))
+        count = 0
+        for dirpath, _, filenames in os.walk(testdata):
+            for filename in filenames:
+                with open(os.path.join(dirpath, filename)) as f:
+                    self._assert_parity(f.read())
+                count += 1
+        self.assertTrue(count > 10)
+
+    def test_edge_cases(self):
+        for source in [
+                'root /test;', 'root /test;foo bar;', 'foo {}', 'location /foo{}',
+                'foo { bar foo ; }', 'foo { bar {} }', ' \n# comment\n', '#',
+                'a #b;', 'a;#b', 'foo { # c }\n}', '"a b";', "'a\\'b';",
+                '"a")b c;', '"a"b;', 'a"b" c;', 'a}b;', 'blag${x}y;', 'a ${x};',
+                'a\tb\r\n;  ', 'a {b;} c;\n', '', '   ', ';', 'a', 'a {', 'a }',
+                'a {b}', '}', 'a;}', '{}', 'a\fb;', '"unclosed;']:
+            self._assert_parity(source)
+
+
 class TestUnspacedList(unittest.TestCase):
     """Test the UnspacedList data structure"""
     def setUp(self):
@@ -437,6 +470,46 @@ class TestUnspacedList(unittest.TestCase):
         ul4[1][2] = 5
         self.assertEqual(True, ul4.is_dirty())
 
+    def test_is_dirty_nested(self):
+        ul3 = UnspacedList([["server"], [["\n", "listen", " ", "80"], ["location"], [[]]]])
+        ul4 = UnspacedList([])
+        ul4.append(ul3)
+        ul4.dirty = False
+        self.assertEqual(False, ul3.is_dirty())
+        ul3[1][2][0].append("deep")
+        self.assertEqual(False, ul3[1][0].is_dirty())
+        self.assertEqual(True, ul3.is_dirty())
+        self.assertEqual(True, ul4.is_dirty())
+
+    def test_construction_copies(self):
+        l = ["\n", ["listen", " ", "80"], " "]
+        ul3 = UnspacedList(l)
+        ul3[0].append("ssl")
+        self.assertEqual(l, ["\n", ["listen", " ", "80"], " "])
+        ul4 = copy.deepcopy(ul3)
+        ul4[0].append("http2")
+        self.assertEqual(ul3, [["listen", "80", "ssl"]])
+        self.assertEqual(ul4.spaced, ["\n", ["listen", " ", "80", "ssl", "http2"], " "])
+
+    def test_positions(self):
+        ul3 = UnspacedList(["\n", "a", " ", " ", "b", "\n", "c", " "])
+        ul3.insert(1, " ")
+        ul3.insert(1, "d")
+        del ul3[0]
+        ul3[2] = "e"
+        ul3.append(" ")
+        ul3.append("f")
+        self.assertEqual(ul3, ["d", "b", "e", "f"])
+        self.assertEqual(ul3.spaced, ["\n", " ", " ", " ", "d", "b", "\n", "e", " ", " ", "f"])
+        self.assertEqual(ul3[-1], "f")
+        self.assertRaises(IndexError, ul3.__setitem__, 4, "g")
+
+    def test_positions_spaced_modified(self):
+        ul3 = copy.deepcopy(self.ul)
+        ul3.spaced.insert(0, " ")
+        ul3[1] = "z"
+        self.assertEqual(ul3.spaced, [" "] + self.a[:3] + ["z"])
+
 
 if __name__ == '__main__':
     unittest.main()  # pragma: no cover
@@ -5,6 +5,10 @@ import re
 import shutil
 import unittest
 
+import mock
+import pyparsing
+import six
+
 from certbot import errors
 
 from certbot_nginx import nginxparser
@@ -86,6 +90,162 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
                                         ['server_name', 'example.*']]]],
                          parsed[0])
 
+    def test_filedump_lazy(self):
+        nparser = parser.NginxParser(self.config_path)
+        example_com = nparser.abs_path('sites-enabled/example.com')
+        nparser.parsed[example_com][0][1].append(['\n    ', 'root', ' ', '/srv/www'])
+        self.assertEqual([example_com], nparser.get_dirty_files())
+        with mock.patch("certbot_nginx.parser.nginxparser.dumps",
+                        side_effect=nginxparser.dumps) as mock_dumps:
+            nparser.filedump(ext='')
+            nparser.filedump(ext='')
+        self.assertEqual(1, mock_dumps.call_count)
+        self.assertEqual([], nparser.get_dirty_files())
+        self.assertEqual(nparser.parsed[example_com],
+                         parser.NginxParser(self.config_path).parsed[example_com])
+
+    def test_filedump_atomic(self):
+        path = os.path.join(self.temp_dir, "site.conf")
+        link = os.path.join(self.temp_dir, "site-link.conf")
+        with open(path, "w") as f:
+            f.write("old")
+        os.chmod(path, 0o640)
+        os.symlink(path, link)
+        # pylint: disable=protected-access
+        self.assertTrue(parser._write_file(link, "new"))
+        self.assertTrue(os.path.islink(link))
+        with open(path) as f:
+            self.assertEqual("new", f.read())
+        self.assertEqual(0o640, os.stat(path).st_mode & 0o777)
+        self.assertEqual(["site-link.conf", "site.conf"],
+                         sorted(f for f in os.listdir(self.temp_dir) if f.startswith("site")))
+
+    def _write_file_in_place(self, *patchers):
+        path = os.path.join(self.temp_dir, "site.conf")
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                f.write("old")
+        inode = os.stat(path).st_ino
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # pylint: disable=protected-access
+        self.assertTrue(parser._write_file(path, "new"))
+        with open(path) as f:
+            self.assertEqual("new", f.read())
+        self.assertEqual(inode, os.stat(path).st_ino)
+        self.assertEqual(["site.conf"],
+                         [f for f in os.listdir(self.temp_dir) if f.startswith("site")])
+
+    def test_filedump_other_owner(self):
+        self._write_file_in_place(
+            mock.patch("certbot_nginx.parser._can_chown", return_value=False))
+
+    def test_filedump_directory_not_writable(self):
+        self._write_file_in_place(
+            mock.patch("certbot_nginx.parser.tempfile.mkstemp", side_effect=OSError))
+
+    @unittest.skipUnless(hasattr(os, "geteuid") and os.geteuid() == 0, "requires root")
+    def test_filedump_chown_error(self):
+        path = os.path.join(self.temp_dir, "site.conf")
+        with open(path, "w") as f:
+            f.write("old")
+        os.chown(path, 12345, 12345)
+        self._write_file_in_place(
+            mock.patch("certbot_nginx.parser.os.chown", side_effect=OSError))
+        self.assertEqual((12345, 12345), (os.stat(path).st_uid, os.stat(path).st_gid))
+
+    @mock.patch("certbot_nginx.parser.os")
+    def test_can_chown(self, mock_os):
+        # pylint: disable=protected-access
+        mock_os.geteuid.return_value = 0
+        self.assertTrue(parser._can_chown(mock.MagicMock(st_uid=1000, st_gid=1000)))
+        mock_os.geteuid.return_value = 1000
+        mock_os.getegid.return_value = 1000
+        mock_os.getgroups.return_value = [1000, 50]
+        self.assertTrue(parser._can_chown(mock.MagicMock(st_uid=1000, st_gid=50)))
+        self.assertFalse(parser._can_chown(mock.MagicMock(st_uid=1000, st_gid=60)))
+        self.assertFalse(parser._can_chown(mock.MagicMock(st_uid=0, st_gid=1000)))
+
+    @mock.patch("certbot_nginx.parser.logger")
+    def test_filedump_error(self, mock_logger):
+        nparser = parser.NginxParser(self.config_path)
+        example_com = nparser.abs_path('sites-enabled/example.com')
+        nparser.parsed[example_com].append(['root', ' ', '/srv/www'])
+        with mock.patch("certbot_nginx.parser.os.rename", side_effect=OSError):
+            nparser.filedump(ext='')
+        self.assertTrue(mock_logger.error.called)
+        self.assertEqual([example_com], nparser.get_dirty_files())
+        self.assertEqual([], glob.glob(example_com + ".*"))
+
+    def test_parse_cache(self):
+        cache_dir = os.path.join(self.work_dir, "nginx-parse-cache")
+        expected = parser.NginxParser(self.config_path).parsed
+        nparser = parser.NginxParser(self.config_path, cache_dir=cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), len(expected))
+
+        # files that cannot be parsed are not cached
+        with mock.patch("certbot_nginx.parser.nginxparser.loads",
+                        side_effect=pyparsing.ParseException("")):
+            nparser.load()
+        self.assertEqual(nparser.parsed, expected)
+        for filename, tree in nparser.parsed.items():
+            self.assertEqual(tree.spaced, expected[filename].spaced)
+
+    def test_parse_cache_non_ascii(self):
+        cache_dir = os.path.join(self.work_dir, "nginx-parse-cache")
+        nparser = parser.NginxParser(self.config_path, cache_dir=cache_dir)
+        server_conf = nparser.abs_path('server.conf')
+        source = u'# caf\xe9\nserver_name caf\xe9.example.com;\n'
+        if six.PY2:  # pragma: no cover
+            source = source.encode('utf-8')
+        # pylint: disable=protected-access
+        nparser._save_cached_tree(server_conf, source, nginxparser.loads(source))
+        tree = nparser._load_cached_tree(server_conf, source)
+        self.assertEqual(tree.spaced, nginxparser.loads(source).spaced)
+        for directive in tree.spaced:
+            self.assertTrue(all(isinstance(entry, str) for entry in directive))
+        tree.append(['root', ' ', '/srv/www'])
+        self.assertTrue(isinstance(nginxparser.dumps(tree), str))
+
+    def test_parse_cache_unencodable(self):
+        cache_dir = os.path.join(self.work_dir, "nginx-parse-cache")
+        nparser = parser.NginxParser(self.config_path, cache_dir=cache_dir)
+        cached = os.listdir(cache_dir)
+        # json.dumps fails like this on Python 2 for files that aren't UTF-8
+        error = UnicodeDecodeError('utf-8', b'\xe9', 0, 1, 'invalid continuation byte')
+        with mock.patch("certbot_nginx.parser.json.dumps", side_effect=error):
+            # pylint: disable=protected-access
+            nparser._save_cached_tree(nparser.abs_path('new.conf'), 'a b;',
+                                      nginxparser.loads('a b;'))
+        self.assertEqual(os.listdir(cache_dir), cached)
+
+    def test_native_strings(self):
+        # pylint: disable=protected-access
+        self.assertEqual(parser._native_strings([[u'# caf\xe9'], u'a', None]),
+                         [[b'# caf\xc3\xa9'], b'a', None])
+
+    def test_parse_cache_invalidated(self):
+        cache_dir = os.path.join(self.work_dir, "nginx-parse-cache")
+        nparser = parser.NginxParser(self.config_path, cache_dir=cache_dir)
+        server_conf = nparser.abs_path('server.conf')
+        with open(server_conf, 'w') as f:
+            f.write('server_name changed;\n')
+        # pylint: disable=protected-access
+        with open(nparser._cache_path(nparser.abs_path('foo.conf')), 'w') as f:
+            f.write('{"corrupted')
+        nparser.load()
+        self.assertEqual(nparser.parsed[server_conf], [['server_name', 'changed']])
+        self.assertEqual(nparser.parsed[nparser.abs_path('foo.conf')],
+                         parser.NginxParser(self.config_path).parsed[
+                             nparser.abs_path('foo.conf')])
+
+    def test_parse_cache_unwritable(self):
+        cache_dir = os.path.join(self.work_dir, "file")
+        open(cache_dir, 'w').close()
+        nparser = parser.NginxParser(self.config_path, cache_dir=cache_dir)
+        self.assertEqual(nparser.parsed, parser.NginxParser(self.config_path).parsed)
+
     def test__do_for_subarray(self):
         # pylint: disable=protected-access
         mylists = [([[2], [3], [2]], [[0], [2]]),
@@ -349,6 +509,61 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
             self.assertEqual(winner,
                              parser.get_best_match(target_name, names[i]))
 
+    def test_vhost_index_candidates(self):
+        names = [set(['www.eff.org', 'irrelevant.long.name.eff.org', '*.org']),
+                 set(['eff.org', 'ww2.eff.org', 'test.www.eff.org']),
+                 set(['*.eff.org', '.www.eff.org']),
+                 set(['.eff.org', '*.org']),
+                 set(['www.eff.', 'www.eff.*', '*.www.eff.org']),
+                 set(['example.com', r'~^(www\.)?(eff.+)', '*.eff.*']),
+                 set(['*', r'~^(www\.)?(eff.+)']),
+                 set(['www.*', r'~^(www\.)?(eff.+)', '.test.eff.org']),
+                 set(['*.org', r'*.eff.org', 'www.eff.*']),
+                 set(['*.www.eff.org', 'www.*']),
+                 set(['*.org']),
+                 set([]),
+                 set(['example.com', '', '.', '*.', '.*'])]
+        servers = {'file': [([['server_name'] + list(name_set)], [i])
+                            for i, name_set in enumerate(names)]}
+        index = parser.VhostIndex(servers)
+        for target_name in ['www.eff.org', 'eff.org', 'example.com', 'test.eff.org',
+                            'a.www.eff.org', 'org', 'www.eff.com', 'foo', '']:
+            expected = [vhost for vhost in index.vhosts
+                        if parser.get_best_match(target_name, vhost.names)[0]]
+            self.assertEqual(expected, [vhost for vhost in index.get_candidates(target_name)
+                                        if parser.get_best_match(target_name, vhost.names)[0]])
+
+    def test_vhost_index_reused(self):
+        nparser = parser.NginxParser(self.config_path)
+        nparser.get_vhosts()
+        with mock.patch.object(nparser, '_get_raw_servers') as mock_servers:
+            vhosts = nparser.get_vhosts()
+            self.assertEqual(nparser.get_vhosts_by_name('example.com'),
+                             [x for x in vhosts
+                              if parser.get_best_match('example.com', x.names)[0]])
+            self.assertFalse(mock_servers.called)
+
+    def test_vhost_index_invalidated(self):
+        nparser = parser.NginxParser(self.config_path)
+        vhost = [x for x in nparser.get_vhosts() if 'example.com' in x.filep][0]
+        nparser.parsed[vhost.filep][0][1].append(['server_name', 'new.example.org'])
+        self.assertEqual(nparser.get_vhosts_by_name('new.example.org')[0].filep, vhost.filep)
+        nparser.load()
+        self.assertEqual(nparser.get_vhosts_by_name('new.example.org'), [])
+
+    def test_vhost_index_updated(self):
+        nparser = parser.NginxParser(self.config_path)
+        vhost = [x for x in nparser.get_vhosts() if 'example.com' in x.filep][0]
+        with mock.patch.object(nparser, '_get_raw_servers') as mock_servers:
+            nparser.add_server_directives(vhost, [['server_name', 'new.example.org'],
+                                                  ['listen', '127.0.0.1', 'ssl']])
+            self.assertFalse(mock_servers.called)
+        self.assertEqual(nparser.get_vhosts_by_name('new.example.org'), [vhost])
+        self.assertTrue(vhost.ssl)
+        updated = nparser.get_vhosts()
+        nparser._vhost_index = None  # pylint: disable=protected-access
+        self.assertEqual(updated, nparser.get_vhosts())
+
     def test_comment_directive(self):
         # pylint: disable=protected-access
         block = nginxparser.UnspacedList([
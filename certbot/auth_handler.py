@@ -1,12 +1,16 @@
 """ACME AuthHandler."""
 import collections
+import datetime
 import logging
 import time
 
+from multiprocessing.pool import ThreadPool
+
 import six
 import zope.component
 
 from acme import challenges
+from acme import client as acme_client
 from acme import messages
 # pylint: disable=unused-import, no-name-in-module
 from acme.magic_typing import DefaultDict, Dict, List, Set, Collection
@@ -23,6 +27,9 @@ logger = logging.getLogger(__name__)
 AnnotatedAuthzr = collections.namedtuple("AnnotatedAuthzr", ["authzr", "achalls"])
 """Stores an authorization resource and its active annotated challenges."""
 
+MAX_CONCURRENT_POLLS = 10
+"""Maximum number of authorizations polled at the same time."""
+
 
 class AuthHandler(object):
     """ACME Authorization Handler for a client.
@@ -39,13 +46,18 @@ class AuthHandler(object):
     :ivar list pref_challs: sorted user specified preferred challenges
         type strings with the most preferred challenge listed first
 
+    :ivar config: Configuration object, if `None` the registered
+        :class:`~certbot.interfaces.IConfig` utility is used
+    :type config: :class:`certbot.interfaces.IConfig`
+
     """
-    def __init__(self, auth, acme, account, pref_challs):
+    def __init__(self, auth, acme, account, pref_challs, config=None):
         self.auth = auth
         self.acme = acme
 
         self.account = account
         self.pref_challs = pref_challs
+        self.config = config
 
     def handle_authorizations(self, orderr, best_effort=False):
         """Retrieve all authorizations for challenges.
@@ -66,7 +78,9 @@ class AuthHandler(object):
                     for authzr in orderr.authorizations]
 
         self._choose_challenges(aauthzrs)
-        config = zope.component.getUtility(interfaces.IConfig)
+        config = self.config
+        if config is None:
+            config = zope.component.getUtility(interfaces.IConfig)
         notify = zope.component.getUtility(interfaces.IDisplay).notification
 
         # While there are still challenges remaining...
@@ -190,26 +204,51 @@ class AuthHandler(object):
 
         return active_achalls
 
-    def _poll_challenges(self, aauthzrs, chall_update,
-                         best_effort, min_sleep=3, max_rounds=30):
-        """Wait for all challenge results to be determined."""
+    def _poll_challenges(self, aauthzrs, chall_update, best_effort,
+                         min_sleep=1, max_sleep=10, timeout=90):
+        """Wait for all challenge results to be determined.
+
+        Authorizations are polled concurrently. Each one is polled again
+        at the time given by the ``Retry-After`` header of its last
+        response or, if there is none, after a delay that starts at
+        ``min_sleep`` seconds and doubles up to ``max_sleep`` seconds.
+        Polling stops once ``timeout`` seconds have passed.
+
+        """
         indices_to_check = set(chall_update.keys())
         comp_indices = set()
-        rounds = 0
-
-        while indices_to_check and rounds < max_rounds:
-            # TODO: Use retry-after...
-            time.sleep(min_sleep)
+        now = datetime.datetime.now()
+        deadline = now + datetime.timedelta(seconds=timeout)
+        delays = dict((index, min_sleep) for index in indices_to_check)
+        next_poll = dict(
+            (index, now + datetime.timedelta(seconds=min_sleep))
+            for index in indices_to_check)
+
+        while indices_to_check:
+            now = datetime.datetime.now()
+            due = sorted(index for index in indices_to_check
+                         if next_poll[index] <= now)
+            if not due:
+                wake_up = min(next_poll[index] for index in indices_to_check)
+                if wake_up > deadline:
+                    break
+                time.sleep((wake_up - now).total_seconds())
+                continue
+
+            polled = self._poll_authzrs([aauthzrs[index].authzr for index in due])
             all_failed_achalls = set()  # type: Set[achallenges.KeyAuthorizationAnnotatedChallenge]
-            for index in indices_to_check:
+            for index, (updated_authzr, response) in six.moves.zip(due, polled):
                 comp_achalls, failed_achalls = self._handle_check(
-                    aauthzrs, index, chall_update[index])
+                    aauthzrs, index, chall_update[index], updated_authzr)
 
                 if len(comp_achalls) == len(chall_update[index]):
                     comp_indices.add(index)
                 elif not failed_achalls:
                     for achall, _ in comp_achalls:
                         chall_update[index].remove(achall)
+                    next_poll[index] = acme_client.ClientBase.retry_after(
+                        response, default=delays[index])
+                    delays[index] = min(2 * delays[index], max_sleep)
                 # We failed some challenges... damage control
                 else:
                     if best_effort:
@@ -227,15 +266,32 @@ class AuthHandler(object):
 
             indices_to_check -= comp_indices
             comp_indices.clear()
-            rounds += 1
 
-    def _handle_check(self, aauthzrs, index, achalls):
+    def _poll_authzrs(self, authzrs):
+        """Poll authorizations concurrently.
+
+        :param list authzrs: `.AuthorizationResource` objects to poll
+
+        :returns: (updated authorization, response) tuples in the order
+            of authzrs
+        :rtype: list
+
+        """
+        if len(authzrs) == 1:
+            return [self.acme.poll(authzrs[0])]
+        pool = ThreadPool(min(len(authzrs), MAX_CONCURRENT_POLLS))
+        try:
+            return pool.map(self.acme.poll, authzrs)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _handle_check(self, aauthzrs, index, achalls, updated_authzr):
         """Returns tuple of ('completed', 'failed')."""
         completed = []
         failed = []
 
         original_aauthzr = aauthzrs[index]
-        updated_authzr, _ = self.acme.poll(original_aauthzr.authzr)
         aauthzrs[index] = AnnotatedAuthzr(updated_authzr, original_aauthzr.achalls)
         if updated_authzr.body.status == messages.STATUS_VALID:
             return achalls, []
@@ -247,15 +247,18 @@ def match_and_check_overlaps(cli_config, acceptable_matches, match_func, rv_func
     else:
         return matched
 
-def human_readable_cert_info(config, cert, skip_filter_checks=False):
-    """ Returns a human readable description of info about a RenewableCert object"""
+def human_readable_cert_info(config, cert, skip_filter_checks=False, revoked=None):
+    """ Returns a human readable description of info about a RenewableCert object
+
+    :param bool revoked: Revocation status of the cert, if already known
+
+    """
     certinfo = []
-    checker = ocsp.RevocationChecker()
 
-    if config.certname and cert.lineagename != config.certname and not skip_filter_checks:
-        return ""
-    if config.domains and not set(config.domains).issubset(cert.names()):
+    if not _matches_filters(config, cert, skip_filter_checks):
         return ""
+    if revoked is None:
+        revoked = ocsp.revocation_checker(config).ocsp_revoked(cert.cert, cert.chain)
     now = pytz.UTC.fromutc(datetime.datetime.utcnow())
 
     reasons = []
@@ -263,7 +266,7 @@ def human_readable_cert_info(config, cert, skip_filter_checks=False):
         reasons.append('TEST_CERT')
     if cert.target_expiry <= now:
         reasons.append('EXPIRED')
-    if checker.ocsp_revoked(cert.cert, cert.chain):
+    if revoked:
         reasons.append('REVOKED')
 
     if reasons:
@@ -336,10 +339,22 @@ def _report_lines(msgs):
 def _report_human_readable(config, parsed_certs):
     """Format a results report for a parsed cert"""
     certinfo = []
-    for cert in parsed_certs:
-        certinfo.append(human_readable_cert_info(config, cert))
+    parsed_certs = [cert for cert in parsed_certs if _matches_filters(config, cert)]
+    # Query the OCSP responders of all certs at once rather than one after the other
+    revoked = ocsp.revocation_checker(config).ocsp_revoked_many(
+        [(cert.cert, cert.chain) for cert in parsed_certs])
+    for cert, cert_revoked in zip(parsed_certs, revoked):
+        certinfo.append(human_readable_cert_info(config, cert, revoked=cert_revoked))
     return "\n".join(certinfo)
 
+def _matches_filters(config, cert, skip_filter_checks=False):
+    """Whether a cert is selected by the --cert-name and --domains flags"""
+    if config.certname and cert.lineagename != config.certname and not skip_filter_checks:
+        return False
+    if config.domains and not set(config.domains).issubset(cert.names()):
+        return False
+    return True
+
 def _describe_certs(config, parsed_certs, parse_failures):
     """Print information about the certs we know about"""
     out = []  # type: List[str]
@@ -429,6 +429,17 @@ VERB_HELP = [
                   os.path.join(flag_default("config_dir"), "live"))),
         "usage": "\n\n  certbot update_symlinks [options]\n\n"
     }),
+    ("fill_key_pool", {
+        "short": "Pre-generate private keys for future certificates",
+        "opts": ("Generates private keys of --key-type, --rsa-key-size and "
+                 "--elliptic-curve until {0} holds --key-pool-size of them. Certificates obtained or renewed later use "
+                 "these keys instead of generating new ones, which keeps key generation "
+                 "out of renewal. Run it regularly, for instance right after "
+                 "'certbot renew'.".format(os.path.join(flag_default("config_dir"),
+                                                        constants.KEY_POOL_DIR))),
+        "usage": "\n\n  certbot fill_key_pool [--key-pool-size N] [--key-type TYPE] "
+                 "[--rsa-key-size N] [--elliptic-curve CURVE]\n\n"
+    }),
     ("enhance", {
         "short": "Add security enhancements to your existing configuration",
         "opts": ("Helps to harden the TLS configuration by adding security enhancements "
@@ -470,6 +481,7 @@ class HelpfulArgumentParser(object):
             "certificates": main.certificates,
             "delete": main.delete,
             "enhance": main.enhance,
+            "fill_key_pool": main.fill_key_pool,
         }
 
         # Get notification function for printing
@@ -1114,6 +1126,17 @@ def prepare_and_parse_args(plugins, args, detect_defaults=False):  # pylint: dis
     helpful.add(
         "security", "--rsa-key-size", type=int, metavar="N",
         default=flag_default("rsa_key_size"), help=config_help("rsa_key_size"))
+    helpful.add(
+        "security", "--key-type", choices=crypto_util.KEY_TYPES,
+        default=flag_default("key_type"), help=config_help("key_type"))
+    helpful.add(
+        "security", "--elliptic-curve", choices=crypto_util.ELLIPTIC_CURVES,
+        metavar="CURVE", default=flag_default("elliptic_curve"),
+        help=config_help("elliptic_curve"))
+    helpful.add(
+        "fill_key_pool", "--key-pool-size", type=int, metavar="N",
+        default=flag_default("key_pool_size"),
+        help="Number of pre-generated keys of each type and size to keep in the key pool.")
     helpful.add(
         "security", "--must-staple", action="store_true",
         dest="must_staple", default=flag_default("must_staple"),
@@ -1225,6 +1248,13 @@ def prepare_and_parse_args(plugins, args, detect_defaults=False):  # pylint: dis
         " when the user executes \"certbot renew\", regardless of if the certificate"
         " is renewed. This setting does not apply to important TLS configuration"
         " updates.")
+    helpful.add(
+        "renew", "--renew-concurrency", type=int, metavar="N",
+        default=flag_default("renew_concurrency"),
+        help="Number of certificate lineages to renew in parallel. Lineages"
+        " whose installer or authenticator changes shared server state (all"
+        " plugins except webroot and the DNS plugins) are still renewed one"
+        " at a time. (default: 1)")
     helpful.add(
         "renew", "--no-autorenew", action="store_false",
         default=flag_default("autorenew"), dest="autorenew",
@@ -1,8 +1,10 @@
 """Certbot client API."""
+import contextlib
 import datetime
 import logging
 import os
 import platform
+import threading
 
 
 from cryptography.hazmat.backends import default_backend
@@ -17,7 +19,7 @@ from acme import client as acme_client
 from acme import crypto_util as acme_crypto_util
 from acme import errors as acme_errors
 from acme import messages
-from acme.magic_typing import Optional  # pylint: disable=unused-import,no-name-in-module
+from acme.magic_typing import Dict, Optional, Tuple  # pylint: disable=unused-import,no-name-in-module
 
 import certbot
 
@@ -43,11 +45,67 @@ from certbot.plugins import selection as plugin_selection
 logger = logging.getLogger(__name__)
 
 
+# ACME clients of registered accounts, keyed by account key, server and
+# client settings. Only populated while shared_acme_clients is active.
+_acme_clients = None  # type: Optional[Dict[Tuple, acme_client.BackwardsCompatibleClientV2]]
+_acme_clients_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def shared_acme_clients():
+    """Share ACME clients between lineages while in this context.
+
+    Within the context, `acme_from_config_key` hands out the same client,
+    with its warm connections and nonces, for every lineage of an
+    account. Contexts may be nested; clients are dropped when the
+    outermost one exits.
+
+    """
+    global _acme_clients  # pylint: disable=global-statement
+    with _acme_clients_lock:
+        outermost = _acme_clients is None
+        if outermost:
+            _acme_clients = {}
+    try:
+        yield
+    finally:
+        if outermost:
+            with _acme_clients_lock:
+                _acme_clients = None
+
+
 def acme_from_config_key(config, key, regr=None):
-    "Wrangle ACME client construction"
+    """Wrangle ACME client construction
+
+    Inside `shared_acme_clients`, clients of registered accounts (``regr``
+    is given) are reused for the same account key, server and settings.
+
+    """
+    user_agent = determine_user_agent(config)
+    if regr is None or _acme_clients is None:
+        return _new_acme_client(config, key, regr, user_agent)
+    registry_key = (config.server, key.thumbprint(),
+                    config.no_verify_ssl, user_agent)
+    with _acme_clients_lock:
+        if _acme_clients is None:
+            return _new_acme_client(config, key, regr, user_agent)
+        if registry_key not in _acme_clients:
+            _acme_clients[registry_key] = _new_acme_client(
+                config, key, regr, user_agent)
+        return _acme_clients[registry_key]
+
+
+def _new_acme_client(config, key, regr, user_agent):
+    """Build a new ACME client.
+
+    The HTTP connection pool is sized for `config.renew_concurrency`
+    lineages fetching authorizations at the same time.
+
+    """
     # TODO: Allow for other alg types besides RS256
+    pool_maxsize = acme_client.DEFAULT_AUTHZ_CONCURRENCY * config.renew_concurrency
     net = acme_client.ClientNetwork(key, account=regr, verify_ssl=(not config.no_verify_ssl),
-                                    user_agent=determine_user_agent(config))
+                                    user_agent=user_agent, pool_maxsize=pool_maxsize)
     return acme_client.BackwardsCompatibleClientV2(net, key, config.server)
 
 
@@ -250,7 +308,8 @@ class Client(object):
 
         if auth is not None:
             self.auth_handler = auth_handler.AuthHandler(
-                auth, self.acme, self.account, self.config.pref_challs)
+                auth, self.acme, self.account, self.config.pref_challs,
+                config=self.config)
         else:
             self.auth_handler = None
 
@@ -323,14 +382,20 @@ class Client(object):
         # Create CSR from names
         if self.config.dry_run:
             key = key or util.Key(file=None,
-                                  pem=crypto_util.make_key(self.config.rsa_key_size))
+                                  pem=crypto_util.make_key(self.config.rsa_key_size,
+                                                           self.config.key_type,
+                                                           self.config.elliptic_curve))
             csr = util.CSR(file=None, form="pem",
                            data=acme_crypto_util.make_csr(
                                key.pem, domains, self.config.must_staple))
         else:
             key = key or crypto_util.init_save_key(self.config.rsa_key_size,
-                                                   self.config.key_dir)
-            csr = crypto_util.init_save_csr(key, domains, self.config.csr_dir)
+                                                   self.config.key_dir,
+                                                   config=self.config,
+                                                   key_type=self.config.key_type,
+                                                   elliptic_curve=self.config.elliptic_curve)
+            csr = crypto_util.init_save_csr(key, domains, self.config.csr_dir,
+                                            config=self.config)
 
         orderr = self._get_order_and_authorizations(csr.data, self.config.allow_subset_of_names)
         authzr = orderr.authorizations
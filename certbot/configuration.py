@@ -25,6 +25,7 @@ class NamespaceConfig(object):
       - `csr_dir`
       - `in_progress_dir`
       - `key_dir`
+      - `key_pool_dir`
       - `temp_checkpoint_dir`
 
     And the following paths are dynamically resolved using
@@ -88,6 +89,10 @@ class NamespaceConfig(object):
     def key_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(self.namespace.config_dir, constants.KEY_DIR)
 
+    @property
+    def key_pool_dir(self):  # pylint: disable=missing-docstring
+        return os.path.join(self.namespace.config_dir, constants.KEY_POOL_DIR)
+
     @property
     def temp_checkpoint_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(
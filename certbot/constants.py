@@ -56,6 +56,9 @@ CLI_DEFAULTS = dict(
     http01_address="",
     break_my_certs=False,
     rsa_key_size=2048,
+    key_type="rsa",
+    elliptic_curve="secp256r1",
+    key_pool_size=10,
     must_staple=False,
     redirect=None,
     auto_hsts=False,
@@ -68,6 +71,7 @@ CLI_DEFAULTS = dict(
     directory_hooks=True,
     reuse_key=False,
     disable_renew_updates=False,
+    renew_concurrency=1,
 
     # Subparsers
     num=None,
@@ -184,9 +188,16 @@ IN_PROGRESS_DIR = "IN_PROGRESS"
 KEY_DIR = "keys"
 """Directory (relative to `IConfig.config_dir`) where keys are saved."""
 
+KEY_POOL_DIR = "key-pool"
+"""Directory (relative to `IConfig.config_dir`) where pre-generated keys
+are kept."""
+
 LIVE_DIR = "live"
 """Live directory, relative to `IConfig.config_dir`."""
 
+OCSP_CACHE_DIR = "ocsp"
+"""Directory (relative to `IConfig.work_dir`) where OCSP responses are cached."""
+
 TEMP_CHECKPOINT_DIR = "temp_checkpoint"
 """Temporary checkpoint directory (relative to `IConfig.work_dir`)."""
 
@@ -7,16 +7,22 @@
 import hashlib
 import logging
 import os
+import tempfile
+import threading
 import warnings
 
 import pyrfc3339
 import six
 import zope.component
-from cryptography.exceptions import InvalidSignature
+from cryptography.exceptions import InvalidSignature, UnsupportedAlgorithm
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric.ec import ECDSA
+from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePrivateKey
 from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePublicKey
 from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 # https://github.com/python/typeshed/tree/master/third_party/2/cryptography
 from cryptography import x509 # type: ignore
@@ -24,7 +30,7 @@ from OpenSSL import crypto
 from OpenSSL import SSL  # type: ignore
 
 from acme import crypto_util as acme_crypto_util
-from acme.magic_typing import IO  # pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Dict, IO, Tuple  # pylint: disable=unused-import, no-name-in-module
 from certbot import compat
 from certbot import errors
 from certbot import interfaces
@@ -33,9 +39,16 @@ from certbot import util
 
 logger = logging.getLogger(__name__)
 
+KEY_TYPES = ("rsa", "ecdsa")
+"""Types of private keys Certbot can generate."""
+
+ELLIPTIC_CURVES = ("secp256r1", "secp384r1", "secp521r1")
+"""Elliptic curves Certbot can generate ECDSA keys on."""
+
 
 # High level functions
-def init_save_key(key_size, key_dir, keyname="key-certbot.pem"):
+def init_save_key(key_size, key_dir, keyname="key-certbot.pem", config=None,
+                  key_type="rsa", elliptic_curve=None):
     """Initializes and saves a privkey.
 
     Inits key and saves it in PEM format on the filesystem.
@@ -43,23 +56,36 @@ def init_save_key(key_size, key_dir, keyname="key-certbot.pem"):
     .. note:: keyname is the attempted filename, it may be different if a file
         already exists at the path.
 
+    A pre-generated key is taken from the key pool (see `fill_key_pool`)
+    if one is available, otherwise a new key is generated.
+
     :param int key_size: RSA key size in bits
     :param str key_dir: Key save directory.
     :param str keyname: Filename of key
+    :param config: Configuration object, if `None` the registered
+        :class:`~certbot.interfaces.IConfig` utility is used
+    :type config: interfaces.IConfig
+    :param str key_type: Type of the key, one of `KEY_TYPES`
+    :param str elliptic_curve: Curve of ECDSA keys, one of `ELLIPTIC_CURVES`
 
     :returns: Key
     :rtype: :class:`certbot.util.Key`
 
     :raises ValueError: If unable to generate the key given key_size.
+    :raises errors.Error: If key_type or elliptic_curve is not supported.
 
     """
-    try:
-        key_pem = make_key(key_size)
-    except ValueError as err:
-        logger.error("", exc_info=True)
-        raise err
+    if config is None:
+        config = zope.component.getUtility(interfaces.IConfig)
+
+    key_pem = take_pooled_key(config.key_pool_dir, key_size, key_type, elliptic_curve)
+    if key_pem is None:
+        try:
+            key_pem = make_key(key_size, key_type, elliptic_curve)
+        except ValueError as err:
+            logger.error("", exc_info=True)
+            raise err
 
-    config = zope.component.getUtility(interfaces.IConfig)
     # Save file
     util.make_or_verify_dir(key_dir, 0o700, compat.os_geteuid(),
                             config.strict_permissions)
@@ -67,12 +93,15 @@ def init_save_key(key_size, key_dir, keyname="key-certbot.pem"):
         os.path.join(key_dir, keyname), 0o600, "wb")
     with key_f:
         key_f.write(key_pem)
-    logger.debug("Generating key (%d bits): %s", key_size, key_path)
+    if key_type == "ecdsa":
+        logger.debug("Generating key (%s): %s", elliptic_curve, key_path)
+    else:
+        logger.debug("Generating key (%d bits): %s", key_size, key_path)
 
     return util.Key(key_path, key_pem)
 
 
-def init_save_csr(privkey, names, path):
+def init_save_csr(privkey, names, path, config=None):
     """Initialize a CSR with the given private key.
 
     :param privkey: Key to include in the CSR
@@ -82,11 +111,16 @@ def init_save_csr(privkey, names, path):
 
     :param str path: Certificate save directory.
 
+    :param config: Configuration object, if `None` the registered
+        :class:`~certbot.interfaces.IConfig` utility is used
+    :type config: interfaces.IConfig
+
     :returns: CSR
     :rtype: :class:`certbot.util.CSR`
 
     """
-    config = zope.component.getUtility(interfaces.IConfig)
+    if config is None:
+        config = zope.component.getUtility(interfaces.IConfig)
 
     csr_pem = acme_crypto_util.make_csr(
         privkey.pem, names, must_staple=config.must_staple)
@@ -177,23 +211,118 @@ def import_csr_file(csrfile, data):
     return PEM, util.CSR(file=csrfile, data=data_pem, form="pem"), domains
 
 
-def make_key(bits):
-    """Generate PEM encoded RSA key.
+def make_key(bits, key_type="rsa", elliptic_curve=None):
+    """Generate PEM encoded RSA or ECDSA key.
 
-    :param int bits: Number of bits, at least 1024.
+    :param int bits: Number of bits of RSA keys, at least 1024.
+    :param str key_type: Type of the key, one of `KEY_TYPES`.
+    :param str elliptic_curve: Curve of ECDSA keys, one of `ELLIPTIC_CURVES`.
 
-    :returns: new RSA key in PEM form with specified number of bits
+    :returns: new key in PEM form
+    :rtype: str
+
+    :raises errors.Error: If key_type or elliptic_curve is not supported.
+
+    """
+    if key_type == "rsa":
+        assert bits >= 1024  # XXX
+        key = crypto.PKey()
+        key.generate_key(crypto.TYPE_RSA, bits)
+        return crypto.dump_privatekey(crypto.FILETYPE_PEM, key)
+    elif key_type == "ecdsa":
+        if elliptic_curve not in ELLIPTIC_CURVES:
+            raise errors.Error("Unsupported elliptic curve: {0}".format(elliptic_curve))
+        curve = getattr(ec, elliptic_curve.upper())()
+        ec_key = ec.generate_private_key(curve, default_backend())
+        return ec_key.private_bytes(encoding=serialization.Encoding.PEM,
+                                    format=serialization.PrivateFormat.TraditionalOpenSSL,
+                                    encryption_algorithm=serialization.NoEncryption())
+    raise errors.Error("Unsupported key type: {0}".format(key_type))
+
+
+def _key_pool_subdir(key_pool_dir, bits, key_type, elliptic_curve):
+    """Directory of the key pool holding keys of the given kind."""
+    if key_type == "ecdsa":
+        return os.path.join(key_pool_dir, "ecdsa-{0}".format(elliptic_curve))
+    return os.path.join(key_pool_dir, "rsa-{0}".format(bits))
+
+
+def take_pooled_key(key_pool_dir, bits, key_type="rsa", elliptic_curve=None):
+    """Take a pre-generated key out of the key pool.
+
+    Keys are claimed by renaming them, so a key is never handed out
+    twice, even to concurrent Certbot processes.
+
+    :param str key_pool_dir: Key pool directory.
+    :param int bits: Number of bits of RSA keys.
+    :param str key_type: Type of the key, one of `KEY_TYPES`.
+    :param str elliptic_curve: Curve of ECDSA keys, one of `ELLIPTIC_CURVES`.
+
+    :returns: key in PEM form, or None if the pool has none left
     :rtype: str
 
     """
-    assert bits >= 1024  # XXX
-    key = crypto.PKey()
-    key.generate_key(crypto.TYPE_RSA, bits)
-    return crypto.dump_privatekey(crypto.FILETYPE_PEM, key)
+    directory = _key_pool_subdir(key_pool_dir, bits, key_type, elliptic_curve)
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return None
+    for name in names:
+        if not name.endswith(".pem"):
+            continue
+        path = os.path.join(directory, name)
+        claimed_path = path + ".taken"
+        try:
+            os.rename(path, claimed_path)
+        except OSError:
+            # taken by someone else in the meantime
+            continue
+        try:
+            with open(claimed_path, "rb") as f:
+                key_pem = f.read()
+        finally:
+            os.remove(claimed_path)
+        if valid_privkey(key_pem):
+            logger.debug("Using pre-generated key %s", path)
+            return key_pem
+        logger.warning("Discarding invalid key %s from the key pool", path)
+    return None
+
+
+def fill_key_pool(key_pool_dir, bits, count, strict_permissions=False,
+                  key_type="rsa", elliptic_curve=None):
+    """Generate keys until the key pool holds count of them.
+
+    :param str key_pool_dir: Key pool directory.
+    :param int bits: Number of bits of RSA keys.
+    :param int count: Number of keys to keep in the pool.
+    :param bool strict_permissions: Require the pool directory to be
+        owned by the current user.
+    :param str key_type: Type of the keys, one of `KEY_TYPES`.
+    :param str elliptic_curve: Curve of ECDSA keys, one of `ELLIPTIC_CURVES`.
+
+    :returns: Number of keys generated.
+    :rtype: int
+
+    """
+    directory = _key_pool_subdir(key_pool_dir, bits, key_type, elliptic_curve)
+    for path in (key_pool_dir, directory):
+        util.make_or_verify_dir(path, 0o700, compat.os_geteuid(), strict_permissions)
+    available = len([name for name in os.listdir(directory) if name.endswith(".pem")])
+    generated = 0
+    while available + generated < count:
+        key_pem = make_key(bits, key_type, elliptic_curve)
+        # keys only get their .pem name once fully written
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(key_pem)
+        os.rename(temp_path, temp_path[:-len(".tmp")] + ".pem")
+        generated += 1
+    return generated
 
 
 def valid_privkey(privkey):
-    """Is valid RSA private key?
+    """Is valid RSA or ECDSA private key?
 
     :param str privkey: Private key file contents in PEM
 
@@ -202,10 +331,18 @@ def valid_privkey(privkey):
 
     """
     try:
-        return crypto.load_privatekey(
-            crypto.FILETYPE_PEM, privkey).check()
-    except (TypeError, crypto.Error):
+        key = serialization.load_pem_private_key(
+            privkey, password=None, backend=default_backend())
+    except (TypeError, ValueError, UnsupportedAlgorithm):
         return False
+    if isinstance(key, RSAPrivateKey):
+        try:
+            return crypto.load_privatekey(
+                crypto.FILETYPE_PEM, privkey).check()
+        except (TypeError, crypto.Error):
+            return False
+    # The point of an EC key is checked to be on its curve when loaded
+    return isinstance(key, EllipticCurvePrivateKey)
 
 
 def verify_renewable_cert(renewable_cert):
@@ -233,35 +370,48 @@ def verify_renewable_cert_sig(renewable_cert):
     :raises errors.Error: If signature verification fails.
     """
     try:
-        with open(renewable_cert.chain, 'rb') as chain_file:  # type: IO[bytes]
-            chain = x509.load_pem_x509_certificate(chain_file.read(), default_backend())
-        with open(renewable_cert.cert, 'rb') as cert_file:  # type: IO[bytes]
-            cert = x509.load_pem_x509_certificate(cert_file.read(), default_backend())
-        pk = chain.public_key()
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            if isinstance(pk, RSAPublicKey):
-                # https://github.com/python/typeshed/blob/master/third_party/2/cryptography/hazmat/primitives/asymmetric/rsa.pyi
-                verifier = pk.verifier(  # type: ignore
-                    cert.signature, PKCS1v15(), cert.signature_hash_algorithm
-                )
-                verifier.update(cert.tbs_certificate_bytes)
-                verifier.verify()
-            elif isinstance(pk, EllipticCurvePublicKey):
-                verifier = pk.verifier(
-                    cert.signature, ECDSA(cert.signature_hash_algorithm)
-                )
-                verifier.update(cert.tbs_certificate_bytes)
-                verifier.verify()
-            else:
-                raise errors.Error("Unsupported public key type")
-    except (IOError, ValueError, InvalidSignature) as e:
+        chain = cert_info(renewable_cert.chain).certificate
+        cert = cert_info(renewable_cert.cert).certificate
+        verify_signed_payload(chain.public_key(), cert.signature, cert.tbs_certificate_bytes,
+                              cert.signature_hash_algorithm)
+    except (IOError, OSError, ValueError, InvalidSignature) as e:
         error_str = "verifying the signature of the cert located at {0} has failed. \
                 Details: {1}".format(renewable_cert.cert, e)
         logger.exception(error_str)
         raise errors.Error(error_str)
 
 
+def verify_signed_payload(public_key, signature, payload, signature_hash_algorithm):
+    """Check the signature of a payload.
+
+    :param RSAPublicKey/EllipticCurvePublicKey public_key: the public_key to check signature
+    :param bytes signature: the signature bytes
+    :param bytes payload: the payload bytes
+    :param cryptography.hazmat.primitives.hashes.HashAlgorithm
+           signature_hash_algorithm: algorithm used to hash the payload
+
+    :raises InvalidSignature: If signature verification fails.
+    :raises errors.Error: If public key type is not supported
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if isinstance(public_key, RSAPublicKey):
+            # https://github.com/python/typeshed/blob/master/third_party/2/cryptography/hazmat/primitives/asymmetric/rsa.pyi
+            verifier = public_key.verifier(  # type: ignore
+                signature, PKCS1v15(), signature_hash_algorithm
+            )
+            verifier.update(payload)
+            verifier.verify()
+        elif isinstance(public_key, EllipticCurvePublicKey):
+            verifier = public_key.verifier(
+                signature, ECDSA(signature_hash_algorithm)
+            )
+            verifier.update(payload)
+            verifier.verify()
+        else:
+            raise errors.Error("Unsupported public key type")
+
+
 def verify_cert_matches_priv_key(cert_path, key_path):
     """ Verifies that the private key and cert match.
 
@@ -272,10 +422,10 @@ def verify_cert_matches_priv_key(cert_path, key_path):
     """
     try:
         context = SSL.Context(SSL.SSLv23_METHOD)
-        context.use_certificate_file(cert_path)
+        context.use_certificate(cert_info(cert_path).x509)
         context.use_privatekey_file(key_path)
         context.check_privatekey()
-    except (IOError, SSL.Error) as e:
+    except (IOError, OSError, SSL.Error, crypto.Error) as e:
         error_str = "verifying the cert located at {0} matches the \
                 private key located at {1} has failed. \
                 Details: {2}".format(cert_path,
@@ -292,17 +442,14 @@ def verify_fullchain(renewable_cert):
     :raises errors.Error: If cert and chain do not combine to fullchain.
     """
     try:
-        with open(renewable_cert.chain) as chain_file:  # type: IO[str]
-            chain = chain_file.read()
-        with open(renewable_cert.cert) as cert_file:  # type: IO[str]
-            cert = cert_file.read()
-        with open(renewable_cert.fullchain) as fullchain_file:  # type: IO[str]
-            fullchain = fullchain_file.read()
+        chain = cert_info(renewable_cert.chain).data
+        cert = cert_info(renewable_cert.cert).data
+        fullchain = cert_info(renewable_cert.fullchain).data
         if (cert + chain) != fullchain:
             error_str = "fullchain does not match cert + chain for {0}!"
             error_str = error_str.format(renewable_cert.lineagename)
             raise errors.Error(error_str)
-    except IOError as e:
+    except (IOError, OSError) as e:
         error_str = "reading one of cert, chain, or fullchain has failed: {0}".format(e)
         logger.exception(error_str)
         raise errors.Error(error_str)
@@ -394,6 +541,137 @@ def dump_pyopenssl_chain(chain, filetype=crypto.FILETYPE_PEM):
     return acme_crypto_util.dump_pyopenssl_chain(chain, filetype)
 
 
+class _cached_property(object):  # pylint: disable=invalid-name,too-few-public-methods
+    """Property computed on first access and then stored on the instance."""
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.func.__name__] = self.func(obj)
+        return value
+
+
+class CertInfo(object):
+    """A certificate file, read once and parsed on demand.
+
+    The file is read when the object is created. It is only parsed, with
+    pyOpenSSL or cryptography, when a property needing it is first
+    accessed, and each property is computed at most once. Use
+    `cert_info` to share instances between all callers.
+
+    If the file holds several certificates, like a chain, properties
+    describe the first one.
+
+    :ivar str path: real path of the file
+    :ivar bytes data: contents of the file
+
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+
+    @_cached_property
+    def x509(self):
+        """The certificate loaded with pyOpenSSL.
+
+        :rtype: `OpenSSL.crypto.X509`
+        :raises OpenSSL.crypto.Error: if the certificate cannot be parsed
+
+        """
+        return crypto.load_certificate(crypto.FILETYPE_PEM, self.data)
+
+    @_cached_property
+    def certificate(self):
+        """The certificate loaded with cryptography.
+
+        :rtype: `cryptography.x509.Certificate`
+        :raises ValueError: if the certificate cannot be parsed
+
+        """
+        return x509.load_pem_x509_certificate(self.data, default_backend())
+
+    @_cached_property
+    def not_before(self):
+        """notBefore value, as a `datetime.datetime`."""
+        return _parse_asn1_time(self.x509.get_notBefore())
+
+    @_cached_property
+    def not_after(self):
+        """notAfter value, as a `datetime.datetime`."""
+        return _parse_asn1_time(self.x509.get_notAfter())
+
+    @_cached_property
+    def names(self):
+        """Subject names, including the CN if it is set."""
+        return _get_names_from_loaded_cert_or_req(self.x509)
+
+    @_cached_property
+    def sans(self):
+        """Subject Alternative Names."""
+        # pylint: disable=protected-access
+        return acme_crypto_util._pyopenssl_cert_or_req_san(self.x509)
+
+    @_cached_property
+    def serial(self):
+        """Serial number, as an `int`."""
+        return self.x509.get_serial_number()
+
+    @_cached_property
+    def issuer(self):
+        """Issuer distinguished name, e.g. ``"C=US, CN=Issuer"``."""
+        return ", ".join(
+            "{0}={1}".format(key.decode(), value.decode())
+            for key, value in self.x509.get_issuer().get_components())
+
+    @_cached_property
+    def sha256(self):
+        """sha256 digest of the file in hexadecimal."""
+        return hashlib.sha256(self.data).hexdigest()
+
+
+# Certificate files read by cert_info, keyed by their real path. Each
+# entry remembers the stat signature of the file it was read from so
+# that it is read again if the file is replaced.
+_cert_info_cache = {}  # type: Dict[str, Tuple[Tuple, CertInfo]]
+_cert_info_lock = threading.Lock()
+
+
+def cert_info(cert_path):
+    """Get the `CertInfo` of the certificate file at cert_path.
+
+    Results are cached for the lifetime of the process, keyed by the
+    file's real path and revalidated against its inode, size and
+    modification time, so each certificate file is read and parsed at
+    most once as long as it does not change.
+
+    :param str cert_path: path to a cert in PEM format
+
+    :returns: the certificate file
+    :rtype: `CertInfo`
+
+    :raises OSError: if the file cannot be read
+
+    """
+    path = os.path.realpath(cert_path)
+    stat = os.stat(path)
+    signature = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime)
+    with _cert_info_lock:
+        cached = _cert_info_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        info = CertInfo(path, f.read())
+    with _cert_info_lock:
+        _cert_info_cache[path] = (signature, info)
+    return info
+
+
 def notBefore(cert_path):
     """When does the cert at cert_path start being valid?
 
@@ -403,7 +681,7 @@ def notBefore(cert_path):
     :rtype: :class:`datetime.datetime`
 
     """
-    return _notAfterBefore(cert_path, crypto.X509.get_notBefore)
+    return cert_info(cert_path).not_before
 
 
 def notAfter(cert_path):
@@ -415,26 +693,20 @@ def notAfter(cert_path):
     :rtype: :class:`datetime.datetime`
 
     """
-    return _notAfterBefore(cert_path, crypto.X509.get_notAfter)
+    return cert_info(cert_path).not_after
 
 
-def _notAfterBefore(cert_path, method):
-    """Internal helper function for finding notbefore/notafter.
+def _parse_asn1_time(timestamp):
+    """Internal helper function for parsing notbefore/notafter.
 
-    :param str cert_path: path to a cert in PEM format
-    :param function method: one of ``crypto.X509.get_notBefore``
-        or ``crypto.X509.get_notAfter``
+    :param bytes timestamp: ASN.1 GENERALIZEDTIME as returned by
+        ``crypto.X509.get_notBefore`` or ``crypto.X509.get_notAfter``
 
-    :returns: the notBefore or notAfter value from the cert at cert_path
+    :returns: the parsed timestamp
     :rtype: :class:`datetime.datetime`
 
     """
-    # pylint: disable=redefined-outer-name
-    with open(cert_path) as f:
-        x509 = crypto.load_certificate(crypto.FILETYPE_PEM,
-                                               f.read())
     # pyopenssl always returns bytes
-    timestamp = method(x509)
     reformatted_timestamp = [timestamp[0:4], b"-", timestamp[4:6], b"-",
                              timestamp[6:8], b"T", timestamp[8:10], b":",
                              timestamp[10:12], b":", timestamp[12:]]
@@ -3,6 +3,7 @@ from __future__ import print_function
 
 import logging
 import os
+import threading
 
 from subprocess import Popen, PIPE
 
@@ -14,6 +15,11 @@ from certbot.plugins import util as plug_util
 
 logger = logging.getLogger(__name__)
 
+# Lineages may be renewed concurrently (see --renew-concurrency). This
+# lock guards the bookkeeping of pre and post hooks and serializes deploy
+# hooks, which communicate through process wide environment variables.
+_hook_lock = threading.RLock()
+
 
 def validate_hooks(config):
     """Check hook commands are executable."""
@@ -90,12 +96,13 @@ def _run_pre_hook_if_necessary(command):
     :param str command: pre-hook to be run
 
     """
-    if command in executed_pre_hooks:
-        logger.info("Pre-hook command already run, skipping: %s", command)
-    else:
-        logger.info("Running pre-hook command: %s", command)
-        _run_hook(command)
-        executed_pre_hooks.add(command)
+    with _hook_lock:
+        if command in executed_pre_hooks:
+            logger.info("Pre-hook command already run, skipping: %s", command)
+        else:
+            logger.info("Running pre-hook command: %s", command)
+            _run_hook(command)
+            executed_pre_hooks.add(command)
 
 
 def post_hook(config):
@@ -142,8 +149,9 @@ def _run_eventually(command):
     :param str command: post-hook to register to be run
 
     """
-    if command not in post_hooks:
-        post_hooks.append(command)
+    with _hook_lock:
+        if command not in post_hooks:
+            post_hooks.append(command)
 
 
 def run_saved_post_hooks():
@@ -218,10 +226,11 @@ def _run_deploy_hook(command, domains, lineage_path, dry_run):
                        command)
         return
 
-    os.environ["RENEWED_DOMAINS"] = " ".join(domains)
-    os.environ["RENEWED_LINEAGE"] = lineage_path
-    logger.info("Running deploy-hook command: %s", command)
-    _run_hook(command)
+    with _hook_lock:
+        os.environ["RENEWED_DOMAINS"] = " ".join(domains)
+        os.environ["RENEWED_LINEAGE"] = lineage_path
+        logger.info("Running deploy-hook command: %s", command)
+        _run_hook(command)
 
 
 def _run_hook(shell_cmd):
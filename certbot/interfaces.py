@@ -205,6 +205,10 @@ class IConfig(zope.interface.Interface):
         "register multiple emails, ex: u1@example.com,u2@example.com. "
         "(default: Ask).")
     rsa_key_size = zope.interface.Attribute("Size of the RSA key.")
+    key_type = zope.interface.Attribute(
+        "Type of generated private keys, rsa or ecdsa.")
+    elliptic_curve = zope.interface.Attribute(
+        "Elliptic curve of generated ECDSA private keys.")
     must_staple = zope.interface.Attribute(
         "Adds the OCSP Must Staple extension to the certificate. "
         "Autoconfigures OCSP Stapling for supported setups "
@@ -222,6 +226,8 @@ class IConfig(zope.interface.Interface):
     in_progress_dir = zope.interface.Attribute(
         "Directory used before a permanent checkpoint is finalized.")
     key_dir = zope.interface.Attribute("Keys storage.")
+    key_pool_dir = zope.interface.Attribute(
+        "Directory where pre-generated keys are kept.")
     temp_checkpoint_dir = zope.interface.Attribute(
         "Temporary checkpoint directory.")
 
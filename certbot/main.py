@@ -1051,6 +1051,32 @@ def certificates(config, unused_plugins):
     """
     cert_manager.certificates(config)
 
+def fill_key_pool(config, unused_plugins):
+    """Pre-generate private keys for future certificates
+
+    :param config: Configuration object
+    :type config: interfaces.IConfig
+
+    :param unused_plugins: List of plugins (deprecated)
+    :type unused_plugins: `list` of `str`
+
+    :returns: `None`
+    :rtype: None
+
+    """
+    if config.key_pool_size < 0:
+        raise errors.Error("--key-pool-size must not be negative")
+    generated = crypto_util.fill_key_pool(config.key_pool_dir, config.rsa_key_size,
+                                          config.key_pool_size, config.strict_permissions,
+                                          config.key_type, config.elliptic_curve)
+    if config.key_type == "ecdsa":
+        kind = "{0} ECDSA".format(config.elliptic_curve)
+    else:
+        kind = "{0}-bit RSA".format(config.rsa_key_size)
+    disp = zope.component.getUtility(interfaces.IDisplay)
+    disp.notification("Generated {0} {1} key(s) for the key pool in {2}.".format(
+        generated, kind, config.key_pool_dir), pause=False)
+
 def revoke(config, unused_plugins):  # TODO: coop with renewal config
     """Revoke a previously obtained certificate.
 
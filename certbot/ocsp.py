@@ -1,40 +1,140 @@
 """Tools for checking certificate revocation."""
+import contextlib
+import hashlib
 import logging
+import os
 import re
-
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from multiprocessing.pool import ThreadPool
 from subprocess import Popen, PIPE
 
+import requests
+import six
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature, UnsupportedAlgorithm
+from cryptography.hazmat.primitives import hashes, serialization
+try:
+    # Only cryptography>=2.5 has the ocsp module, with the
+    # signature_hash_algorithm attribute in the OCSPResponse class
+    from cryptography.x509 import ocsp  # pylint: disable=import-error
+    getattr(ocsp.OCSPResponse, 'signature_hash_algorithm')
+except (ImportError, AttributeError):  # pragma: no cover
+    ocsp = None  # type: ignore
+
+from acme.magic_typing import Dict, Optional, Tuple  # pylint: disable=unused-import, no-name-in-module
+
+from certbot import constants
+from certbot import crypto_util
 from certbot import errors
 from certbot import util
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CONCURRENCY = 8
+"""Number of OCSP queries made at the same time by `RevocationChecker.ocsp_revoked_many`."""
+
+TIMEOUT = 10
+"""Seconds to wait for an OCSP responder."""
+
+CLOCK_SKEW = timedelta(minutes=5)
+"""Tolerance for the validity period of OCSP responses, like OpenSSL's."""
+
+# Checker shared by everything checking revocation while
+# shared_revocation_checker is active.
+_shared_checker = None  # type: Optional[RevocationChecker]
+_shared_checker_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def shared_revocation_checker(checker):
+    """Use a single revocation checker while in this context.
+
+    Within the context, `revocation_checker` returns ``checker``, so its
+    results, its time budget and its connections to responders are shared
+    by every lineage. Contexts may be nested; the outermost checker wins.
+
+    :param RevocationChecker checker: the checker to share
+
+    """
+    global _shared_checker  # pylint: disable=global-statement
+    with _shared_checker_lock:
+        outermost = _shared_checker is None
+        if outermost:
+            _shared_checker = checker
+    try:
+        yield _shared_checker
+    finally:
+        if outermost:
+            with _shared_checker_lock:
+                _shared_checker = None
+
+
+def revocation_checker(config):
+    """Get the revocation checker to use.
+
+    :param configuration.NamespaceConfig config: the current configuration
+
+    :returns: the shared checker if `shared_revocation_checker` is active,
+        otherwise a new checker caching responses in the work directory
+    :rtype: RevocationChecker
+
+    """
+    checker = _shared_checker
+    if checker is not None:
+        return checker
+    return RevocationChecker(cache_dir=os.path.join(config.work_dir, constants.OCSP_CACHE_DIR))
+
+
 class RevocationChecker(object):
-    "This class figures out OCSP checking on this system, and performs it."
+    """This class figures out OCSP checking on this system, and performs it.
+
+    OCSP requests are built and responses are validated in process with
+    cryptography when it is recent enough, the openssl binary being used
+    otherwise. Validated responses are cached in ``cache_dir``, if it is
+    set, until their nextUpdate time.
+
+    The result for each cert is remembered for the lifetime of the checker.
+    If ``time_budget`` is set, responders stop being queried that many
+    seconds after the first query; certs that are not checked by then are
+    reported as not revoked.
+
+    """
 
-    def __init__(self):
+    def __init__(self, enforce_openssl_binary_usage=False, cache_dir=None, time_budget=None):
         self.broken = False
+        self.use_openssl_binary = enforce_openssl_binary_usage or not ocsp
+        self.cache_dir = cache_dir
+        self.time_budget = time_budget
+        self._deadline = None  # type: Optional[float]
+        self._results = {}  # type: Dict[Tuple[str, str], bool]
+        self._results_lock = threading.Lock()
+        # One session per responder, so that connections are kept alive
+        # between queries.
+        self._sessions = {}  # type: Dict[Tuple[str, str], requests.Session]
+        self._sessions_lock = threading.Lock()
 
-        if not util.exe_exists("openssl"):
-            logger.info("openssl not installed, can't check revocation")
-            self.broken = True
-            return
+        if self.use_openssl_binary:
+            if not util.exe_exists("openssl"):
+                logger.info("openssl not installed, can't check revocation")
+                self.broken = True
+                return
 
-       # New versions of openssl want -header var=val, old ones want -header var val
-        test_host_format = Popen(["openssl", "ocsp", "-header", "var", "val"],
-                                 stdout=PIPE, stderr=PIPE, universal_newlines=True)
-        _out, err = test_host_format.communicate()
-        if "Missing =" in err:
-            self.host_args = lambda host: ["Host=" + host]
-        else:
-            self.host_args = lambda host: ["Host", host]
+           # New versions of openssl want -header var=val, old ones want -header var val
+            test_host_format = Popen(["openssl", "ocsp", "-header", "var", "val"],
+                                     stdout=PIPE, stderr=PIPE, universal_newlines=True)
+            _out, err = test_host_format.communicate()
+            if "Missing =" in err:
+                self.host_args = lambda host: ["Host=" + host]
+            else:
+                self.host_args = lambda host: ["Host", host]
 
 
     def ocsp_revoked(self, cert_path, chain_path):
         """Get revoked status for a particular cert version.
 
-        .. todo:: Make this a non-blocking call
-
         :param str cert_path: Path to certificate
         :param str chain_path: Path to intermediate cert
         :rtype bool or None:
@@ -44,10 +144,93 @@ class RevocationChecker(object):
         if self.broken:
             return False
 
+        key = (cert_path, chain_path)
+        with self._results_lock:
+            if key in self._results:
+                return self._results[key]
 
         url, host = self.determine_ocsp_server(cert_path)
         if not host:
-            return False
+            revoked = False
+        elif self.use_openssl_binary:
+            revoked = self._check_ocsp_openssl_bin(cert_path, chain_path, host, url)
+        else:
+            revoked = self._check_ocsp_cryptography(cert_path, chain_path, url)
+
+        with self._results_lock:
+            self._results[key] = revoked
+        return revoked
+
+    def ocsp_revoked_many(self, paths, concurrency=DEFAULT_CONCURRENCY):
+        """Get revoked status for many certs, querying responders concurrently.
+
+        :param list paths: (cert path, chain path) tuples
+        :param int concurrency: Maximum number of queries made at the same time
+
+        :returns: For each cert, True if revoked; False if valid or the check failed
+        :rtype: list
+
+        """
+        paths = list(paths)
+        if concurrency <= 1 or len(paths) <= 1:
+            return [self.ocsp_revoked(cert_path, chain_path) for cert_path, chain_path in paths]
+
+        pool = ThreadPool(min(concurrency, len(paths)))
+        try:
+            return pool.map(lambda path: self.ocsp_revoked(*path), paths)
+        finally:
+            pool.close()
+            pool.join()
+
+    def determine_ocsp_server(self, cert_path):
+        """Extract the OCSP server host from a certificate.
+
+        :param str cert_path: Path to the cert we're checking OCSP for
+        :rtype tuple:
+        :returns: (OCSP server URL or None, OCSP server host or None)
+
+        """
+        if self.use_openssl_binary:
+            try:
+                url, _err = util.run_script(
+                    ["openssl", "x509", "-in", cert_path, "-noout", "-ocsp_uri"],
+                    log=logger.debug)
+            except errors.SubprocessError:
+                logger.info("Cannot extract OCSP URI from %s", cert_path)
+                return None, None
+        else:
+            try:
+                url = _ocsp_uri(_load_cert(cert_path))
+            except (IOError, ValueError) as e:
+                logger.info("Cannot extract OCSP URI from %s: %s", cert_path, e)
+                return None, None
+
+        url = url.rstrip()
+        host = url.partition("://")[2].rstrip("/")
+        if host:
+            return url, host
+        else:
+            logger.info("Cannot process OCSP host from URL (%s) in cert at %s", url, cert_path)
+            return None, None
+
+    def _remaining_time(self):
+        """Seconds left to query responders, or None if there is no time budget."""
+        if self.time_budget is None:
+            return None
+        with self._results_lock:
+            if self._deadline is None:
+                self._deadline = time.time() + self.time_budget
+        return self._deadline - time.time()
+
+    def _out_of_time(self, cert_path):
+        remaining = self._remaining_time()
+        if remaining is not None and remaining <= 0:
+            logger.debug("Not checking OCSP for %s, the time budget of %s seconds "
+                         "is exhausted", cert_path, self.time_budget)
+            return True
+        return False
+
+    def _check_ocsp_openssl_bin(self, cert_path, chain_path, host, url):
         # jdkasten thanks "Bulletproof SSL and TLS - Ivan Ristic" for documenting this!
         cmd = ["openssl", "ocsp",
                "-no_nonce",
@@ -58,6 +241,8 @@ class RevocationChecker(object):
                "-verify_other", chain_path,
                "-trust_other",
                "-header"] + self.host_args(host)
+        if self._out_of_time(cert_path):
+            return False
         logger.debug("Querying OCSP for %s", cert_path)
         logger.debug(" ".join(cmd))
         try:
@@ -68,30 +253,206 @@ class RevocationChecker(object):
 
         return _translate_ocsp_query(cert_path, output, err)
 
+    def _check_ocsp_cryptography(self, cert_path, chain_path, url):
+        try:
+            cert = _load_cert(cert_path)
+            issuer = _load_cert(chain_path)
+        except (IOError, ValueError) as e:
+            logger.info("Cannot load %s or %s to check OCSP: %s", cert_path, chain_path, e)
+            return False
 
-    def determine_ocsp_server(self, cert_path):
-        """Extract the OCSP server host from a certificate.
+        # Request an OCSP response
+        builder = ocsp.OCSPRequestBuilder()
+        builder = builder.add_certificate(cert, issuer, hashes.SHA1())
+        request = builder.build()
 
-        :param str cert_path: Path to the cert we're checking OCSP for
-        :rtype tuple:
-        :returns: (OCSP server URL or None, OCSP server host or None)
+        response_ocsp = self._load_cached_response(request, issuer)
+        if response_ocsp is None:
+            response_ocsp = self._query_ocsp(cert_path, url, request, issuer)
+            if response_ocsp is None:
+                return False
+            self._save_cached_response(request, response_ocsp)
+
+        if response_ocsp.certificate_status == ocsp.OCSPCertStatus.REVOKED:
+            return True
+        if response_ocsp.certificate_status == ocsp.OCSPCertStatus.UNKNOWN:
+            logger.info("Revocation status for %s is unknown", cert_path)
+        return False
+
+    def _query_ocsp(self, cert_path, url, request, issuer):
+        """Query an OCSP responder and validate its response.
+
+        :returns: The validated response, or None if the check failed.
 
         """
+        if self._out_of_time(cert_path):
+            return None
+        remaining = self._remaining_time()
+        timeout = TIMEOUT if remaining is None else min(TIMEOUT, remaining)
+        logger.debug("Querying OCSP for %s at %s", cert_path, url)
         try:
-            url, _err = util.run_script(
-                ["openssl", "x509", "-in", cert_path, "-noout", "-ocsp_uri"],
-                log=logger.debug)
-        except errors.SubprocessError:
-            logger.info("Cannot extract OCSP URI from %s", cert_path)
-            return None, None
+            response = self._session(url).post(
+                url,
+                data=request.public_bytes(serialization.Encoding.DER),
+                headers={'Content-Type': 'application/ocsp-request'},
+                timeout=timeout)
+        except requests.exceptions.RequestException:
+            logger.info("OCSP check failed for %s (are we offline?)", cert_path, exc_info=True)
+            return None
+        if response.status_code != 200:
+            logger.info("OCSP check failed for %s (HTTP status: %d)",
+                        cert_path, response.status_code)
+            return None
+
+        try:
+            response_ocsp = ocsp.load_der_ocsp_response(response.content)
+            _check_ocsp_response(response_ocsp, request, issuer)
+        except (ValueError, errors.Error, InvalidSignature, UnsupportedAlgorithm) as e:
+            logger.error("Invalid OCSP response for %s: %s", cert_path, e or type(e).__name__)
+            return None
+        return response_ocsp
+
+    def _session(self, url):
+        """Get the session used for a responder."""
+        key = six.moves.urllib.parse.urlsplit(url)[:2]
+        with self._sessions_lock:
+            if key not in self._sessions:
+                self._sessions[key] = requests.Session()
+            return self._sessions[key]
+
+    def _cache_path(self, request):
+        key = hashlib.sha256(request.issuer_name_hash + request.issuer_key_hash +
+                             str(request.serial_number).encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + ".der")
+
+    def _load_cached_response(self, request, issuer):
+        """Load a cached OCSP response, if it is still valid."""
+        if self.cache_dir is None:
+            return None
+        path = self._cache_path(request)
+        try:
+            with open(path, 'rb') as f:
+                response_ocsp = ocsp.load_der_ocsp_response(f.read())
+            _check_ocsp_response(response_ocsp, request, issuer)
+        except IOError:
+            return None
+        except (ValueError, errors.Error, InvalidSignature, UnsupportedAlgorithm) as e:
+            logger.debug("Ignoring cached OCSP response %s: %s", path, e)
+            return None
+        if response_ocsp.next_update is None or response_ocsp.next_update <= datetime.utcnow():
+            return None
+        logger.debug("Using cached OCSP response %s", path)
+        return response_ocsp
+
+    def _save_cached_response(self, request, response_ocsp):
+        """Cache an OCSP response until its nextUpdate time."""
+        if self.cache_dir is None or response_ocsp.next_update is None:
+            return
+        path = self._cache_path(request)
+        try:
+            util.make_or_verify_dir(self.cache_dir, 0o700)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(response_ocsp.public_bytes(serialization.Encoding.DER))
+            os.rename(temp_path, path)
+        except (IOError, OSError, errors.Error) as e:
+            logger.debug("Unable to cache OCSP response in %s: %s", path, e)
+
+
+def _load_cert(path):
+    """Load the first certificate of a PEM file."""
+    return crypto_util.cert_info(path).certificate
+
+
+def _ocsp_uri(cert):
+    """Get the OCSP URI of a certificate, or an empty string."""
+    try:
+        aia = cert.extensions.get_extension_for_class(x509.AuthorityInformationAccess)
+    except x509.ExtensionNotFound:
+        return ""
+    for description in aia.value:
+        if description.access_method == x509.oid.AuthorityInformationAccessOID.OCSP:
+            return description.access_location.value
+    return ""
+
+
+def _check_ocsp_response(response_ocsp, request_ocsp, issuer_cert):
+    """Verify that an OCSP response is valid for a request.
+
+    :raises errors.Error: If the response is not valid.
+    :raises InvalidSignature: If the response signature is not valid.
+
+    """
+    if response_ocsp.response_status != ocsp.OCSPResponseStatus.SUCCESSFUL:
+        raise errors.Error('the responder answered {0}'.format(
+            response_ocsp.response_status.name))
+
+    # Assert OCSP response corresponds to the certificate we are talking about
+    if response_ocsp.serial_number != request_ocsp.serial_number:
+        raise errors.Error('the certificate in response does not correspond '
+                           'to the certificate in request')
+
+    # Assert signature is valid
+    _check_ocsp_response_signature(response_ocsp, issuer_cert)
+
+    # Assert issuer in response is the expected one
+    if (not isinstance(response_ocsp.hash_algorithm, type(request_ocsp.hash_algorithm))
+            or response_ocsp.issuer_key_hash != request_ocsp.issuer_key_hash
+            or response_ocsp.issuer_name_hash != request_ocsp.issuer_name_hash):
+        raise errors.Error('the issuer does not correspond to issuer of the certificate.')
+
+    # Either nextUpdate is set, and thisUpdate < now < nextUpdate is required,
+    # or it is not, and thisUpdate < now is required.
+    now = datetime.utcnow()
+    if not response_ocsp.this_update:
+        raise errors.Error('param thisUpdate is not set.')
+    if response_ocsp.this_update > now + CLOCK_SKEW:
+        raise errors.Error('param thisUpdate is in the future.')
+    if response_ocsp.next_update and response_ocsp.next_update < now - CLOCK_SKEW:
+        raise errors.Error('param nextUpdate is in the past.')
+
+
+def _check_ocsp_response_signature(response_ocsp, issuer_cert):
+    """Verify an OCSP response signature against certificate issuer or responder."""
+    if _is_responder(response_ocsp, issuer_cert):
+        # The OCSP responder is the certificate issuer
+        responder_cert = issuer_cert
+    else:
+        # The OCSP responder is a delegate of the certificate issuer
+        responder_certs = [cert for cert in response_ocsp.certificates
+                           if _is_responder(response_ocsp, cert)]
+        if not responder_certs:
+            raise errors.Error('no matching responder certificate could be found')
+        responder_cert = responder_certs[0]
+
+        if responder_cert.issuer != issuer_cert.subject:
+            raise errors.Error('responder certificate is not signed by the certificate\'s issuer')
+        try:
+            extension = responder_cert.extensions.get_extension_for_class(x509.ExtendedKeyUsage)
+            delegate_authorized = x509.oid.ExtendedKeyUsageOID.OCSP_SIGNING in extension.value
+        except (x509.ExtensionNotFound, IndexError):
+            delegate_authorized = False
+        if not delegate_authorized:
+            raise errors.Error('responder is not authorized by issuer to sign OCSP responses')
+
+        # The delegate's certificate must be signed by the certificate issuer
+        crypto_util.verify_signed_payload(issuer_cert.public_key(), responder_cert.signature,
+                                          responder_cert.tbs_certificate_bytes,
+                                          responder_cert.signature_hash_algorithm)
+
+    # The OCSP response must be signed by the responder
+    crypto_util.verify_signed_payload(responder_cert.public_key(), response_ocsp.signature,
+                                      response_ocsp.tbs_response_bytes,
+                                      response_ocsp.signature_hash_algorithm)
+
+
+def _is_responder(response_ocsp, cert):
+    """Whether the responder identified in an OCSP response is a certificate's subject."""
+    if response_ocsp.responder_name is not None:
+        return response_ocsp.responder_name == cert.subject
+    key_identifier = x509.SubjectKeyIdentifier.from_public_key(cert.public_key())
+    return response_ocsp.responder_key_hash == key_identifier.digest
 
-        url = url.rstrip()
-        host = url.partition("://")[2].rstrip("/")
-        if host:
-            return url, host
-        else:
-            logger.info("Cannot process OCSP host from URL (%s) in cert at %s", url, cert_path)
-            return None, None
 
 def _translate_ocsp_query(cert_path, ocsp_output, ocsp_errors):
     """Parse openssl's weird output to work out what it means."""
@@ -117,4 +478,3 @@ def _translate_ocsp_query(cert_path, ocsp_output, ocsp_errors):
         logger.warn("Unable to properly parse OCSP output: %s\nstderr:%s",
                     ocsp_output, ocsp_errors)
         return False
-
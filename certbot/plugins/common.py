@@ -4,6 +4,8 @@ import os
 import re
 import shutil
 import tempfile
+import threading
+import weakref
 
 import OpenSSL
 import pkg_resources
@@ -359,10 +361,19 @@ class ChallengePerformer(object):
         raise NotImplementedError()
 
 
+# Key used for the tls-sni-01 challenge certificates of each plugin, see
+# TLSSNI01.challenge_key. Entries go away with the plugin.
+_challenge_keys = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+_challenge_keys_lock = threading.Lock()
+
+
 class TLSSNI01(ChallengePerformer):
     # pylint: disable=abstract-method
     """Abstract base for TLS-SNI-01 challenge performers"""
 
+    key_size = 2048
+    """Size of the RSA key of the challenge certificates."""
+
     def __init__(self, configurator):
         super(TLSSNI01, self).__init__(configurator)
         self.challenge_conf = os.path.join(
@@ -391,9 +402,39 @@ class TLSSNI01(ChallengePerformer):
         """Returns z_domain (SNI) name for the challenge."""
         return achall.response(achall.account_key).z_domain.decode("utf-8")
 
+    def challenge_key(self):
+        """Key shared by the challenge certificates of the configurator.
+
+        Generating an RSA key takes much longer than signing a
+        certificate with it, so a single key is generated the first time
+        it is needed and reused for every challenge certificate for as
+        long as the configurator exists.
+
+        :rtype: `OpenSSL.crypto.PKey`
+
+        """
+        with _challenge_keys_lock:
+            key = _challenge_keys.get(self.configurator)
+            if key is None:
+                key = OpenSSL.crypto.PKey()
+                key.generate_key(OpenSSL.crypto.TYPE_RSA, self.key_size)
+                _challenge_keys[self.configurator] = key
+            return key
+
     def _setup_challenge_cert(self, achall, cert_key=None):
+        """Generate and write out challenge certificate.
+
+        :param .KeyAuthorizationAnnotatedChallenge achall: Annotated
+            tls-sni-01 challenge.
+        :param OpenSSL.crypto.PKey cert_key: Key of the certificate,
+            `challenge_key` if not provided.
+
+        :returns: challenge response
+        :rtype: `acme.challenges.TLSSNI01Response`
 
-        """Generate and write out challenge certificate."""
+        """
+        if cert_key is None:
+            cert_key = self.challenge_key()
         cert_path = self.get_cert_path(achall)
         key_path = self.get_key_path(achall)
         # Register the path before you write out the file
@@ -336,6 +336,29 @@ class TLSSNI01Test(unittest.TestCase):
         mock_safe_open.return_value.write.assert_called_once_with(
             OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, key))
 
+    def test_setup_challenge_cert_default_key(self):
+        achall = mock.MagicMock()
+        achall.chall.encode.return_value = "token"
+        achall.response_and_validation.return_value = (
+            challenges.TLSSNI01Response(), (test_util.load_cert("cert_512.pem"),
+                                            test_util.load_pyopenssl_private_key("rsa512_key.pem")))
+        key = OpenSSL.crypto.PKey()
+        with mock.patch("certbot.plugins.common.util.safe_open", mock.mock_open()):
+            with mock.patch("certbot.plugins.common.open", mock.mock_open(), create=True):
+                with mock.patch.object(self.sni, "challenge_key", return_value=key):
+                    self.sni._setup_challenge_cert(achall)  # pylint: disable=protected-access
+        achall.response_and_validation.assert_called_once_with(cert_key=key)
+
+    @mock.patch("certbot.plugins.common.OpenSSL.crypto.PKey")
+    def test_challenge_key_reused(self, mock_pkey):
+        from certbot.plugins.common import TLSSNI01
+        mock_pkey.side_effect = mock.MagicMock
+        key = self.sni.challenge_key()
+        self.assertTrue(TLSSNI01(self.sni.configurator).challenge_key() is key)
+        key.generate_key.assert_called_once_with(OpenSSL.crypto.TYPE_RSA, 2048)
+        self.assertFalse(TLSSNI01(mock.MagicMock()).challenge_key() is key)
+        self.assertEqual(mock_pkey.call_count, 2)
+
     def test_get_z_domain(self):
         achall = ACHALLS[0]
         self.assertEqual(self.sni.get_z_domain(achall),
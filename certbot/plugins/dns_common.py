@@ -1,33 +1,66 @@
 """Common code for DNS Authenticator Plugins."""
 
 import abc
+import contextlib
+import hashlib
+import json
 import logging
 import os
 import stat
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 from time import sleep
 
 import configobj
+import six
 import zope.interface
 from acme import challenges
+from acme.magic_typing import Callable, Dict, Optional, Tuple  # pylint: disable=unused-import, no-name-in-module
 
 from certbot import errors
 from certbot import interfaces
+from certbot import util
 from certbot.display import ops
 from certbot.display import util as display_util
 from certbot.plugins import common
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_ZONE_CACHE_TTL = 3600
+"""Seconds for which the zone of a name is remembered within a run."""
+
+ZONE_CACHE_FILENAME = "dns-zones.json"
+"""Name of the file in the working directory holding persisted zones."""
+
+# Zone cache shared between all DNS plugins. Only populated while
+# shared_zone_cache is active.
+_zone_cache = None  # type: Optional[ZoneCache]
+_zone_cache_lock = threading.Lock()
+
+# Rate limiters shared between all instances of a DNS plugin.
+_rate_limiters = {}  # type: Dict[type, _RateLimiter]
+_rate_limiters_lock = threading.Lock()
+
 
 @zope.interface.implementer(interfaces.IAuthenticator)
 @zope.interface.provider(interfaces.IPluginFactory)
 class DNSAuthenticator(common.Plugin):
     """Base class for DNS  Authenticators"""
 
+    max_concurrency = 1
+    """Maximum number of zones or records whose changes are made at the same time.
+
+    Plugins whose changes are safe to make from several threads at once raise it."""
+
+    max_requests_per_second = None  # type: Optional[float]
+    """Maximum rate at which changes are started, if the DNS provider limits API usage."""
+
     def __init__(self, config, name):
         super(DNSAuthenticator, self).__init__(config, name)
 
         self._attempt_cleanup = False
+        self._zone_cache = ZoneCache()
 
     @classmethod
     def add_parser_arguments(cls, add, default_propagation_seconds=10):  # pylint: disable=arguments-differ
@@ -36,6 +69,18 @@ class DNSAuthenticator(common.Plugin):
             type=int,
             help='The number of seconds to wait for DNS to propagate before asking the ACME server '
                  'to verify the DNS record.')
+        add('propagation-check',
+            default=False,
+            action='store_true',
+            help='Instead of always waiting for the propagation seconds, query the authoritative '
+                 'nameservers of each zone and stop waiting as soon as all of them serve the new '
+                 'DNS records. Requires dnspython.')
+        add('zone-cache-ttl',
+            default=0,
+            type=int,
+            help='The number of seconds for which the DNS zone found for each domain is '
+                 'remembered across runs, in the working directory. By default zones are only '
+                 'remembered during a single run.')
 
     def get_chall_pref(self, unused_domain): # pylint: disable=missing-docstring,no-self-use
         return [challenges.DNS01]
@@ -48,32 +93,91 @@ class DNSAuthenticator(common.Plugin):
 
         self._attempt_cleanup = True
 
-        responses = []
-        for achall in achalls:
-            domain = achall.domain
-            validation_domain_name = achall.validation_domain_name(domain)
-            validation = achall.validation(achall.account_key)
-
-            self._perform(domain, validation_domain_name, validation)
-            responses.append(achall.response(achall.account_key))
+        records = self._records(achalls)
+        with self._shared_zone_cache():
+            self._perform_batch(records)
+        responses = [achall.response(achall.account_key) for achall in achalls]
 
-        # DNS updates take time to propagate and checking to see if the update has occurred is not
-        # reliable (the machine this code is running on might be able to see an update before
-        # the ACME server). So: we sleep for a short amount of time we believe to be long enough.
-        logger.info("Waiting %d seconds for DNS changes to propagate",
-                    self.conf('propagation-seconds'))
-        sleep(self.conf('propagation-seconds'))
+        propagation_seconds = self.conf('propagation-seconds')
+        if propagation_seconds > 0 and self.conf('propagation-check'):
+            self._wait_for_propagation([(validation_domain_name, validation)
+                                        for _, validation_domain_name, validation in records],
+                                       propagation_seconds)
+        else:
+            # DNS updates take time to propagate and checking to see if the update has occurred is
+            # not reliable (the machine this code is running on might be able to see an update
+            # before the ACME server). So: we sleep for a short amount of time we believe to be long
+            # enough.
+            logger.info("Waiting %d seconds for DNS changes to propagate", propagation_seconds)
+            sleep(propagation_seconds)
 
         return responses
 
+    def _wait_for_propagation(self, records, timeout):
+        """
+        Wait until the authoritative nameservers serve the records, for at most timeout seconds.
+
+        Falls back to sleeping for the whole timeout if the nameservers cannot be checked.
+
+        :param list records: (validation domain name, validation) tuples
+        :param int timeout: The maximum number of seconds to wait.
+        """
+        start = time.time()
+        try:
+            from certbot.plugins import dns_propagation
+        except ImportError:
+            logger.warning("dnspython is required to check DNS propagation; waiting %d seconds "
+                           "instead", timeout)
+            sleep(timeout)
+            return
+
+        logger.info("Waiting up to %d seconds for DNS changes to propagate", timeout)
+        try:
+            if dns_propagation.PropagationChecker().wait(records, timeout):
+                logger.info("DNS changes propagated after %.1f seconds", time.time() - start)
+            else:
+                logger.info("DNS changes did not propagate to all nameservers within %d seconds; "
+                            "continuing anyway", timeout)
+        except errors.PluginError as e:
+            remaining = timeout - (time.time() - start)
+            logger.warning("Unable to check DNS propagation (%s); waiting %d seconds instead",
+                           e, max(remaining, 0))
+            sleep(max(remaining, 0))
+
     def cleanup(self, achalls):  # pylint: disable=missing-docstring
         if self._attempt_cleanup:
-            for achall in achalls:
-                domain = achall.domain
-                validation_domain_name = achall.validation_domain_name(domain)
-                validation = achall.validation(achall.account_key)
+            with self._shared_zone_cache():
+                self._cleanup_batch(self._records(achalls))
 
-                self._cleanup(domain, validation_domain_name, validation)
+    @staticmethod
+    def _records(achalls):
+        """
+        List the DNS records which solve the challenges.
+
+        :param list achalls: The challenges.
+        :returns: (domain, validation domain name, validation) tuples
+        :rtype: list
+        """
+        records = []
+        for achall in achalls:
+            domain = achall.domain
+            validation_domain_name = achall.validation_domain_name(domain)
+            validation = achall.validation(achall.account_key)
+            records.append((domain, validation_domain_name, validation))
+        return records
+
+    @contextlib.contextmanager
+    def _shared_zone_cache(self):
+        """
+        Share this authenticator's zone cache with its clients, unless one is already shared.
+
+        If requested, the cache is persisted in the working directory.
+        """
+        with shared_zone_cache(self._zone_cache) as cache:
+            ttl = self.conf('zone-cache-ttl')
+            if ttl:
+                cache.persist(os.path.join(self.config.work_dir, ZONE_CACHE_FILENAME), ttl)
+            yield cache
 
     @abc.abstractmethod
     def _setup_credentials(self):  # pragma: no cover
@@ -107,6 +211,75 @@ class DNSAuthenticator(common.Plugin):
         """
         raise NotImplementedError()
 
+    def _perform_batch(self, records):
+        """
+        Performs dns-01 challenges by creating several DNS TXT records at once.
+
+        The default implementation calls `_perform` for each record, concurrently (see
+        `_for_each`). Plugins which can submit many record changes as one transaction should
+        override it, so that they make one change per zone rather than one per challenge.
+
+        :param list records: (domain, validation domain name, validation) tuples
+        :raises errors.PluginError: If the records cannot be created.
+        """
+        self._for_each(lambda record: self._perform(*record), records)
+
+    def _cleanup_batch(self, records):
+        """
+        Deletes several DNS TXT records at once, which were created by `_perform_batch`.
+
+        The default implementation calls `_cleanup` for each record, concurrently.
+
+        :param list records: (domain, validation domain name, validation) tuples
+        """
+        self._for_each(lambda record: self._cleanup(*record), records)
+
+    def _for_each(self, func, items):
+        """
+        Call a function on each item, concurrently.
+
+        At most `max_concurrency` calls run at the same time, and calls start at most
+        `max_requests_per_second` times per second across all instances of the plugin. Every
+        item is processed, even if some of the calls fail, so that all changes which can be
+        made are made and can later be cleaned up.
+
+        :param callable func: Called with each item.
+        :param list items: The items.
+
+        :returns: The values returned by func, in the order of the items.
+        :rtype: list
+
+        :raises Exception: The error raised by func, if it fails for a single item.
+        :raises errors.PluginError: If func fails for several items.
+        """
+        limiter = _rate_limiter(type(self), self.max_requests_per_second)
+
+        def call(item):  # pylint: disable=missing-docstring
+            limiter.wait()
+            try:
+                return func(item), None
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug('Encountered error processing %s: %s', item, e, exc_info=True)
+                return None, e
+
+        if self.max_concurrency > 1 and len(items) > 1:
+            pool = ThreadPool(min(self.max_concurrency, len(items)))
+            try:
+                outcomes = pool.map(call, items)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            outcomes = [call(item) for item in items]
+
+        failures = [e for _, e in outcomes if e is not None]
+        if len(failures) == 1:
+            raise failures[0]
+        elif failures:
+            raise errors.PluginError('{0} DNS record changes failed: {1}'.format(
+                len(failures), '; '.join(str(e) for e in failures)))
+        return [result for result, _ in outcomes]
+
     def _configure(self, key, label):
         """
         Ensure that a configuration value is available.
@@ -235,6 +408,33 @@ class DNSAuthenticator(common.Plugin):
             raise errors.PluginError('{0} required to proceed.'.format(label))
 
 
+class _RateLimiter(object):
+    """Spaces out calls evenly so that they do not exceed a rate."""
+
+    def __init__(self, rate):
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Wait until the next call may start."""
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _rate_limiter(key, rate):
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = _RateLimiter(rate)
+        return _rate_limiters[key]
+
+
 class CredentialsConfiguration(object):
     """Represents a user-supplied filed which stores API credentials."""
 
@@ -333,3 +533,206 @@ def base_domain_name_guesses(domain):
 
     fragments = domain.split('.')
     return ['.'.join(fragments[i:]) for i in range(0, len(fragments))]
+
+
+@contextlib.contextmanager
+def shared_zone_cache(cache=None):
+    """Share a zone cache between all DNS plugins while in this context.
+
+    Within the context, `zone_cache` returns the same cache, so that a
+    zone is looked up once however many names or lineages it serves.
+    Contexts may be nested; the cache is dropped when the outermost one
+    exits.
+
+    :param ZoneCache cache: The cache to share if no cache is shared yet.
+        A new cache is used by default.
+
+    :returns: The shared cache.
+    :rtype: ZoneCache
+
+    """
+    global _zone_cache  # pylint: disable=global-statement
+    with _zone_cache_lock:
+        outermost = _zone_cache is None
+        if outermost:
+            _zone_cache = cache if cache is not None else ZoneCache()
+        shared = _zone_cache
+    try:
+        yield shared
+    finally:
+        if outermost:
+            with _zone_cache_lock:
+                _zone_cache = None
+
+
+def zone_cache():
+    """Return the shared zone cache.
+
+    :returns: The cache shared by `shared_zone_cache`, or a new, private
+        cache outside of that context.
+    :rtype: ZoneCache
+
+    """
+    shared = _zone_cache
+    return shared if shared is not None else ZoneCache()
+
+
+def zone_cache_namespace(provider, *identity):
+    """Return a zone cache namespace for an account at a DNS provider.
+
+    The identity is hashed so that no credentials are persisted with the
+    cache.
+
+    :param str provider: The name of the DNS provider.
+    :param identity: Values identifying the account or server, such as
+        an API token.
+
+    :returns: The namespace.
+    :rtype: str
+
+    """
+    digest = hashlib.sha256()
+    for value in identity:
+        digest.update(repr(value).encode('utf-8'))
+    return '{0}:{1}'.format(provider, digest.hexdigest())
+
+
+class ZoneCache(object):
+    """Remembers which domain names are zones at a DNS provider.
+
+    Every name tried by `find_zone` is remembered, whether it is a zone
+    or not, so names sharing a suffix only cause lookups for the labels
+    in which they differ. Entries are grouped by a namespace identifying
+    the provider (and account or server) they were found at.
+
+    :ivar float ttl: Seconds for which new entries are remembered.
+    :ivar str path: File in which entries are persisted, if any.
+
+    """
+
+    def __init__(self, ttl=DEFAULT_ZONE_CACHE_TTL):
+        self.ttl = ttl
+        self.path = None  # type: Optional[str]
+        # namespace -> name -> (zone value or None, expiry time)
+        self._entries = {}  # type: Dict[str, Dict[str, Tuple[Optional[str], float]]]
+        self._lock = threading.Lock()
+
+    def find_zone(self, namespace, name, probe):
+        """Find the zone of a domain name.
+
+        The guesses of `base_domain_name_guesses` are tried from the most
+        specific one, and only those not in the cache are probed.
+
+        :param str namespace: Identifies the DNS provider.
+        :param str name: The domain name.
+        :param callable probe: Called with a guess, returns a value
+            identifying the zone (such as its id) if the guess is a zone at
+            the provider, or ``None`` if it is not. Errors are propagated
+            and not remembered.
+
+        :returns: The zone name and the value returned by probe for it, or
+            ``None`` if no guess is a zone.
+        :rtype: tuple
+
+        """
+        changed = False
+        try:
+            for guess in base_domain_name_guesses(name.rstrip('.').lower()):
+                with self._lock:
+                    entry = self._entries.get(namespace, {}).get(guess)
+                if entry is not None and entry[1] > time.time():
+                    value = entry[0]
+                else:
+                    value = probe(guess)
+                    with self._lock:
+                        self._entries.setdefault(namespace, {})[guess] = (
+                            value, time.time() + self.ttl)
+                    changed = True
+                if value is not None:
+                    return guess, value
+            return None
+        finally:
+            if changed:
+                self._save()
+
+    def invalidate(self, namespace, name):
+        """Forget everything remembered about a domain name and its parents.
+
+        :param str namespace: Identifies the DNS provider.
+        :param str name: The domain name.
+
+        """
+        with self._lock:
+            entries = self._entries.get(namespace, {})
+            for guess in base_domain_name_guesses(name.rstrip('.').lower()):
+                entries.pop(guess, None)
+        self._save()
+
+    def persist(self, path, ttl):
+        """Persist the cache in a file, loading the entries it holds.
+
+        :param str path: The file in which the cache is persisted.
+        :param float ttl: Seconds for which new entries are remembered.
+
+        """
+        with self._lock:
+            self.ttl = ttl
+            if self.path == path:
+                return
+            self.path = path
+            try:
+                with open(path) as f:
+                    persisted = _persisted_zone_entries(json.load(f))
+            except (IOError, OSError, ValueError, TypeError, AttributeError) as e:
+                logger.debug("Unable to load DNS zone cache from %s: %s", path, e)
+                return
+            now = time.time()
+            for namespace, name, value, expiry in persisted:
+                if expiry > now:
+                    self._entries.setdefault(namespace, {})[name] = (value, expiry)
+
+    def _save(self):
+        with self._lock:
+            if self.path is None:
+                return
+            # Names that are not zones are only remembered by this process,
+            # so that a zone delegated since is found by the next runs.
+            now = time.time()
+            persisted = dict(
+                (namespace, dict((name, entry) for name, entry in entries.items()
+                                 if entry[0] is not None and entry[1] > now))
+                for namespace, entries in self._entries.items())
+            temp_path = self.path + ".tmp"
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                with util.safe_open(temp_path, "w", chmod=0o600) as f:
+                    json.dump(persisted, f)
+                os.rename(temp_path, self.path)
+            except (IOError, OSError) as e:
+                logger.debug("Unable to save DNS zone cache to %s: %s", self.path, e)
+
+
+def _persisted_zone_entries(persisted):
+    """Validate the entries of a persisted zone cache.
+
+    :param dict persisted: The decoded contents of the cache file.
+
+    :returns: (namespace, name, value, expiry) tuples
+    :rtype: list
+
+    :raises ValueError: If the entries are invalid.
+
+    """
+    entries = []
+    for namespace, names in persisted.items():
+        for name, (value, expiry) in names.items():
+            if value is None:  # not persisted anymore
+                continue
+            if (not isinstance(namespace, six.string_types) or
+                    not isinstance(name, six.string_types) or
+                    not isinstance(value, (six.string_types, bool, int, float)) or
+                    isinstance(expiry, bool) or not isinstance(expiry, (int, float))):
+                raise ValueError("Invalid entry for {0} in {1}".format(name, namespace))
+            entries.append((namespace, name, value, expiry))
+    return entries
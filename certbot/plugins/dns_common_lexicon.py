@@ -60,32 +60,74 @@ class LexiconClient(object):
         """
         Find the domain_id for a given domain.
 
+        The zone of the domain is looked up in the shared zone cache, so the provider is only
+        authenticated against once per zone rather than once per guess on every call.
+
         :param str domain: The domain for which to find the domain_id.
         :raises errors.PluginError: if the domain_id cannot be found.
         """
 
         domain_name_guesses = dns_common.base_domain_name_guesses(domain)
+        cache = dns_common.zone_cache()
+        namespace = self._zone_cache_namespace()
+        authenticated = []
+
+        def probe(domain_name):  # pylint: disable=missing-docstring
+            if self._authenticate(domain_name):
+                authenticated.append(domain_name)
+                return True
+            return None
+
+        found = cache.find_zone(namespace, domain, probe)
+        if found is not None and found[0] not in authenticated and not probe(found[0]):
+            # The cached zone is gone, look it up again.
+            cache.invalidate(namespace, domain)
+            found = cache.find_zone(namespace, domain, probe)
+
+        if found is None:
+            raise errors.PluginError('Unable to determine zone identifier for {0} using zone '
+                                     'names: {1}'.format(domain, domain_name_guesses))
+
+    def _authenticate(self, domain_name):
+        """
+        Authenticate against the provider for a domain name.
+
+        :param str domain_name: The domain name to authenticate for.
+        :returns: True if the domain name is a zone at the provider, False otherwise.
+        :rtype: bool
+        :raises errors.PluginError: if an error occurs communicating with the DNS Provider API
+        """
 
-        for domain_name in domain_name_guesses:
-            try:
-                self.provider.options['domain'] = domain_name
+        try:
+            self.provider.options['domain'] = domain_name
 
-                self.provider.authenticate()
+            self.provider.authenticate()
 
-                return  # If `authenticate` doesn't throw an exception, we've found the right name
-            except HTTPError as e:
-                result = self._handle_http_error(e, domain_name)
+            return True  # If `authenticate` doesn't throw an exception, we've found the right name
+        except HTTPError as e:
+            result = self._handle_http_error(e, domain_name)
 
-                if result:
-                    raise result
-            except Exception as e:  # pylint: disable=broad-except
-                result = self._handle_general_error(e, domain_name)
+            if result:
+                raise result
+        except Exception as e:  # pylint: disable=broad-except
+            result = self._handle_general_error(e, domain_name)
 
-                if result:
-                    raise result
+            if result:
+                raise result
+
+        return False
+
+    def _zone_cache_namespace(self):
+        """
+        Identify the provider account in the zone cache.
+
+        :returns: The zone cache namespace.
+        :rtype: str
+        """
 
-        raise errors.PluginError('Unable to determine zone identifier for {0} using zone names: {1}'
-                                 .format(domain, domain_name_guesses))
+        options = sorted((key, value) for key, value in self.provider.options.items()
+                         if key != 'domain')
+        return dns_common.zone_cache_namespace(type(self.provider).__module__, options)
 
     def _handle_http_error(self, e, domain_name):
         return errors.PluginError('Error determining zone identifier for {0}: {1}.'
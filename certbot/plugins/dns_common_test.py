@@ -1,11 +1,14 @@
 """Tests for certbot.plugins.dns_common."""
 
 import collections
+import json
 import logging
 import os
+import threading
 import unittest
 
 import mock
+import six
 
 from certbot import errors
 from certbot.display import util as display_util
@@ -31,6 +34,7 @@ class DNSAuthenticatorTest(util.TempDirTestCase, dns_test_common.BaseAuthenticat
 
     class _FakeConfig(object):
         fake_propagation_seconds = 0
+        fake_zone_cache_ttl = 0
         fake_config_key = 1
         fake_other_key = None
         fake_file_path = None
@@ -47,6 +51,51 @@ class DNSAuthenticatorTest(util.TempDirTestCase, dns_test_common.BaseAuthenticat
 
         self.auth._perform.assert_called_once_with(dns_test_common.DOMAIN, mock.ANY, mock.ANY)
 
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    def test_perform_sleeps(self, mock_sleep):
+        self.config.fake_propagation_seconds = 30
+        self.config.fake_propagation_check = False
+        self.auth.perform([self.achall])
+        mock_sleep.assert_called_once_with(30)
+
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    @mock.patch('certbot.plugins.dns_propagation.PropagationChecker')
+    def test_perform_propagation_check(self, mock_checker, mock_sleep):
+        self.config.fake_propagation_seconds = 30
+        self.config.fake_propagation_check = True
+        for propagated in (True, False):
+            mock_checker().wait.return_value = propagated
+            self.auth.perform([self.achall])
+            mock_checker().wait.assert_called_with(
+                [(self.achall.validation_domain_name(dns_test_common.DOMAIN),
+                  self.achall.validation(self.achall.account_key))], 30)
+        self.assertFalse(mock_sleep.called)
+
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    @mock.patch('certbot.plugins.dns_propagation.PropagationChecker')
+    def test_perform_propagation_check_error(self, mock_checker, mock_sleep):
+        self.config.fake_propagation_seconds = 30
+        self.config.fake_propagation_check = True
+        mock_checker().wait.side_effect = errors.PluginError
+        self.auth.perform([self.achall])
+        self.assertTrue(0 < mock_sleep.call_args[0][0] <= 30)
+
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    def test_perform_propagation_check_no_dnspython(self, mock_sleep):
+        self.config.fake_propagation_seconds = 30
+        self.config.fake_propagation_check = True
+        real_import = six.moves.builtins.__import__
+
+        def fake_import(name, *args):  # pylint: disable=missing-docstring
+            fromlist = args[2] if len(args) > 2 else None
+            if fromlist and 'dns_propagation' in fromlist:
+                raise ImportError(name)
+            return real_import(name, *args)
+
+        with mock.patch('six.moves.builtins.__import__', side_effect=fake_import):
+            self.auth.perform([self.achall])
+        mock_sleep.assert_called_once_with(30)
+
     def test_cleanup(self):
         self.auth._attempt_cleanup = True
 
@@ -54,6 +103,78 @@ class DNSAuthenticatorTest(util.TempDirTestCase, dns_test_common.BaseAuthenticat
 
         self.auth._cleanup.assert_called_once_with(dns_test_common.DOMAIN, mock.ANY, mock.ANY)
 
+    def test_perform_concurrently(self):
+        started = threading.Event()
+        barrier = threading.Semaphore(0)
+
+        def perform(*unused_args):
+            # Only returns once both records are being performed at the same time
+            if started.is_set():
+                barrier.release()
+            else:
+                started.set()
+                self.assertTrue(barrier.acquire(timeout=5))
+        self.auth._perform = mock.MagicMock(side_effect=perform)
+        self.auth.max_concurrency = 2
+
+        self.auth.perform([self.achall, self.achall])
+
+        self.assertEqual(self.auth._perform.call_count, 2)
+
+    def test_perform_collects_errors(self):
+        self.auth._perform = mock.MagicMock(
+            side_effect=[errors.PluginError('foo'), None, errors.PluginError('bar')])
+
+        self.assertRaises(errors.PluginError, self.auth.perform, [self.achall] * 3)
+        self.assertEqual(self.auth._perform.call_count, 3)
+
+    def test_perform_single_error(self):
+        self.auth._perform = mock.MagicMock(side_effect=[ValueError, None])
+
+        self.assertRaises(ValueError, self.auth.perform, [self.achall] * 2)
+
+    def test_cleanup_collects_errors(self):
+        self.auth._attempt_cleanup = True
+        self.auth._cleanup = mock.MagicMock(side_effect=[errors.PluginError, None])
+
+        self.assertRaises(errors.PluginError, self.auth.cleanup, [self.achall] * 2)
+        self.assertEqual(self.auth._cleanup.call_count, 2)
+
+    def test_for_each_results(self):
+        self.assertEqual(self.auth._for_each(lambda x: x * 2, [1, 2, 3]), [2, 4, 6])
+
+    @mock.patch('certbot.plugins.dns_common.time')
+    def test_for_each_rate_limited(self, mock_time):
+        class _LimitedAuthenticator(DNSAuthenticatorTest._FakeDNSAuthenticator):
+            max_requests_per_second = 2
+        auth = _LimitedAuthenticator(self.config, "fake")
+        mock_time.time.return_value = 100.0
+
+        auth._for_each(lambda x: x, [1, 2, 3])
+
+        self.assertEqual(sorted(c[0][0] for c in mock_time.sleep.call_args_list), [0.5, 1.0])
+
+    def test_perform_shares_zone_cache(self):
+        caches = []
+        self.auth._perform = mock.MagicMock(
+            side_effect=lambda *args: caches.append(dns_common.zone_cache()))
+
+        self.auth.perform([self.achall, self.achall])
+
+        self.assertEqual(caches, [self.auth._zone_cache, self.auth._zone_cache])
+        self.assertTrue(dns_common.zone_cache() is not self.auth._zone_cache)
+
+    def test_perform_persists_zone_cache(self):
+        self.config.fake_zone_cache_ttl = 60
+        self.config.work_dir = self.tempdir
+        self.auth._perform = mock.MagicMock(side_effect=lambda *args: dns_common.zone_cache(
+            ).find_zone('fake', 'example.com', lambda guess: 'id'))
+
+        self.auth.perform([self.achall])
+
+        self.assertTrue(os.path.exists(
+            os.path.join(self.tempdir, dns_common.ZONE_CACHE_FILENAME)))
+
     @util.patch_get_utility()
     def test_prompt(self, mock_get_utility):
         mock_display = mock_get_utility()
@@ -229,5 +350,125 @@ class DomainNameGuessTest(unittest.TestCase):
         )
 
 
+class ZoneCacheTest(util.TempDirTestCase):
+
+    def setUp(self):
+        super(ZoneCacheTest, self).setUp()
+
+        self.cache = dns_common.ZoneCache()
+        self.probe = mock.MagicMock(side_effect=lambda guess: 'id' if guess == 'example.com' else None)
+
+    def test_find_zone(self):
+        self.assertEqual(self.cache.find_zone('ns', 'foo.example.com', self.probe),
+                         ('example.com', 'id'))
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_find_zone_cached(self):
+        self.cache.find_zone('ns', 'foo.example.com', self.probe)
+        self.probe.reset_mock()
+
+        self.assertEqual(self.cache.find_zone('ns', 'bar.foo.example.com.', self.probe),
+                         ('example.com', 'id'))
+        self.probe.assert_called_once_with('bar.foo.example.com')
+
+    def test_find_zone_namespaces(self):
+        self.cache.find_zone('ns', 'example.com', self.probe)
+
+        self.cache.find_zone('other', 'example.com', self.probe)
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_find_zone_not_found(self):
+        self.assertEqual(self.cache.find_zone('ns', 'example.org', self.probe), None)
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_find_zone_expired(self):
+        self.cache.ttl = 0
+        self.cache.find_zone('ns', 'example.com', self.probe)
+
+        self.cache.find_zone('ns', 'example.com', self.probe)
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_find_zone_error_not_cached(self):
+        self.probe.side_effect = [errors.PluginError, 'id']
+
+        self.assertRaises(errors.PluginError, self.cache.find_zone, 'ns', 'example.com', self.probe)
+        self.assertEqual(self.cache.find_zone('ns', 'example.com', self.probe),
+                         ('example.com', 'id'))
+
+    def test_invalidate(self):
+        self.cache.find_zone('ns', 'foo.example.com', self.probe)
+        self.cache.invalidate('ns', 'foo.example.com')
+
+        self.cache.find_zone('ns', 'foo.example.com', self.probe)
+        self.assertEqual(self.probe.call_count, 4)
+
+    def test_persist(self):
+        path = os.path.join(self.tempdir, 'zones.json')
+        self.cache.persist(path, 60)
+        self.cache.find_zone('ns', 'example.com', self.probe)
+
+        cache = dns_common.ZoneCache()
+        cache.persist(path, 60)
+        self.assertEqual(cache.find_zone('ns', 'example.com', self.probe),
+                         ('example.com', 'id'))
+        self.assertEqual(self.probe.call_count, 1)
+
+    def test_persist_unreadable(self):
+        path = os.path.join(self.tempdir, 'zones.json')
+        with open(path, 'w') as f:
+            f.write('garbage')
+
+        self.cache.persist(path, 60)
+        self.cache.find_zone('ns', 'example.com', self.probe)
+        self.assertEqual(self.probe.call_count, 1)
+
+    def test_persist_invalid(self):
+        path = os.path.join(self.tempdir, 'zones.json')
+        for contents in ('[]', '{"ns": []}', '{"ns": {"example.com": ["id", 1, 2]}}',
+                         '{"ns": {"example.com": ["id", "tomorrow"]}}',
+                         '{"ns": {"example.com": [["id"], 1e12]}}'):
+            with open(path, 'w') as f:
+                f.write(contents)
+            cache = dns_common.ZoneCache()
+            cache.persist(path, 60)
+            self.probe.reset_mock()
+            self.assertEqual(cache.find_zone('ns', 'example.com', self.probe),
+                             ('example.com', 'id'))
+            self.assertEqual(self.probe.call_count, 1)
+
+    def test_persist_not_found_in_memory_only(self):
+        path = os.path.join(self.tempdir, 'zones.json')
+        self.cache.persist(path, 60)
+        self.cache.find_zone('ns', 'foo.example.com', self.probe)
+        self.probe.reset_mock()
+        self.cache.find_zone('ns', 'foo.example.com', self.probe)
+        self.assertEqual(self.probe.call_count, 0)
+
+        with open(path) as f:
+            self.assertEqual(list(json.load(f)['ns']), ['example.com'])
+        cache = dns_common.ZoneCache()
+        cache.persist(path, 60)
+        cache.find_zone('ns', 'foo.example.com', self.probe)
+        self.probe.assert_called_once_with('foo.example.com')
+
+
+class SharedZoneCacheTest(unittest.TestCase):
+
+    def test_shared(self):
+        with dns_common.shared_zone_cache() as cache:
+            self.assertTrue(dns_common.zone_cache() is cache)
+            with dns_common.shared_zone_cache(dns_common.ZoneCache()) as inner:
+                self.assertTrue(inner is cache)
+            self.assertTrue(dns_common.zone_cache() is cache)
+        self.assertTrue(dns_common.zone_cache() is not cache)
+
+    def test_namespace_hides_identity(self):
+        namespace = dns_common.zone_cache_namespace('provider', 'secret-token')
+
+        self.assertTrue(namespace.startswith('provider:'))
+        self.assertFalse('secret-token' in namespace)
+        self.assertNotEqual(namespace, dns_common.zone_cache_namespace('provider', 'other'))
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
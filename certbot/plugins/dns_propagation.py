@@ -0,0 +1,153 @@
+"""Detection of DNS record propagation for DNS Authenticator Plugins."""
+import logging
+import socket
+import time
+
+import dns.exception
+import dns.flags
+import dns.message
+import dns.name  # pylint: disable=unused-import
+import dns.query
+import dns.rdatatype
+import dns.resolver
+
+from acme.magic_typing import Dict, List  # pylint: disable=unused-import, no-name-in-module
+
+from certbot import errors
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_TIMEOUT = 5
+"""Seconds to wait for a nameserver to answer a query."""
+
+DEFAULT_CHECK_INTERVAL = 2
+"""Seconds between checks of the nameservers."""
+
+
+class PropagationChecker(object):
+    """Checks whether TXT records are served by all authoritative nameservers.
+
+    The authoritative nameservers of each record's zone are queried
+    directly, so the check is not fooled by caching resolvers.
+
+    :ivar resolver: Resolver used to find zones and their nameservers.
+    :type resolver: `dns.resolver.Resolver`
+    :ivar int port: Port on which the authoritative nameservers are queried.
+    :ivar float query_timeout: Seconds to wait for a nameserver to answer.
+    :ivar float interval: Seconds between checks.
+
+    """
+
+    def __init__(self, resolver=None, port=53, query_timeout=DEFAULT_QUERY_TIMEOUT,
+                 interval=DEFAULT_CHECK_INTERVAL):
+        self.resolver = resolver if resolver is not None else dns.resolver.get_default_resolver()
+        self.port = port
+        self.query_timeout = query_timeout
+        self.interval = interval
+        self._zones = {}  # type: Dict[str, dns.name.Name]
+        self._addresses = {}  # type: Dict[dns.name.Name, List[str]]
+
+    def authoritative_addresses(self, name):
+        """Find the addresses of the authoritative nameservers of a name.
+
+        :param str name: A domain name.
+
+        :returns: IP addresses of the nameservers of the zone containing name.
+        :rtype: `list` of `str`
+
+        :raises errors.PluginError: if the nameservers cannot be found.
+
+        """
+        try:
+            if name not in self._zones:
+                self._zones[name] = dns.resolver.zone_for_name(name, resolver=self.resolver)
+            zone = self._zones[name]
+            if zone not in self._addresses:
+                addresses = set()
+                for nameserver in self.resolver.query(zone, dns.rdatatype.NS):
+                    addresses.update(self._resolve(nameserver.target))
+                if not addresses:
+                    raise errors.PluginError(
+                        'No addresses found for the nameservers of {0}'.format(zone))
+                self._addresses[zone] = sorted(addresses)
+        except dns.exception.DNSException as e:
+            raise errors.PluginError(
+                'Unable to find the nameservers of {0}: {1}'.format(name, e))
+        return self._addresses[zone]
+
+    def _resolve(self, host):
+        # Nameservers are normally reachable over IPv4, IPv6 is only used
+        # for those without an IPv4 address.
+        for rdtype in (dns.rdatatype.A, dns.rdatatype.AAAA):
+            try:
+                return [rdata.address for rdata in self.resolver.query(host, rdtype)]
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                pass
+        return []
+
+    def txt_values(self, address, name):
+        """Query a nameserver for the TXT values of a name.
+
+        :param str address: IP address of the nameserver.
+        :param str name: The name to look up.
+
+        :returns: The TXT values served for name.
+        :rtype: `set` of `str`
+
+        :raises dns.exception.DNSException: if the query fails.
+        :raises socket.error: if the nameserver is unreachable.
+
+        """
+        query = dns.message.make_query(name, dns.rdatatype.TXT)
+        query.flags &= ~dns.flags.RD
+        response = dns.query.udp(query, address, timeout=self.query_timeout, port=self.port)
+        if response.flags & dns.flags.TC:
+            response = dns.query.tcp(query, address, timeout=self.query_timeout, port=self.port)
+        values = set()
+        for rrset in response.answer:
+            if rrset.rdtype == dns.rdatatype.TXT:
+                for rdata in rrset:
+                    values.add(b''.join(rdata.strings).decode('utf-8'))
+        return values
+
+    def is_propagated(self, records):
+        """Are the records served by all authoritative nameservers?
+
+        :param list records: (validation domain name, validation) tuples
+
+        :rtype: bool
+
+        :raises errors.PluginError: if the nameservers cannot be found.
+
+        """
+        for name, value in records:
+            for address in self.authoritative_addresses(name):
+                try:
+                    served = self.txt_values(address, name)
+                except (dns.exception.DNSException, socket.error) as e:
+                    logger.debug('Querying %s for %s failed: %s', address, name, e)
+                    return False
+                if value not in served:
+                    logger.debug('Record %s is not yet served by %s', name, address)
+                    return False
+        return True
+
+    def wait(self, records, timeout):
+        """Wait until the records are served by all authoritative nameservers.
+
+        :param list records: (validation domain name, validation) tuples
+        :param float timeout: Maximum number of seconds to wait.
+
+        :returns: ``True`` if the records propagated before the timeout.
+        :rtype: bool
+
+        :raises errors.PluginError: if the nameservers cannot be found.
+
+        """
+        deadline = time.time() + timeout
+        while not self.is_propagated(records):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+        return True
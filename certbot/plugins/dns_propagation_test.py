@@ -0,0 +1,127 @@
+"""Tests for certbot.plugins.dns_propagation."""
+import threading
+import unittest
+
+import dns.exception
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+import mock
+from six.moves import socketserver  # pylint: disable=import-error
+
+from certbot import errors
+
+ZONE = {
+    ('example.com.', 'SOA'): ['ns1.example.com. admin.example.com. 1 3600 600 86400 60'],
+    ('example.com.', 'NS'): ['ns1.example.com.', 'ns2.example.com.'],
+    ('ns1.example.com.', 'A'): ['127.0.0.1'],
+    ('ns2.example.com.', 'A'): ['127.0.0.1'],
+}
+NAME = '_acme-challenge.www.example.com'
+
+
+class _StandInDNSHandler(socketserver.BaseRequestHandler):
+    """Answers queries from the records of the server."""
+
+    def handle(self):
+        data, sock = self.request
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        records = self.server.records  # type: ignore
+        self.server.queries.append((name, rdtype))  # type: ignore
+        if (name, rdtype) in records:
+            response.answer.append(dns.rrset.from_text(
+                name, 60, 'IN', rdtype, *records[(name, rdtype)]))
+        elif not any(record_name == name for record_name, _ in records):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        sock.sendto(response.to_wire(), self.client_address)
+
+
+class _StandInDNSServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
+    """Stand-in DNS server serving the records in ZONE."""
+    daemon_threads = True
+
+    def __init__(self):
+        socketserver.UDPServer.__init__(self, ('127.0.0.1', 0), _StandInDNSHandler)
+        self.records = dict(ZONE)
+        self.queries = []
+
+
+class PropagationCheckerTest(unittest.TestCase):
+    """Tests for certbot.plugins.dns_propagation.PropagationChecker."""
+
+    def setUp(self):
+        self.server = _StandInDNSServer()
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  kwargs={'poll_interval': 0.01})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        port = self.server.server_address[1]
+
+        resolver = dns.resolver.Resolver(configure=False)
+        resolver.nameservers = ['127.0.0.1']
+        resolver.port = port
+        resolver.lifetime = 5
+
+        from certbot.plugins.dns_propagation import PropagationChecker
+        self.checker = PropagationChecker(resolver=resolver, port=port,
+                                          query_timeout=1, interval=0.01)
+
+    def _serve_txt(self, *values):
+        self.server.records[(NAME + '.', 'TXT')] = ['"{0}"'.format(v) for v in values]
+
+    def test_authoritative_addresses(self):
+        self.assertEqual(['127.0.0.1'], self.checker.authoritative_addresses(NAME))
+        queries = len(self.server.queries)
+        self.checker.authoritative_addresses('other.example.com')
+        # Only the zone is looked up, its nameservers are cached
+        self.assertFalse(('example.com.', 'NS') in self.server.queries[queries:])
+
+    def test_authoritative_addresses_unknown_zone(self):
+        self.assertRaises(errors.PluginError,
+                          self.checker.authoritative_addresses, 'example.org')
+
+    def test_authoritative_addresses_no_address(self):
+        del self.server.records[('ns1.example.com.', 'A')]
+        del self.server.records[('ns2.example.com.', 'A')]
+        self.assertRaises(errors.PluginError,
+                          self.checker.authoritative_addresses, NAME)
+
+    def test_txt_values(self):
+        self._serve_txt('foo', 'bar')
+        self.assertEqual(set(['foo', 'bar']),
+                         self.checker.txt_values('127.0.0.1', NAME))
+
+    def test_is_propagated(self):
+        records = [(NAME, 'foo')]
+        self.assertFalse(self.checker.is_propagated(records))
+        self._serve_txt('foo')
+        self.assertTrue(self.checker.is_propagated(records))
+
+    def test_is_propagated_query_failure(self):
+        self.checker.authoritative_addresses(NAME)
+        with mock.patch('certbot.plugins.dns_propagation.dns.query.udp') as mock_udp:
+            mock_udp.side_effect = dns.exception.Timeout
+            self.assertFalse(self.checker.is_propagated([(NAME, 'foo')]))
+
+    def test_wait(self):
+        def publish(unused_seconds):
+            self._serve_txt('foo')
+        with mock.patch('certbot.plugins.dns_propagation.time.sleep') as mock_sleep:
+            mock_sleep.side_effect = publish
+            self.assertTrue(self.checker.wait([(NAME, 'foo')], 60))
+        self.assertEqual(1, mock_sleep.call_count)
+
+    def test_wait_timeout(self):
+        self.assertFalse(self.checker.wait([(NAME, 'foo')], 0.05))
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
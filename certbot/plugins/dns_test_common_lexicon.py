@@ -5,6 +5,7 @@ import mock
 from requests.exceptions import HTTPError, RequestException
 
 from certbot import errors
+from certbot.plugins import dns_common
 from certbot.plugins import dns_test_common
 from certbot.tests import util as test_util
 
@@ -56,6 +57,15 @@ class BaseLexiconClientTest(object):
                                                             name=self.record_name,
                                                             content=self.record_content)
 
+    def test_add_txt_record_shared_zone_cache(self):
+        self.provider_mock.authenticate.side_effect = [self.DOMAIN_NOT_FOUND, '', '']
+
+        with dns_common.shared_zone_cache():
+            self.client.add_txt_record(DOMAIN, self.record_name, self.record_content)
+            self.client.add_txt_record(DOMAIN, self.record_name, self.record_content)
+
+        self.assertEqual(self.provider_mock.authenticate.call_count, 3)
+
     def test_add_txt_record_fail_to_find_domain(self):
         self.provider_mock.authenticate.side_effect = [self.DOMAIN_NOT_FOUND,
                                                        self.DOMAIN_NOT_FOUND,
@@ -187,10 +187,6 @@ class Authenticator(common.Plugin):
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
 
-        # one self-signed key for all tls-sni-01 certificates
-        self.key = OpenSSL.crypto.PKey()
-        self.key.generate_key(OpenSSL.crypto.TYPE_RSA, 2048)
-
         self.served = collections.defaultdict(set)  # type: ServedType
 
         # Stuff below is shared across threads (i.e. servers read
@@ -262,8 +258,10 @@ class Authenticator(common.Plugin):
         port = self.config.tls_sni_01_port
         addr = self.config.tls_sni_01_address
         servers = self.servers.run(port, challenges.TLSSNI01, listenaddr=addr)
-        response, (cert, _) = achall.response_and_validation(cert_key=self.key)
-        self.certs[response.z_domain] = (self.key, cert)
+        # one self-signed key for all tls-sni-01 certificates
+        key = common.TLSSNI01(self).challenge_key()
+        response, (cert, _) = achall.response_and_validation(cert_key=key)
+        self.certs[response.z_domain] = (key, cert)
         return servers, response
 
     def cleanup(self, achalls):  # pylint: disable=missing-docstring
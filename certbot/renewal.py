@@ -1,26 +1,36 @@
 """Functionality for autorenewal and associated juggling of configurations"""
 from __future__ import print_function
+import collections
 import copy
 import itertools
 import logging
 import os
+import threading
 import traceback
 
+from multiprocessing.pool import ThreadPool
+
 import six
 import zope.component
 
 import OpenSSL
 
-from acme.magic_typing import List  # pylint: disable=unused-import, no-name-in-module
+# pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Dict, List, Tuple
+# pylint: enable=unused-import, no-name-in-module
 
 from certbot import cli
+from certbot import client
+from certbot import constants
 from certbot import crypto_util
 from certbot import errors
 from certbot import interfaces
+from certbot import ocsp
 from certbot import util
 from certbot import hooks
 from certbot import storage
 from certbot import updater
+from certbot.plugins import dns_common
 
 from certbot.plugins import disco as plugins_disco
 
@@ -34,7 +44,7 @@ STR_CONFIG_ITEMS = ["config_dir", "logs_dir", "work_dir", "user_agent",
                     "server", "account", "authenticator", "installer",
                     "standalone_supported_challenges", "renew_hook",
                     "pre_hook", "post_hook", "tls_sni_01_address",
-                    "http01_address"]
+                    "http01_address", "key_type", "elliptic_curve"]
 INT_CONFIG_ITEMS = ["rsa_key_size", "tls_sni_01_port", "http01_port"]
 BOOL_CONFIG_ITEMS = ["must_staple", "allow_subset_of_names", "reuse_key",
                      "autorenew"]
@@ -42,6 +52,14 @@ BOOL_CONFIG_ITEMS = ["must_staple", "allow_subset_of_names", "reuse_key",
 CONFIG_ITEMS = set(itertools.chain(
     BOOL_CONFIG_ITEMS, INT_CONFIG_ITEMS, STR_CONFIG_ITEMS, ('pref_challs',)))
 
+# Outcomes of processing a single lineage during "certbot renew"
+RENEW_SUCCESS = "success"
+RENEW_FAILURE = "failure"
+RENEW_SKIPPED = "skipped"
+
+OCSP_TIME_BUDGET = 60
+"""Seconds that ``certbot renew`` spends querying OCSP responders."""
+
 
 def _reconstitute(config, full_path):
     """Try to instantiate a RenewableCert, updating config with relevant items.
@@ -370,6 +388,258 @@ def _renew_describe_results(config, renew_successes, renew_failures,
     disp.notification("\n".join(out), wrap=False)
 
 
+def _load_lineage(config, renewal_file):
+    """Reconstitute the lineage defined by renewal_file.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param str renewal_file: path to the renewal configuration file
+
+    :returns: a (lineage config, lineage) tuple or None if the file
+        could not be parsed
+    :rtype: `tuple` or NoneType
+
+    """
+    disp = zope.component.getUtility(interfaces.IDisplay)
+    disp.notification("Processing " + renewal_file, pause=False)
+    lineage_config = copy.deepcopy(config)
+    lineagename = storage.lineagename_for_filename(renewal_file)
+
+    # Note that this modifies config (to add back the configuration
+    # elements from within the renewal configuration file).
+    try:
+        renewal_candidate = _reconstitute(lineage_config, renewal_file)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Renewal configuration file %s (cert: %s) "
+                       "produced an unexpected error: %s. Skipping.",
+                       renewal_file, lineagename, e)
+        logger.debug("Traceback was:\n%s", traceback.format_exc())
+        return None
+
+    if renewal_candidate is None:
+        return None
+    return lineage_config, renewal_candidate
+
+
+def _renew_lineage(lineage_config, renewal_candidate, renewal_file,
+                   expiry_index=None):
+    """Renew a reconstituted lineage if it is due and run its updaters.
+
+    :param configuration.NamespaceConfig lineage_config: configuration
+        for this lineage
+    :param storage.RenewableCert renewal_candidate: the lineage
+    :param str renewal_file: path to the renewal configuration file
+    :param storage.ExpiryIndex expiry_index: index to record the
+        resulting state of the lineage in, if any
+
+    :returns: a (result, description) tuple where result is one of
+        `RENEW_SUCCESS`, `RENEW_FAILURE` or `RENEW_SKIPPED`
+    :rtype: tuple
+
+    """
+    try:
+        renewal_candidate.ensure_deployed()
+        from certbot import main
+        plugins = plugins_disco.PluginsRegistry.find_all()
+        if should_renew(lineage_config, renewal_candidate):
+            # domains have been restored into lineage_config by reconstitute
+            # but they're unnecessary anyway because renew_cert here
+            # will just grab them from the certificate
+            # we already know it's time to renew based on should_renew
+            # and we have a lineage in renewal_candidate
+            main.renew_cert(lineage_config, plugins, renewal_candidate)
+            result = (RENEW_SUCCESS, renewal_candidate.fullchain)
+        else:
+            expiry = crypto_util.notAfter(renewal_candidate.version(
+                "cert", renewal_candidate.latest_common_version()))
+            result = (RENEW_SKIPPED, "%s expires on %s" % (
+                renewal_candidate.fullchain, expiry.strftime("%Y-%m-%d")))
+        # Run updater interface methods
+        updater.run_generic_updaters(lineage_config, renewal_candidate,
+                                     plugins)
+    except Exception as e:  # pylint: disable=broad-except
+        # obtain_cert (presumably) encountered an unanticipated problem.
+        logger.warning("Attempting to renew cert (%s) from %s produced an "
+                       "unexpected error: %s. Skipping.",
+                       storage.lineagename_for_filename(renewal_file),
+                       renewal_file, e)
+        logger.debug("Traceback was:\n%s", traceback.format_exc())
+        result = (RENEW_FAILURE, renewal_candidate.fullchain)
+        if expiry_index is not None:
+            expiry_index.discard(renewal_candidate.lineagename)
+    else:
+        if expiry_index is not None:
+            _update_expiry_index(expiry_index, renewal_candidate)
+    return result
+
+
+def _update_expiry_index(expiry_index, lineage):
+    """Record lineage in expiry_index, ignoring any problem doing so."""
+    try:
+        expiry_index.update(lineage)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.debug("Unable to add %s to the expiry index: %s",
+                     lineage.lineagename, e)
+        expiry_index.discard(lineage.lineagename)
+
+
+def _prefilter_lineages(config, conf_files, expiry_index):
+    """Use the expiry index to find lineages that are not due yet.
+
+    A lineage is only skipped without being reconstituted if its index
+    entry is fresh, it is not due for renewal, its certificate is not
+    revoked and no installer updaters would be run for it. Forced
+    renewals and dry runs process every lineage.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list conf_files: paths to renewal configuration files
+    :param storage.ExpiryIndex expiry_index: the expiry index
+
+    :returns: a (conf files to process, skipped descriptions) tuple
+    :rtype: tuple
+
+    """
+    if config.renew_by_default or config.dry_run:
+        return conf_files, []
+
+    not_due = {}  # type: Dict[str, Dict]
+    for renewal_file in conf_files:
+        entry = expiry_index.get(renewal_file)
+        if entry is None or storage.ExpiryIndex.is_due(entry) or "chain" not in entry:
+            continue
+        elif not config.disable_renew_updates and (
+                entry["installer"] is not None or config.installer is not None):
+            # updaters are run for every lineage with an installer
+            continue
+        not_due[renewal_file] = entry
+
+    revoked = _revoked_entries(config, [(renewal_file, entry)
+                                        for renewal_file, entry in not_due.items()
+                                        if entry["autorenew"]])
+
+    to_process = []
+    skipped = []
+    for renewal_file in conf_files:
+        entry = not_due.get(renewal_file)
+        if entry is None or renewal_file in revoked:
+            to_process.append(renewal_file)
+        else:
+            logger.debug("Expiry index shows %s is not due for renewal",
+                         renewal_file)
+            expiry = storage.ExpiryIndex.expiry(entry)
+            skipped.append("%s expires on %s" % (entry["fullchain"],
+                                                 expiry.strftime("%Y-%m-%d")))
+    return to_process, skipped
+
+
+def _revoked_entries(config, entries):
+    """Check the revocation status of lineages in the expiry index.
+
+    All responders are queried at once with the current revocation
+    checker.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list entries: (renewal file, expiry index entry) tuples
+
+    :returns: renewal files of the lineages whose certificate is revoked
+    :rtype: set
+
+    """
+    checker = ocsp.revocation_checker(config)
+    results = checker.ocsp_revoked_many(
+        [(entry["cert"], entry["chain"]) for _, entry in entries])
+    revoked = set()
+    for (renewal_file, entry), is_revoked in zip(entries, results):
+        if is_revoked:
+            logger.info("Certificate %s is revoked, it will be renewed", entry["cert"])
+            revoked.add(renewal_file)
+    return revoked
+
+
+def _exclusive_plugins(lineage_config):
+    """Plugins of a lineage that must not be used by two lineages at once.
+
+    Installers edit shared server configuration and most authenticators
+    bind ports or edit that same configuration, so lineages using them
+    are serialized. Only the webroot and DNS authenticators keep all of
+    their state per challenge and may run in parallel.
+
+    :param configuration.NamespaceConfig lineage_config: configuration
+        for the lineage
+
+    :returns: sorted names of the plugins to lock
+    :rtype: `list` of `str`
+
+    """
+    names = set()
+    if lineage_config.installer is not None:
+        names.add(lineage_config.installer)
+    authenticator = lineage_config.authenticator
+    if authenticator is not None:
+        short_name = authenticator.split(":")[-1]
+        if short_name != "webroot" and not short_name.startswith("dns-"):
+            names.add(authenticator)
+    return sorted(names)
+
+
+def _renew_lineages_concurrently(config, conf_files, expiry_index=None):
+    """Renew lineages using a pool of config.renew_concurrency workers.
+
+    Renewal configuration files are parsed in the calling thread, as
+    reconstitution relies on process wide CLI state. Each lineage is
+    then renewed with its own configuration object, which is passed
+    down explicitly instead of being registered as the global
+    `~certbot.interfaces.IConfig` utility.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list conf_files: paths to renewal configuration files
+    :param storage.ExpiryIndex expiry_index: index to record the state
+        of renewed lineages in, if any
+
+    :returns: a (results, parse failures) tuple where results is a
+        `list` of (result, description) tuples in conf_files order
+    :rtype: tuple
+
+    """
+    parse_failures = []
+    jobs = []
+    plugin_locks = collections.defaultdict(threading.Lock)  # type: Dict[str, threading.Lock]
+    for renewal_file in conf_files:
+        loaded = _load_lineage(config, renewal_file)
+        if loaded is None:
+            parse_failures.append(renewal_file)
+            continue
+        lineage_config, renewal_candidate = loaded
+        locks = [plugin_locks[name] for name in _exclusive_plugins(lineage_config)]
+        jobs.append((lineage_config, renewal_candidate, renewal_file, locks))
+
+    def _run(job):
+        lineage_config, renewal_candidate, renewal_file, locks = job
+        # locks are always taken in the same (sorted) order, so two
+        # workers can never wait on each other
+        for lock in locks:
+            lock.acquire()
+        try:
+            return _renew_lineage(lineage_config, renewal_candidate, renewal_file,
+                                  expiry_index)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    results = []  # type: List[Tuple[str, str]]
+    if jobs:
+        pool = ThreadPool(min(config.renew_concurrency, len(jobs)))
+        try:
+            results = pool.map(_run, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    return results, parse_failures
+
+
 def handle_renewal_request(config):
     """Examine each lineage; renew if due and report results"""
 
@@ -385,66 +655,46 @@ def handle_renewal_request(config):
                            "instead. The renew verb may provide other options "
                            "for selecting certificates to renew in the future.")
 
+    if config.renew_concurrency < 1:
+        raise errors.Error("--renew-concurrency must be at least 1")
+
     if config.certname:
         conf_files = [storage.renewal_file_for_certname(config, config.certname)]
     else:
         conf_files = storage.renewal_conf_files(config)
 
-    renew_successes = []
-    renew_failures = []
-    renew_skipped = []
-    parse_failures = []
-    for renewal_file in conf_files:
-        disp = zope.component.getUtility(interfaces.IDisplay)
-        disp.notification("Processing " + renewal_file, pause=False)
-        lineage_config = copy.deepcopy(config)
-        lineagename = storage.lineagename_for_filename(renewal_file)
-
-        # Note that this modifies config (to add back the configuration
-        # elements from within the renewal configuration file).
-        try:
-            renewal_candidate = _reconstitute(lineage_config, renewal_file)
-        except Exception as e:  # pylint: disable=broad-except
-            logger.warning("Renewal configuration file %s (cert: %s) "
-                           "produced an unexpected error: %s. Skipping.",
-                           renewal_file, lineagename, e)
-            logger.debug("Traceback was:\n%s", traceback.format_exc())
-            parse_failures.append(renewal_file)
-            continue
-
-        try:
-            if renewal_candidate is None:
-                parse_failures.append(renewal_file)
-            else:
+    expiry_index = storage.ExpiryIndex(config)
+    checker = ocsp.RevocationChecker(
+        cache_dir=os.path.join(config.work_dir, constants.OCSP_CACHE_DIR),
+        time_budget=OCSP_TIME_BUDGET)
+
+    # DNS zones are looked up and OCSP responses fetched once for all lineages
+    with client.shared_acme_clients(), dns_common.shared_zone_cache(), \
+            ocsp.shared_revocation_checker(checker):
+        conf_files, renew_skipped = _prefilter_lineages(config, conf_files, expiry_index)
+        if config.renew_concurrency > 1:
+            results, parse_failures = _renew_lineages_concurrently(
+                config, conf_files, expiry_index)
+        else:
+            results = []
+            parse_failures = []
+            for renewal_file in conf_files:
+                loaded = _load_lineage(config, renewal_file)
+                if loaded is None:
+                    parse_failures.append(renewal_file)
+                    continue
+                lineage_config, renewal_candidate = loaded
                 # XXX: ensure that each call here replaces the previous one
                 zope.component.provideUtility(lineage_config)
-                renewal_candidate.ensure_deployed()
-                from certbot import main
-                plugins = plugins_disco.PluginsRegistry.find_all()
-                if should_renew(lineage_config, renewal_candidate):
-                    # domains have been restored into lineage_config by reconstitute
-                    # but they're unnecessary anyway because renew_cert here
-                    # will just grab them from the certificate
-                    # we already know it's time to renew based on should_renew
-                    # and we have a lineage in renewal_candidate
-                    main.renew_cert(lineage_config, plugins, renewal_candidate)
-                    renew_successes.append(renewal_candidate.fullchain)
-                else:
-                    expiry = crypto_util.notAfter(renewal_candidate.version(
-                        "cert", renewal_candidate.latest_common_version()))
-                    renew_skipped.append("%s expires on %s" % (renewal_candidate.fullchain,
-                                         expiry.strftime("%Y-%m-%d")))
-                # Run updater interface methods
-                updater.run_generic_updaters(lineage_config, renewal_candidate,
-                                             plugins)
-
-        except Exception as e:  # pylint: disable=broad-except
-            # obtain_cert (presumably) encountered an unanticipated problem.
-            logger.warning("Attempting to renew cert (%s) from %s produced an "
-                           "unexpected error: %s. Skipping.", lineagename,
-                               renewal_file, e)
-            logger.debug("Traceback was:\n%s", traceback.format_exc())
-            renew_failures.append(renewal_candidate.fullchain)
+                results.append(_renew_lineage(lineage_config, renewal_candidate,
+                                              renewal_file, expiry_index))
+
+    if not config.dry_run:
+        expiry_index.save()
+
+    renew_successes = [desc for result, desc in results if result == RENEW_SUCCESS]
+    renew_failures = [desc for result, desc in results if result == RENEW_FAILURE]
+    renew_skipped.extend(desc for result, desc in results if result == RENEW_SKIPPED)
 
     # Describe all the results
     _renew_describe_results(config, renew_successes, renew_failures,
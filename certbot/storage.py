@@ -1,10 +1,14 @@
 """Renewable certificates storage."""
+import calendar
 import datetime
 import glob
+import json
 import logging
 import os
 import re
 import stat
+import threading
+import time
 
 import configobj
 import parsedatetime
@@ -12,12 +16,15 @@ import pytz
 import shutil
 import six
 
+from acme.magic_typing import Dict, List, Optional, Set, Tuple  # pylint: disable=unused-import, no-name-in-module
+
 import certbot
 from certbot import cli
 from certbot import constants
 from certbot import crypto_util
 from certbot import errors
 from certbot import error_handler
+from certbot import ocsp
 from certbot import util
 
 from certbot.plugins import common as plugins_common
@@ -26,8 +33,11 @@ from certbot.plugins import disco as plugins_disco
 logger = logging.getLogger(__name__)
 
 ALL_FOUR = ("cert", "privkey", "chain", "fullchain")
+VERSION_FILE_PATTERN = re.compile(r"^({0})([0-9]+)\.pem$".format("|".join(ALL_FOUR)))
 README = "README"
 CURRENT_VERSION = util.get_strict_version(certbot.__version__)
+EXPIRY_INDEX = ".expiry-index.json"
+"""Name of the expiry index file in the renewal configuration directory."""
 
 
 def renewal_conf_files(config):
@@ -163,6 +173,7 @@ def rename_renewal_config(prev_name, new_name, cli_config):
     except OSError:
         raise errors.ConfigurationError("Please specify a valid filename "
             "for the new certificate name.")
+    invalidate_expiry_index(cli_config, prev_name, new_name)
 
 
 def update_configuration(lineagename, archive_dir, target, cli_config):
@@ -290,6 +301,7 @@ def delete_files(config, certname):
     If some files are not found, ignore them and continue.
     """
     renewal_filename = renewal_file_for_certname(config, certname)
+    invalidate_expiry_index(config, certname)
     # file exists
     full_default_archive_dir = full_archive_path(None, config, certname)
     full_default_live_dir = _full_live_path(config, certname)
@@ -350,6 +362,253 @@ def delete_files(config, certname):
         logger.debug("Unable to remove %s", archive_path)
 
 
+_expiry_index_lock = threading.RLock()
+
+
+def invalidate_expiry_index(cli_config, *lineagenames):
+    """Drop the expiry index entries of the given lineages.
+
+    This must be called whenever the files of a lineage are created,
+    changed or removed so that the next renewal run looks at them again.
+
+    :param .NamespaceConfig cli_config: parsed command line arguments
+    :param str lineagenames: names of the lineages to drop
+
+    """
+    with _expiry_index_lock:
+        index = ExpiryIndex(cli_config)
+        if any([index.discard(name) for name in lineagenames]):
+            index.save()
+
+
+def _mtime(path):
+    """Modification time of path or None if it cannot be stat'ed."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class ExpiryIndex(object):
+    """Persistent summary of the expiry data of every lineage.
+
+    Deciding whether a lineage is due for renewal normally requires
+    parsing its renewal configuration file, checking its symlinks and
+    loading its certificate. The index records the outcome of that work
+    (the certificate's notAfter date and the renewal options that
+    matter) together with the modification times of the files it was
+    derived from, which lets ``certbot renew`` find the lineages that
+    are not due yet with a few ``stat`` calls.
+
+    An entry is only trusted while the renewal configuration file, the
+    archive and live directories and the certificate are unchanged.
+    Functions in this module that change lineages also drop the entries
+    explicitly (see :func:`invalidate_expiry_index`).
+
+    :ivar str path: location of the index file
+
+    """
+    def __init__(self, cli_config):
+        self.path = os.path.join(cli_config.renewal_configs_dir, EXPIRY_INDEX)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+    def save(self):
+        """Atomically write the index to disk."""
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            return
+        temp_path = self.path + ".new"
+        with _expiry_index_lock:
+            with self._lock:
+                data = json.dumps(self._entries, sort_keys=True)
+            try:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                with util.safe_open(temp_path, "w", chmod=0o600) as f:
+                    f.write(data)
+                os.rename(temp_path, self.path)
+            except (IOError, OSError) as error:
+                logger.debug("Unable to write expiry index %s: %s",
+                             self.path, error)
+
+    def discard(self, lineagename):
+        """Forget the entry for lineagename.
+
+        :returns: whether an entry was removed
+        :rtype: bool
+
+        """
+        with self._lock:
+            return self._entries.pop(lineagename, None) is not None
+
+    def update(self, lineage):
+        """Record the current state of a lineage.
+
+        :param RenewableCert lineage: lineage without pending deployment
+
+        """
+        version = lineage.latest_common_version()
+        cert = lineage.version("cert", version)
+        expiry = crypto_util.notAfter(cert)
+        renewalparams = lineage.configuration.get("renewalparams", {})
+        installer = renewalparams.get("installer")
+        entry = {
+            "conf": lineage.configfile.filename,
+            "conf_mtime": _mtime(lineage.configfile.filename),
+            "archive_dir": lineage.archive_dir,
+            "archive_mtime": _mtime(lineage.archive_dir),
+            "live_dir": lineage.live_dir,
+            "live_mtime": _mtime(lineage.live_dir),
+            "cert": cert,
+            "cert_mtime": _mtime(cert),
+            "chain": lineage.version("chain", version),
+            "fullchain": lineage.fullchain,
+            "not_after": calendar.timegm(expiry.utctimetuple()),
+            "renew_before_expiry": lineage.configuration.get(
+                "renew_before_expiry",
+                constants.RENEWER_DEFAULTS["renew_before_expiry"]),
+            "autorenew": lineage.autorenewal_is_enabled(),
+            "installer": None if installer == "None" else installer,
+        }
+        with self._lock:
+            self._entries[lineage.lineagename] = entry
+
+    def get(self, renewal_file):
+        """Return the entry for a renewal configuration file if it is fresh.
+
+        :param str renewal_file: path to the renewal configuration file
+
+        :returns: the entry or None if there is none or it is stale
+        :rtype: dict or None
+
+        """
+        with self._lock:
+            entry = self._entries.get(lineagename_for_filename(renewal_file))
+        if entry is None or entry.get("conf") != renewal_file:
+            return None
+        for path_key, mtime_key in (("conf", "conf_mtime"),
+                                    ("archive_dir", "archive_mtime"),
+                                    ("live_dir", "live_mtime"),
+                                    ("cert", "cert_mtime")):
+            mtime = entry.get(mtime_key)
+            if mtime is None or _mtime(entry[path_key]) != mtime:
+                return None
+        return entry
+
+    @staticmethod
+    def expiry(entry):
+        """The notAfter date recorded in an entry.
+
+        :rtype: :class:`datetime.datetime`
+
+        """
+        return datetime.datetime.fromtimestamp(entry["not_after"], pytz.UTC)
+
+    @classmethod
+    def is_due(cls, entry):
+        """Is the lineage described by entry due for autorenewal?
+
+        This mirrors the expiry based part of
+        :meth:`RenewableCert.should_autorenew`.
+
+        :rtype: bool
+
+        """
+        if not entry["autorenew"]:
+            return False
+        now = pytz.UTC.fromutc(datetime.datetime.utcnow())
+        return cls.expiry(entry) < add_time_interval(
+            now, entry["renew_before_expiry"])
+
+
+class VersionManifest(object):
+    """Versions of each kind of item stored in an archive directory.
+
+    The manifest is built from a single listing of the directory and
+    answers version queries without touching the disk again for as long
+    as the directory's inode and mtime are unchanged.
+
+    """
+    # Entries added in the same clock tick as a scan may leave the
+    # directory's mtime unchanged, so listings of directories modified
+    # less than this many seconds before the scan are not trusted.
+    MTIME_GRANULARITY = 2
+
+    def __init__(self, where):
+        self.where = where
+        self._signature = None  # type: Optional[Tuple[int, float]]
+        self._trusted = False
+        self._versions = {}  # type: Dict[str, List[int]]
+        self.latest_common_version = None  # type: Optional[int]
+        self.scan()
+
+    def _stat(self):
+        dir_stat = os.stat(self.where)
+        return dir_stat.st_ino, dir_stat.st_mtime
+
+    def scan(self):
+        """(Re)build the manifest from a listing of the directory."""
+        scanned_at = time.time()
+        signature = self._stat()
+        versions = dict((kind, set()) for kind in ALL_FOUR)  # type: Dict[str, Set[int]]
+        for filename in os.listdir(self.where):
+            match = VERSION_FILE_PATTERN.match(filename)
+            if match:
+                versions[match.group(1)].add(int(match.group(2)))
+        self._update(versions, signature)
+        self._trusted = signature[1] < scanned_at - self.MTIME_GRANULARITY
+
+    def _update(self, versions, signature):
+        self._signature = signature
+        self._versions = dict(
+            (kind, sorted(kind_versions)) for kind, kind_versions in versions.items())
+        common = set.intersection(*versions.values())
+        self.latest_common_version = max(common) if common else None
+
+    def is_current(self):
+        """Does the manifest still describe the directory?
+
+        :rtype: bool
+
+        """
+        return self._trusted and self._stat() == self._signature
+
+    def available_versions(self, kind):
+        """Versions of kind, in ascending order.
+
+        :rtype: `list` of `int`
+
+        """
+        return self._versions[kind]
+
+    def add(self, version):
+        """Record that all items of version were written to the directory.
+
+        Used by the writer that owns the directory, so the manifest stays
+        current without another scan.
+
+        :param int version: the new version
+
+        """
+        versions = dict(
+            (kind, set(kind_versions)) for kind, kind_versions in self._versions.items())
+        for kind_versions in versions.values():
+            kind_versions.add(version)
+        self._update(versions, self._stat())
+        self._trusted = True
+
+
 class RenewableCert(object):
     # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """Renewable certificate.
@@ -432,6 +691,8 @@ class RenewableCert(object):
         self.chain = self.configuration["chain"]
         self.fullchain = self.configuration["fullchain"]
         self.live_dir = os.path.dirname(self.cert)
+        # Archive directory path -> VersionManifest
+        self._version_manifests = {}  # type: Dict[str, VersionManifest]
 
         self._fix_symlinks()
         if update_symlinks:
@@ -465,7 +726,7 @@ class RenewableCert(object):
         :returns: Expiration datetime of the current target certificate
         :rtype: :class:`datetime.datetime`
         """
-        return crypto_util.notAfter(self.current_target("cert"))
+        return self.cert_info().not_after
 
     @property
     def archive_dir(self):
@@ -667,15 +928,14 @@ class RenewableCert(object):
         """
         if kind not in ALL_FOUR:
             raise errors.CertStorageError("unknown kind of item")
-        pattern = re.compile(r"^{0}([0-9]+)\.pem$".format(kind))
         target = self.current_target(kind)
         if target is None or not os.path.exists(target):
             logger.debug("Current-version target for %s "
                          "does not exist at %s.", kind, target)
             target = ""
-        matches = pattern.match(os.path.basename(target))
-        if matches:
-            return int(matches.groups()[0])
+        matches = VERSION_FILE_PATTERN.match(os.path.basename(target))
+        if matches and matches.group(1) == kind:
+            return int(matches.group(2))
         else:
             logger.debug("No matches for target %s.", kind)
             return None
@@ -700,6 +960,28 @@ class RenewableCert(object):
         where = os.path.dirname(self.current_target(kind))
         return os.path.join(where, "{0}{1}.pem".format(kind, version))
 
+    def _version_manifest(self, kind):
+        """Manifest of the archive directory of the current kind item.
+
+        Manifests are cached on the lineage and only rebuilt when the
+        directory changes.
+
+        :param str kind: the lineage member item (
+            ``cert``, ``privkey``, ``chain``, or ``fullchain``)
+
+        :rtype: `VersionManifest`
+
+        """
+        if kind not in ALL_FOUR:
+            raise errors.CertStorageError("unknown kind of item")
+        where = os.path.dirname(self.current_target(kind))
+        manifest = self._version_manifests.get(where)
+        if manifest is None:
+            manifest = self._version_manifests[where] = VersionManifest(where)
+        elif not manifest.is_current():
+            manifest.scan()
+        return manifest
+
     def available_versions(self, kind):
         """Which alternative versions of the specified kind of item exist?
 
@@ -713,13 +995,7 @@ class RenewableCert(object):
         :rtype: `list` of `int`
 
         """
-        if kind not in ALL_FOUR:
-            raise errors.CertStorageError("unknown kind of item")
-        where = os.path.dirname(self.current_target(kind))
-        files = os.listdir(where)
-        pattern = re.compile(r"^{0}([0-9]+)\.pem$".format(kind))
-        matches = [pattern.match(f) for f in files]
-        return sorted([int(m.groups()[0]) for m in matches if m])
+        return list(self._version_manifest(kind).available_versions(kind))
 
     def newest_available_version(self, kind):
         """Newest available version of the specified kind of item?
@@ -730,8 +1006,13 @@ class RenewableCert(object):
         :returns: the newest available version of this member
         :rtype: int
 
+        :raises .CertStorageError: if there is no version of this member
+
         """
-        return max(self.available_versions(kind))
+        versions = self._version_manifest(kind).available_versions(kind)
+        if not versions:
+            raise errors.CertStorageError("no version of {0} found".format(kind))
+        return versions[-1]
 
     def latest_common_version(self):
         """Newest version for which all items are available?
@@ -740,13 +1021,22 @@ class RenewableCert(object):
             (``cert, ``privkey``, ``chain``, and ``fullchain``) exist
         :rtype: int
 
+        :raises .CertStorageError: if there is no version overlap
+
         """
-        # TODO: this can raise CertStorageError if there is no version overlap
-        #       (it should probably return None instead)
         # TODO: this can raise a spurious AttributeError if the current
         #       link for any kind is missing (it should probably return None)
-        versions = [self.available_versions(x) for x in ALL_FOUR]
-        return max(n for n in versions[0] if all(n in v for v in versions[1:]))
+        manifests = [self._version_manifest(x) for x in ALL_FOUR]
+        if all(manifest is manifests[0] for manifest in manifests[1:]):
+            latest = manifests[0].latest_common_version
+        else:
+            # Items are archived in different directories
+            versions = [set(manifest.available_versions(kind))
+                        for kind, manifest in zip(ALL_FOUR, manifests)]
+            latest = max(set.intersection(*versions) or [None])
+        if latest is None:
+            raise errors.CertStorageError("no common version found")
+        return latest
 
     def next_free_version(self):
         """Smallest version newer than all full or partial versions?
@@ -835,14 +1125,17 @@ class RenewableCert(object):
             for _, link in previous_links:
                 os.unlink(link)
 
-    def names(self, version=None):
-        """What are the subject names of this certificate?
+    def cert_info(self, version=None):
+        """A version of the certificate, read once and parsed on demand.
 
         (If no version is specified, use the current version.)
 
+        Certificates are read and parsed once per process and the result
+        is shared by all callers, see `.crypto_util.cert_info`.
+
         :param int version: the desired version number
-        :returns: the subject names
-        :rtype: `list` of `str`
+        :returns: the certificate
+        :rtype: `.crypto_util.CertInfo`
         :raises .CertStorageError: if could not find cert file.
 
         """
@@ -852,8 +1145,20 @@ class RenewableCert(object):
             target = self.version("cert", version)
         if target is None:
             raise errors.CertStorageError("could not find cert file")
-        with open(target) as f:
-            return crypto_util.get_names_from_cert(f.read())
+        return crypto_util.cert_info(target)
+
+    def names(self, version=None):
+        """What are the subject names of this certificate?
+
+        (If no version is specified, use the current version.)
+
+        :param int version: the desired version number
+        :returns: the subject names
+        :rtype: `list` of `str`
+        :raises .CertStorageError: if could not find cert file.
+
+        """
+        return list(self.cert_info(version).names)
 
     def autodeployment_is_enabled(self):
         """Is automatic deployment enabled for this cert?
@@ -895,26 +1200,25 @@ class RenewableCert(object):
         return False
 
     def ocsp_revoked(self, version=None):
-        # pylint: disable=no-self-use,unused-argument
         """Is the specified cert version revoked according to OCSP?
 
-        Also returns True if the cert version is declared as intended
-        to be revoked according to Let's Encrypt OCSP extensions.
         (If no version is specified, uses the current version.)
 
-        This method is not yet implemented and currently always returns
-        False.
+        Responses are checked with `certbot.ocsp.revocation_checker`, so
+        they are cached until their nextUpdate time and, during
+        ``certbot renew``, shared by all lineages.
 
         :param int version: the desired version number
 
-        :returns: whether the certificate is or will be revoked
+        :returns: whether the certificate is revoked
         :rtype: bool
 
         """
-        # XXX: This query and its associated network service aren't
-        # implemented yet, so we currently return False (indicating that the
-        # certificate is not revoked).
-        return False
+        if version is None:
+            version = self.current_version("cert")
+        checker = ocsp.revocation_checker(self.cli_config)
+        return checker.ocsp_revoked(self.version("cert", version),
+                                    self.version("chain", version))
 
     def autorenewal_is_enabled(self):
         """Is automatic renewal enabled for this cert?
@@ -947,22 +1251,22 @@ class RenewableCert(object):
         if self.autorenewal_is_enabled():
             # Consider whether to attempt to autorenew this cert now
 
-            # Renewals on the basis of revocation
-            if self.ocsp_revoked(self.latest_common_version()):
-                logger.debug("Should renew, certificate is revoked.")
-                return True
-
-            # Renews some period before expiry time
+            # Renews some period before expiry time, checked first as it
+            # doesn't query an OCSP responder
             default_interval = constants.RENEWER_DEFAULTS["renew_before_expiry"]
             interval = self.configuration.get("renew_before_expiry", default_interval)
-            expiry = crypto_util.notAfter(self.version(
-                "cert", self.latest_common_version()))
+            expiry = self.cert_info(self.latest_common_version()).not_after
             now = pytz.UTC.fromutc(datetime.datetime.utcnow())
             if expiry < add_time_interval(now, interval):
                 logger.debug("Should renew, less than %s before certificate "
                              "expiry %s.", interval,
                              expiry.strftime("%Y-%m-%d %H:%M:%S %Z"))
                 return True
+
+            # Renewals on the basis of revocation
+            if self.ocsp_revoked(self.latest_common_version()):
+                logger.debug("Should renew, certificate is revoked.")
+                return True
         return False
 
     @classmethod
@@ -1069,6 +1373,7 @@ class RenewableCert(object):
 
         new_config = write_renewal_config(config_filename, config_filename, archive,
             target, values)
+        invalidate_expiry_index(cli_config, lineagename)
         return cls(new_config.filename, cli_config)
 
     def save_successor(self, prior_version, new_cert,
@@ -1102,6 +1407,7 @@ class RenewableCert(object):
         # Figure out what the new version is and hence where to save things
 
         self.cli_config = cli_config
+        invalidate_expiry_index(cli_config, self.lineagename)
         target_version = self.next_free_version()
         target = dict(
             [(kind,
@@ -1137,6 +1443,10 @@ class RenewableCert(object):
         with open(target["fullchain"], "wb") as f:
             logger.debug("Writing full chain to %s.", target["fullchain"])
             f.write(new_cert + new_chain)
+        archive_dir = os.path.realpath(self.archive_dir)
+        for manifest in self._version_manifests.values():
+            if os.path.realpath(manifest.where) == archive_dir:
+                manifest.add(target_version)
 
         symlinks = dict((kind, self.configuration[kind]) for kind in ALL_FOUR)
         # Update renewal config file
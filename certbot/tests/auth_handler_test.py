@@ -1,4 +1,5 @@
 """Tests for certbot.auth_handler."""
+import datetime
 import functools
 import logging
 import unittest
@@ -361,33 +362,43 @@ class PollChallengesTest(unittest.TestCase):
                 challb_to_achall(challb, mock.Mock(key="dummy_key"), self.doms[i])
                 for challb in aauthzr.authzr.body.challenges]
 
-
-    @mock.patch("certbot.auth_handler.time")
-    def test_poll_challenges(self, unused_mock_time):
+        # time.sleep advances datetime.datetime.now
+        self.clock = [datetime.datetime(2018, 9, 1)]
+        mock_datetime = mock.patch("certbot.auth_handler.datetime").start()
+        mock_datetime.datetime.now.side_effect = lambda: self.clock[0]
+        mock_datetime.timedelta = datetime.timedelta
+        # used by acme.client.ClientBase.retry_after
+        mock.patch("acme.client.datetime", mock_datetime).start()
+        self.mock_time = mock.patch("certbot.auth_handler.time").start()
+        self.mock_time.sleep.side_effect = self._sleep
+        self.addCleanup(mock.patch.stopall)
+        self.response = mock.MagicMock(headers={})
+
+    def _sleep(self, seconds):
+        self.clock[0] += datetime.timedelta(seconds=seconds)
+
+    def test_poll_challenges(self):
         self.mock_net.poll.side_effect = self._mock_poll_solve_one_valid
         self.handler._poll_challenges(self.aauthzrs, self.chall_update, False)
 
         for aauthzr in self.aauthzrs:
             self.assertEqual(aauthzr.authzr.body.status, messages.STATUS_VALID)
 
-    @mock.patch("certbot.auth_handler.time")
-    def test_poll_challenges_failure_best_effort(self, unused_mock_time):
+    def test_poll_challenges_failure_best_effort(self):
         self.mock_net.poll.side_effect = self._mock_poll_solve_one_invalid
         self.handler._poll_challenges(self.aauthzrs, self.chall_update, True)
 
         for aauthzr in self.aauthzrs:
             self.assertEqual(aauthzr.authzr.body.status, messages.STATUS_PENDING)
 
-    @mock.patch("certbot.auth_handler.time")
     @test_util.patch_get_utility()
-    def test_poll_challenges_failure(self, unused_mock_time, unused_mock_zope):
+    def test_poll_challenges_failure(self, unused_mock_zope):
         self.mock_net.poll.side_effect = self._mock_poll_solve_one_invalid
         self.assertRaises(
             errors.AuthorizationError, self.handler._poll_challenges,
             self.aauthzrs, self.chall_update, False)
 
-    @mock.patch("certbot.auth_handler.time")
-    def test_unable_to_find_challenge_status(self, unused_mock_time):
+    def test_unable_to_find_challenge_status(self):
         from certbot.auth_handler import challb_to_achall
         self.mock_net.poll.side_effect = self._mock_poll_solve_one_valid
         self.chall_update[0].append(
@@ -396,6 +407,35 @@ class PollChallengesTest(unittest.TestCase):
             errors.AuthorizationError, self.handler._poll_challenges,
             self.aauthzrs, self.chall_update, False)
 
+    def test_poll_challenges_concurrently(self):
+        self.mock_net.poll.side_effect = self._mock_poll_solve_one_valid
+        self.handler._poll_challenges(self.aauthzrs, self.chall_update, False)
+
+        # every authorization is polled in each round: the first one has
+        # two challenges to solve, the others three
+        self.assertEqual(self.mock_net.poll.call_count, 8)
+        self.assertEqual([call[0][0] for call in self.mock_time.sleep.call_args_list],
+                         [1, 1, 2])
+
+    def test_poll_challenges_retry_after(self):
+        self.response.headers["Retry-After"] = "7"
+        self.mock_net.poll.side_effect = self._mock_poll_solve_one_valid
+        self.handler._poll_challenges(self.aauthzrs, self.chall_update, False)
+
+        self.assertEqual([call[0][0] for call in self.mock_time.sleep.call_args_list],
+                         [1, 7, 7])
+
+    def test_poll_challenges_timeout(self):
+        self.mock_net.poll.side_effect = lambda authzr: (authzr, self.response)
+        self.handler._poll_challenges(
+            self.aauthzrs, self.chall_update, False, timeout=20)
+
+        # polled after 1, 2, 4, 8 and 16 seconds, the next poll would be too late
+        self.assertEqual(self.clock[0], datetime.datetime(2018, 9, 1, 0, 0, 16))
+        self.assertEqual(self.mock_net.poll.call_count, 3 * 5)
+        for aauthzr in self.aauthzrs:
+            self.assertEqual(aauthzr.authzr.body.status, messages.STATUS_PENDING)
+
     def test_verify_authzr_failure(self):
         self.assertRaises(errors.AuthorizationError,
                           self.handler.verify_authzr_complete, self.aauthzrs)
@@ -442,7 +482,7 @@ class PollChallengesTest(unittest.TestCase):
                 status=status_,
             ),
         )
-        return (new_authzr, "response")
+        return (new_authzr, self.response)
 
 
 class ChallbToAchallTest(unittest.TestCase):
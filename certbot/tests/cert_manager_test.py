@@ -216,7 +216,7 @@ class CertificatesTest(BaseCertManagerTest):
         cert.is_test_cert = False
         parsed_certs = [cert]
 
-        mock_config = mock.MagicMock(certname=None, lineagename=None)
+        mock_config = mock.MagicMock(certname=None, lineagename=None, work_dir=self.tempdir)
         # pylint: disable=protected-access
 
         # pylint: disable=protected-access
@@ -270,6 +270,28 @@ class CertificatesTest(BaseCertManagerTest):
         out = get_report()
         self.assertEqual(len(re.findall("INVALID:", out)), 0)
 
+    @mock.patch('certbot.cert_manager.ocsp.RevocationChecker.ocsp_revoked_many')
+    def test_report_human_readable_checks_revocation_at_once(self, mock_revoked_many):
+        from certbot import cert_manager
+        import datetime, pytz
+        expiry = pytz.UTC.fromutc(datetime.datetime.utcnow()) + datetime.timedelta(days=3)
+        parsed_certs = []
+        for name in ("nameone", "nametwo"):
+            cert = mock.MagicMock(lineagename=name, cert=name + "/cert.pem",
+                                  chain=name + "/chain.pem", is_test_cert=False)
+            cert.target_expiry = expiry
+            cert.names.return_value = [name]
+            parsed_certs.append(cert)
+        mock_revoked_many.return_value = [False, True]
+        mock_config = mock.MagicMock(certname=None, domains=None, work_dir=self.tempdir)
+
+        # pylint: disable=protected-access
+        out = cert_manager._report_human_readable(mock_config, parsed_certs)
+
+        mock_revoked_many.assert_called_once_with([("nameone/cert.pem", "nameone/chain.pem"),
+                                                   ("nametwo/cert.pem", "nametwo/chain.pem")])
+        self.assertEqual(len(re.findall("INVALID: REVOKED", out)), 1)
+
 
 class SearchLineagesTest(BaseCertManagerTest):
     """Tests for certbot.cert_manager._search_lineages."""
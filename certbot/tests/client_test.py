@@ -49,6 +49,47 @@ class DetermineUserAgentTest(test_util.ConfigTestCase):
         real_value_check(platform.python_version(), ua)
 
 
+class AcmeFromConfigKeyTest(test_util.ConfigTestCase):
+    """Tests for certbot.client.acme_from_config_key."""
+
+    def setUp(self):
+        super(AcmeFromConfigKeyTest, self).setUp()
+        self.config.user_agent = "test"
+        self.key = mock.MagicMock()
+        self.regr = mock.MagicMock()
+        patcher = mock.patch("certbot.client.acme_client")
+        self.mock_acme_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_acme_client.DEFAULT_AUTHZ_CONCURRENCY = 10
+        self.mock_acme_client.BackwardsCompatibleClientV2.side_effect = (
+            lambda *args: mock.MagicMock())
+
+    def _call(self, regr=None, key=None):
+        from certbot.client import acme_from_config_key
+        return acme_from_config_key(self.config, key or self.key, regr)
+
+    def test_pool_size(self):
+        self.config.renew_concurrency = 4
+        self._call()
+        self.mock_acme_client.ClientNetwork.assert_called_once_with(
+            self.key, account=None, verify_ssl=True, user_agent="test",
+            pool_maxsize=40)
+
+    def test_not_shared(self):
+        self.assertNotEqual(self._call(self.regr), self._call(self.regr))
+
+    def test_shared(self):
+        from certbot.client import shared_acme_clients
+        with shared_acme_clients():
+            acme = self._call(self.regr)
+            with shared_acme_clients():
+                self.assertEqual(acme, self._call(self.regr))
+            self.assertEqual(acme, self._call(self.regr))
+            self.assertNotEqual(acme, self._call(self.regr, mock.MagicMock()))
+            self.assertNotEqual(acme, self._call())
+        self.assertNotEqual(acme, self._call(self.regr))
+
+
 class RegisterTest(test_util.ConfigTestCase):
     """Tests for certbot.client.register."""
 
@@ -250,9 +291,11 @@ class ClientTest(ClientTestCommon):
         self._test_obtain_certificate_common(mock.sentinel.key, csr)
 
         mock_crypto_util.init_save_key.assert_called_once_with(
-            self.config.rsa_key_size, self.config.key_dir)
+            self.config.rsa_key_size, self.config.key_dir, config=self.config,
+            key_type=self.config.key_type, elliptic_curve=self.config.elliptic_curve)
         mock_crypto_util.init_save_csr.assert_called_once_with(
-            mock.sentinel.key, self.eg_domains, self.config.csr_dir)
+            mock.sentinel.key, self.eg_domains, self.config.csr_dir,
+            config=self.config)
         mock_crypto_util.cert_and_chain_from_fullchain.assert_called_once_with(
             self.eg_order.fullchain_pem)
 
@@ -286,7 +329,8 @@ class ClientTest(ClientTestCommon):
         self.client.config.dry_run = True
         self._test_obtain_certificate_common(key, csr)
 
-        mock_crypto.make_key.assert_called_once_with(self.config.rsa_key_size)
+        mock_crypto.make_key.assert_called_once_with(
+            self.config.rsa_key_size, self.config.key_type, self.config.elliptic_curve)
         mock_acme_crypto.make_csr.assert_called_once_with(
             mock.sentinel.key_pem, self.eg_domains, self.config.must_staple)
         mock_crypto.init_save_key.assert_not_called()
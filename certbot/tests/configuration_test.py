@@ -45,6 +45,7 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
 
         mock_constants.IN_PROGRESS_DIR = '../p'
         mock_constants.KEY_DIR = 'keys'
+        mock_constants.KEY_POOL_DIR = 'pool'
         mock_constants.TEMP_CHECKPOINT_DIR = 't'
 
         self.assertEqual(
@@ -62,6 +63,9 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
         self.assertEqual(
             os.path.normpath(self.config.key_dir),
             os.path.normpath(os.path.join(self.config.config_dir, 'keys')))
+        self.assertEqual(
+            os.path.normpath(self.config.key_pool_dir),
+            os.path.normpath(os.path.join(self.config.config_dir, 'pool')))
         self.assertEqual(
             os.path.normpath(self.config.temp_checkpoint_dir),
             os.path.normpath(os.path.join(self.config.work_dir, 't')))
@@ -1,6 +1,7 @@
 """Tests for certbot.crypto_util."""
 import logging
 import os
+import stat
 import unittest
 
 import OpenSSL
@@ -31,8 +32,10 @@ class InitSaveKeyTest(test_util.TempDirTestCase):
         super(InitSaveKeyTest, self).setUp()
 
         logging.disable(logging.CRITICAL)
+        self.key_pool_dir = os.path.join(self.tempdir, "pool")
         zope.component.provideUtility(
-            mock.Mock(strict_permissions=True), interfaces.IConfig)
+            mock.Mock(strict_permissions=True, key_pool_dir=self.key_pool_dir),
+            interfaces.IConfig)
 
     def tearDown(self):
         super(InitSaveKeyTest, self).tearDown()
@@ -57,6 +60,94 @@ class InitSaveKeyTest(test_util.TempDirTestCase):
         mock_make.side_effect = ValueError
         self.assertRaises(ValueError, self._call, 431, self.tempdir)
 
+    def test_ecdsa(self):
+        from certbot.crypto_util import init_save_key
+        key = init_save_key(1024, self.tempdir, key_type="ecdsa", elliptic_curve="secp384r1")
+        self.assertTrue(b"EC PRIVATE KEY" in key.pem)
+        with open(key.file, "rb") as f:
+            self.assertEqual(f.read(), key.pem)
+
+    @mock.patch('certbot.crypto_util.make_key')
+    def test_pooled_key(self, mock_make):
+        from certbot.crypto_util import fill_key_pool
+        mock_make.return_value = RSA512_KEY
+        fill_key_pool(self.key_pool_dir, 1024, 1)
+        mock_make.reset_mock()
+
+        key = self._call(1024, self.tempdir)
+        self.assertEqual(key.pem, RSA512_KEY)
+        self.assertFalse(mock_make.called)
+
+        mock_make.return_value = b'key_pem'
+        self.assertEqual(self._call(1024, self.tempdir).pem, b'key_pem')
+
+
+class KeyPoolTest(test_util.TempDirTestCase):
+    """Tests for certbot.crypto_util.fill_key_pool and take_pooled_key."""
+
+    def setUp(self):
+        super(KeyPoolTest, self).setUp()
+        self.pool_dir = os.path.join(self.tempdir, "pool")
+
+    @classmethod
+    def _take(cls, pool_dir, bits):
+        from certbot.crypto_util import take_pooled_key
+        return take_pooled_key(pool_dir, bits)
+
+    @mock.patch('certbot.crypto_util.make_key')
+    def test_fill_and_take(self, mock_make):
+        from certbot.crypto_util import fill_key_pool
+        mock_make.return_value = RSA512_KEY
+        self.assertEqual(fill_key_pool(self.pool_dir, 1024, 2), 2)
+        self.assertEqual(fill_key_pool(self.pool_dir, 1024, 2), 0)
+        mock_make.assert_called_with(1024, "rsa", None)
+        subdir = os.path.join(self.pool_dir, "rsa-1024")
+        self.assertEqual(stat.S_IMODE(os.stat(subdir).st_mode), 0o700)
+        for name in os.listdir(subdir):
+            self.assertEqual(stat.S_IMODE(os.stat(os.path.join(subdir, name)).st_mode), 0o600)
+
+        self.assertEqual(self._take(self.pool_dir, 2048), None)
+        self.assertEqual(self._take(self.pool_dir, 1024), RSA512_KEY)
+        self.assertEqual(self._take(self.pool_dir, 1024), RSA512_KEY)
+        self.assertEqual(self._take(self.pool_dir, 1024), None)
+        self.assertEqual(os.listdir(subdir), [])
+
+        self.assertEqual(fill_key_pool(self.pool_dir, 1024, 1), 1)
+
+    def test_ecdsa_pool(self):
+        from certbot.crypto_util import fill_key_pool
+        self.assertEqual(fill_key_pool(self.pool_dir, 1024, 1, key_type="ecdsa",
+                                       elliptic_curve="secp256r1"), 1)
+        self.assertEqual(os.listdir(self.pool_dir), ["ecdsa-secp256r1"])
+        self.assertEqual(self._take(self.pool_dir, 1024), None)
+
+        from certbot.crypto_util import take_pooled_key
+        key = take_pooled_key(self.pool_dir, 1024, "ecdsa", "secp256r1")
+        self.assertTrue(b"EC PRIVATE KEY" in key)
+        self.assertEqual(take_pooled_key(self.pool_dir, 1024, "ecdsa", "secp384r1"), None)
+
+    def test_take_missing_pool(self):
+        self.assertEqual(self._take(self.pool_dir, 1024), None)
+
+    def test_take_skips_unfinished_and_invalid_keys(self):
+        subdir = os.path.join(self.pool_dir, "rsa-1024")
+        os.makedirs(subdir)
+        for name, content in (("a.pem", b"garbage"), ("b.tmp", RSA512_KEY),
+                              ("c.pem", RSA512_KEY)):
+            with open(os.path.join(subdir, name), "wb") as f:
+                f.write(content)
+        self.assertEqual(self._take(self.pool_dir, 1024), RSA512_KEY)
+        self.assertEqual(os.listdir(subdir), ["b.tmp"])
+
+    @mock.patch('certbot.crypto_util.os.rename')
+    def test_take_key_taken_concurrently(self, mock_rename):
+        subdir = os.path.join(self.pool_dir, "rsa-1024")
+        os.makedirs(subdir)
+        with open(os.path.join(subdir, "a.pem"), "wb") as f:
+            f.write(RSA512_KEY)
+        mock_rename.side_effect = OSError
+        self.assertEqual(self._take(self.pool_dir, 1024), None)
+
 
 class InitSaveCSRTest(test_util.TempDirTestCase):
     """Tests for certbot.crypto_util.init_save_csr."""
@@ -161,7 +252,7 @@ class ImportCSRFileTest(unittest.TestCase):
                           test_util.load_vector('cert_512.pem'))
 
 
-class MakeKeyTest(unittest.TestCase):  # pylint: disable=too-few-public-methods
+class MakeKeyTest(unittest.TestCase):
     """Tests for certbot.crypto_util.make_key."""
 
     def test_it(self):  # pylint: disable=no-self-use
@@ -170,6 +261,20 @@ class MakeKeyTest(unittest.TestCase):  # pylint: disable=too-few-public-methods
         OpenSSL.crypto.load_privatekey(
             OpenSSL.crypto.FILETYPE_PEM, make_key(1024))
 
+    def test_ecdsa(self):
+        from certbot.crypto_util import make_key, valid_privkey
+        for curve, size in (("secp256r1", 256), ("secp384r1", 384)):
+            key = make_key(1024, "ecdsa", curve)
+            self.assertTrue(valid_privkey(key))
+            self.assertEqual(OpenSSL.crypto.load_privatekey(
+                OpenSSL.crypto.FILETYPE_PEM, key).bits(), size)
+
+    def test_unsupported(self):
+        from certbot.crypto_util import make_key
+        self.assertRaises(errors.Error, make_key, 1024, "dsa")
+        self.assertRaises(errors.Error, make_key, 1024, "ecdsa", "secp112r1")
+        self.assertRaises(errors.Error, make_key, 1024, "ecdsa")
+
 
 class VerifyCertSetup(unittest.TestCase):
     """Refactoring for verification tests."""
@@ -286,6 +391,9 @@ class ValidPrivkeyTest(unittest.TestCase):
     def test_valid_true(self):
         self.assertTrue(self._call(RSA512_KEY))
 
+    def test_valid_ecdsa_true(self):
+        self.assertTrue(self._call(P256_KEY))
+
     def test_empty_false(self):
         self.assertFalse(self._call(''))
 
@@ -356,6 +464,74 @@ class CertLoaderTest(unittest.TestCase):
             errors.Error, pyopenssl_load_certificate, bad_cert_data)
 
 
+class CertInfoTest(test_util.TempDirTestCase):
+    """Tests for certbot.crypto_util.cert_info."""
+
+    def setUp(self):
+        super(CertInfoTest, self).setUp()
+        self.cert_path = os.path.join(self.tempdir, 'cert.pem')
+        with open(self.cert_path, 'wb') as f:
+            f.write(test_util.load_vector('cert-san_512.pem'))
+
+    @classmethod
+    def _call(cls, cert_path):
+        from certbot.crypto_util import cert_info
+        return cert_info(cert_path)
+
+    def test_info(self):
+        info = self._call(CERT_PATH)
+        self.assertEqual(info.data, CERT)
+        self.assertEqual(info.not_before.isoformat(),
+                         '2014-12-11T22:34:45+00:00')
+        self.assertEqual(info.not_after.isoformat(),
+                         '2014-12-18T22:34:45+00:00')
+        self.assertEqual(info.names, ['example.com'])
+        self.assertEqual(info.sans, [])
+        cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, CERT)
+        self.assertEqual(info.serial, cert.get_serial_number())
+        self.assertEqual(info.certificate.serial_number, cert.get_serial_number())
+        self.assertTrue('CN=example.com' in info.issuer)
+        self.assertEqual(info.sha256,
+            '914ffed8daf9e2c99d90ac95c77d54f32cbd556672facac380f0c063498df84e')
+
+    def test_lazy(self):
+        with mock.patch('certbot.crypto_util.crypto.load_certificate',
+                        wraps=OpenSSL.crypto.load_certificate) as mock_load:
+            info = self._call(self.cert_path)
+            self.assertFalse(mock_load.called)
+            self.assertEqual(info.sans, ['example.com', 'www.example.com'])
+            self.assertEqual(info.x509, info.x509)
+        self.assertEqual(1, mock_load.call_count)
+
+    def test_invalid(self):
+        with open(self.cert_path, 'wb') as f:
+            f.write(b'not a certificate')
+        info = self._call(self.cert_path)
+        self.assertRaises(OpenSSL.crypto.Error, lambda: info.x509)
+        self.assertRaises(ValueError, lambda: info.certificate)
+
+    def test_cached(self):
+        with mock.patch('certbot.crypto_util.crypto.load_certificate',
+                        wraps=OpenSSL.crypto.load_certificate) as mock_load:
+            first = self._call(self.cert_path)
+            self.assertEqual(first.names, ['example.com', 'www.example.com'])
+            link = os.path.join(self.tempdir, 'link.pem')
+            os.symlink(self.cert_path, link)
+            self.assertTrue(first is self._call(link))
+            self.assertEqual(self._call(link).not_after, first.not_after)
+        self.assertEqual(1, mock_load.call_count)
+
+    def test_reparsed_when_changed(self):
+        self._call(self.cert_path)
+        with open(self.cert_path, 'wb') as f:
+            f.write(CERT)
+        self.assertEqual(self._call(self.cert_path).names, ['example.com'])
+
+    def test_missing(self):
+        self.assertRaises(OSError, self._call,
+                          os.path.join(self.tempdir, 'missing.pem'))
+
+
 class NotBeforeTest(unittest.TestCase):
     """Tests for certbot.crypto_util.notBefore"""
 
@@ -708,7 +708,7 @@ class MainTest(test_util.ConfigTestCase):  # pylint: disable=too-many-public-met
             args += ["--user-agent", ua]
             self._call_no_clientmock(args)
             acme_net.assert_called_once_with(mock.ANY, account=mock.ANY, verify_ssl=True,
-                user_agent=ua)
+                user_agent=ua, pool_maxsize=mock.ANY)
 
     @mock.patch('certbot.main.plug_sel.record_chosen_plugins')
     @mock.patch('certbot.main.plug_sel.pick_installer')
@@ -836,6 +836,28 @@ class MainTest(test_util.ConfigTestCase):  # pylint: disable=too-many-public-met
         self._call_no_clientmock(['update_symlinks'])
         self.assertEqual(1, mock_cert_manager.call_count)
 
+    @mock.patch('certbot.crypto_util.fill_key_pool')
+    def test_fill_key_pool(self, mock_fill):
+        mock_fill.return_value = 3
+        self._call_no_clientmock(['fill_key_pool', '--key-pool-size', '3',
+                                  '--rsa-key-size', '4096'])
+        mock_fill.assert_called_once_with(
+            os.path.join(self.config.config_dir, constants.KEY_POOL_DIR), 4096, 3, False,
+            "rsa", "secp256r1")
+
+    @mock.patch('certbot.crypto_util.fill_key_pool')
+    def test_fill_key_pool_ecdsa(self, mock_fill):
+        mock_fill.return_value = 1
+        self._call_no_clientmock(['fill_key_pool', '--key-type', 'ecdsa',
+                                  '--elliptic-curve', 'secp384r1'])
+        self.assertEqual(mock_fill.call_args[0][4:], ("ecdsa", "secp384r1"))
+
+    @mock.patch('certbot.crypto_util.fill_key_pool')
+    def test_fill_key_pool_negative_size(self, mock_fill):
+        self.assertRaises(errors.Error, self._call_no_clientmock,
+                          ['fill_key_pool', '--key-pool-size', '-1'])
+        self.assertFalse(mock_fill.called)
+
     @mock.patch('certbot.cert_manager.certificates')
     def test_certificates(self, mock_cert_manager):
         self._call_no_clientmock(['certificates'])
@@ -1311,6 +1333,17 @@ class MainTest(test_util.ConfigTestCase):  # pylint: disable=too-many-public-met
                 self._test_renewal_common(True, None, error_expected=True,
                                           args=['renew'], should_renew=False)
 
+    def test_renew_concurrently(self):
+        renewalparams = {'authenticator': 'webroot'}
+        self._test_renew_common(
+            renewalparams=renewalparams, assert_oc_called=True,
+            args=['renew', '--renew-concurrency', '4'])
+
+    def test_renew_bad_concurrency(self):
+        self._test_renew_common(
+            renewalparams={'authenticator': 'webroot'}, assert_oc_called=False,
+            args=['renew', '--renew-concurrency', '0'], error_expected=True)
+
     def test_renew_with_bad_cli_args(self):
         self._test_renewal_common(True, None, args='renew -d example.com'.split(),
                                   should_renew=False, error_expected=True)
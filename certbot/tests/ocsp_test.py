@@ -1,11 +1,28 @@
 """Tests for ocsp.py"""
 # pylint: disable=protected-access
 
+import contextlib
+import os
 import unittest
+from datetime import datetime, timedelta
 
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 import mock
+import requests
 
 from certbot import errors
+from certbot.tests import util as test_util
+
+try:
+    # Only cryptography>=2.5 has ocsp module
+    # and signature_hash_algorithm attribute in OCSPResponse class
+    from cryptography.x509 import ocsp as ocsp_lib  # pylint: disable=import-error
+    getattr(ocsp_lib.OCSPResponse, 'signature_hash_algorithm')
+except (ImportError, AttributeError):  # pragma: no cover
+    ocsp_lib = None  # type: ignore
 
 out = """Missing = in header key=value
 ocsp: Use -help for summary.
@@ -22,7 +39,7 @@ class OCSPTest(unittest.TestCase):
                 mock_communicate.communicate.return_value = (None, out)
                 mock_popen.return_value = mock_communicate
                 mock_exists.return_value = True
-                self.checker = ocsp.RevocationChecker()
+                self.checker = ocsp.RevocationChecker(enforce_openssl_binary_usage=True)
 
     def tearDown(self):
         pass
@@ -37,22 +54,33 @@ class OCSPTest(unittest.TestCase):
         mock_exists.return_value = True
 
         from certbot import ocsp
-        checker = ocsp.RevocationChecker()
+        checker = ocsp.RevocationChecker(enforce_openssl_binary_usage=True)
         self.assertEqual(mock_popen.call_count, 1)
         self.assertEqual(checker.host_args("x"), ["Host=x"])
 
         mock_communicate.communicate.return_value = (None, out.partition("\n")[2])
-        checker = ocsp.RevocationChecker()
+        checker = ocsp.RevocationChecker(enforce_openssl_binary_usage=True)
         self.assertEqual(checker.host_args("x"), ["Host", "x"])
         self.assertEqual(checker.broken, False)
 
         mock_exists.return_value = False
         mock_popen.call_count = 0
-        checker = ocsp.RevocationChecker()
+        checker = ocsp.RevocationChecker(enforce_openssl_binary_usage=True)
         self.assertEqual(mock_popen.call_count, 0)
         self.assertEqual(mock_log.call_count, 1)
         self.assertEqual(checker.broken, True)
 
+    @test_util.skip_unless(ocsp_lib, "cryptography>=2.5 is required")
+    @mock.patch('certbot.ocsp.Popen')
+    @mock.patch('certbot.util.exe_exists')
+    def test_init_without_openssl_binary(self, mock_exists, mock_popen):
+        from certbot import ocsp
+        checker = ocsp.RevocationChecker()
+        self.assertFalse(checker.use_openssl_binary)
+        self.assertFalse(checker.broken)
+        self.assertFalse(mock_exists.called)
+        self.assertFalse(mock_popen.called)
+
     @mock.patch('certbot.ocsp.RevocationChecker.determine_ocsp_server')
     @mock.patch('certbot.util.run_script')
     def test_ocsp_revoked(self, mock_run, mock_determine):
@@ -68,9 +96,31 @@ class OCSPTest(unittest.TestCase):
         mock_determine.return_value = ("http://x.co", "x.co")
         self.assertEqual(self.checker.ocsp_revoked("blah.pem", "chain.pem"), False)
         mock_run.side_effect = errors.SubprocessError("Unable to load certificate launcher")
-        self.assertEqual(self.checker.ocsp_revoked("x", "y"), False)
+        self.assertEqual(self.checker.ocsp_revoked("z", "y"), False)
         self.assertEqual(mock_run.call_count, 2)
 
+    @mock.patch('certbot.ocsp.RevocationChecker.determine_ocsp_server')
+    @mock.patch('certbot.util.run_script')
+    def test_ocsp_revoked_remembered(self, mock_run, mock_determine):
+        mock_determine.return_value = ("http://x.co", "x.co")
+        mock_run.return_value = tuple(openssl_revoked[1:])
+        self.assertEqual(self.checker.ocsp_revoked("blah.pem", "chain.pem"), True)
+        self.assertEqual(self.checker.ocsp_revoked("blah.pem", "chain.pem"), True)
+        self.assertEqual(mock_run.call_count, 1)
+
+    @mock.patch('certbot.ocsp.time.time')
+    @mock.patch('certbot.ocsp.RevocationChecker.determine_ocsp_server')
+    @mock.patch('certbot.util.run_script')
+    def test_ocsp_time_budget(self, mock_run, mock_determine, mock_time):
+        mock_determine.return_value = ("http://x.co", "x.co")
+        mock_run.return_value = tuple(openssl_revoked[1:])
+        mock_time.return_value = 100
+        self.checker.time_budget = 10
+        self.assertEqual(self.checker.ocsp_revoked("blah.pem", "chain.pem"), True)
+        mock_time.return_value = 110
+        self.assertEqual(self.checker.ocsp_revoked("other.pem", "chain.pem"), False)
+        self.assertEqual(mock_run.call_count, 1)
+
 
     @mock.patch('certbot.ocsp.logger.info')
     @mock.patch('certbot.util.run_script')
@@ -111,6 +161,218 @@ class OCSPTest(unittest.TestCase):
         self.assertEqual(ocsp._translate_ocsp_query(*openssl_expired_ocsp_revoked), True)
         self.assertEqual(mock_log.info.call_count, 1)
 
+@test_util.skip_unless(ocsp_lib, "cryptography>=2.5 is required")
+class OSCPTestCryptography(test_util.TempDirTestCase):
+    """Tests for the cryptography implementation of the OCSP checker."""
+
+    def setUp(self):
+        super(OSCPTestCryptography, self).setUp()
+        from certbot import ocsp
+        self.issuer_key = _make_key()
+        self.issuer = _make_cert(self.issuer_key, "Issuer", self.issuer_key, "Issuer")
+        self.cert_key = _make_key()
+        self.cert = _make_cert(self.cert_key, "example.com", self.issuer_key, "Issuer",
+                               ocsp_uri="http://ocsp.example.com/")
+        self.cert_path = _write_pem(self.tempdir, "cert.pem", self.cert)
+        self.chain_path = _write_pem(self.tempdir, "chain.pem", self.issuer)
+        self.cache_dir = os.path.join(self.tempdir, "ocsp")
+        self.checker = ocsp.RevocationChecker(cache_dir=self.cache_dir)
+
+    def _response(self, status=None, **kwargs):
+        kwargs.setdefault("issuer", self.issuer)
+        kwargs.setdefault("responder_cert", self.issuer)
+        kwargs.setdefault("responder_key", self.issuer_key)
+        return _make_response(self.cert, status or ocsp_lib.OCSPCertStatus.GOOD, **kwargs)
+
+    @contextlib.contextmanager
+    def _post(self, *responses):
+        with mock.patch('certbot.ocsp.requests.Session.post') as mock_post:
+            mock_post.side_effect = [mock.MagicMock(status_code=200, content=response)
+                                     for response in responses]
+            yield mock_post
+
+    def test_determine_ocsp_server(self):
+        self.assertEqual(self.checker.determine_ocsp_server(self.cert_path),
+                         ("http://ocsp.example.com/", "ocsp.example.com"))
+        self.assertEqual(self.checker.determine_ocsp_server(self.chain_path), (None, None))
+        self.assertEqual(self.checker.determine_ocsp_server(
+            os.path.join(self.tempdir, "missing.pem")), (None, None))
+
+    def test_ocsp_revoked(self):
+        with self._post(self._response(ocsp_lib.OCSPCertStatus.REVOKED)) as mock_post:
+            self.assertTrue(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertEqual(mock_post.call_args[0][0], "http://ocsp.example.com/")
+        self.assertEqual(mock_post.call_args[1]["headers"],
+                         {'Content-Type': 'application/ocsp-request'})
+
+    def test_ocsp_good_and_unknown(self):
+        with self._post(self._response(), self._response(ocsp_lib.OCSPCertStatus.UNKNOWN)):
+            self.checker.cache_dir = None
+            self.assertFalse(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+            self._new_checker()
+            self.checker.cache_dir = None
+            self.assertFalse(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+
+    def _new_checker(self):
+        from certbot import ocsp
+        self.checker = ocsp.RevocationChecker(cache_dir=self.cache_dir)
+
+    def _check(self):
+        self._new_checker()
+        return self.checker.ocsp_revoked(self.cert_path, self.chain_path)
+
+    def test_ocsp_response_cached_until_next_update(self):
+        with self._post(self._response(ocsp_lib.OCSPCertStatus.REVOKED)) as mock_post:
+            self.assertTrue(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+            self._new_checker()
+            self.assertTrue(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # An expired cached response is queried again
+        expired = self._response(this_update=datetime.utcnow() - timedelta(days=2),
+                                 next_update=datetime.utcnow() - timedelta(days=1))
+        cached = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(cached, 'wb') as f:
+            f.write(expired)
+        self._new_checker()
+        with self._post(self._response()) as mock_post:
+            self.assertFalse(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertEqual(mock_post.call_count, 1)
+
+    def test_ocsp_response_without_next_update_not_cached(self):
+        with self._post(*[self._response(next_update=None)] * 2) as mock_post:
+            self.checker.ocsp_revoked(self.cert_path, self.chain_path)
+            self._new_checker()
+            self.checker.ocsp_revoked(self.cert_path, self.chain_path)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_ocsp_revoked_many(self):
+        responses = [self._response(ocsp_lib.OCSPCertStatus.REVOKED) for _ in range(3)]
+        paths = [(_write_pem(self.tempdir, "cert{0}.pem".format(i), self.cert), self.chain_path)
+                 for i in range(3)]
+        self.checker.cache_dir = None
+        with self._post(*responses) as mock_post:
+            self.assertEqual(self.checker.ocsp_revoked_many(paths), [True] * 3)
+        self.assertEqual(mock_post.call_count, 3)
+
+    def test_ocsp_request_failures(self):
+        with mock.patch('certbot.ocsp.requests.Session.post') as mock_post:
+            mock_post.side_effect = requests.exceptions.ConnectionError
+            self.assertFalse(self._check())
+            mock_post.side_effect = None
+            mock_post.return_value = mock.MagicMock(status_code=500)
+            self.assertFalse(self._check())
+            mock_post.return_value = mock.MagicMock(status_code=200, content=b"garbage")
+            self.assertFalse(self._check())
+
+    def test_ocsp_time_budget(self):
+        self.checker.time_budget = 0
+        with self._post(self._response(ocsp_lib.OCSPCertStatus.REVOKED)) as mock_post:
+            self.assertFalse(self.checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertFalse(mock_post.called)
+
+    def test_ocsp_missing_files(self):
+        self.assertFalse(self.checker.ocsp_revoked(
+            self.cert_path, os.path.join(self.tempdir, "missing.pem")))
+
+    def test_invalid_responses(self):
+        other_key = _make_key()
+        other = _make_cert(other_key, "Issuer", other_key, "Issuer")
+        now = datetime.utcnow()
+        invalid = [
+            # Responder name matches the issuer, but signed by another key
+            self._response(responder_cert=other, responder_key=other_key),
+            # Valid in the future
+            self._response(this_update=now + timedelta(days=1),
+                           next_update=now + timedelta(days=2)),
+            # Expired
+            self._response(this_update=now - timedelta(days=2),
+                           next_update=now - timedelta(days=1)),
+            # About another issuer
+            self._response(issuer=other),
+            ocsp_lib.OCSPResponseBuilder.build_unsuccessful(
+                ocsp_lib.OCSPResponseStatus.TRY_LATER).public_bytes(serialization.Encoding.DER),
+        ]
+        with self._post(*invalid):
+            for _ in invalid:
+                self.assertFalse(self._check())
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_delegated_responder(self):
+        delegate_key = _make_key()
+        delegate = _make_cert(delegate_key, "Delegate", self.issuer_key, "Issuer",
+                              ocsp_signing=True)
+        with self._post(self._response(ocsp_lib.OCSPCertStatus.REVOKED, responder_cert=delegate,
+                                       responder_key=delegate_key, by_hash=True)):
+            self.assertTrue(self._check())
+
+    def test_delegated_responder_not_authorized(self):
+        delegate_key = _make_key()
+        delegate = _make_cert(delegate_key, "Delegate", self.issuer_key, "Issuer")
+        other_key = _make_key()
+        foreign = _make_cert(delegate_key, "Delegate", other_key, "Other", ocsp_signing=True)
+        with self._post(self._response(ocsp_lib.OCSPCertStatus.REVOKED, responder_cert=delegate,
+                                       responder_key=delegate_key),
+                        self._response(ocsp_lib.OCSPCertStatus.REVOKED, responder_cert=foreign,
+                                       responder_key=delegate_key),
+                        self._response(ocsp_lib.OCSPCertStatus.REVOKED, responder_cert=foreign,
+                                       responder_key=delegate_key, include_responder=False)):
+            self.assertFalse(self._check())
+            self.assertFalse(self._check())
+            self.assertFalse(self._check())
+
+
+def _make_key():
+    return ec.generate_private_key(ec.SECP256R1(), default_backend())
+
+
+def _make_cert(key, subject, issuer_key, issuer, ocsp_uri=None, ocsp_signing=False):
+    now = datetime.utcnow()
+    builder = (x509.CertificateBuilder()
+               .subject_name(x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, subject)]))
+               .issuer_name(x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, issuer)]))
+               .public_key(key.public_key())
+               .serial_number(x509.random_serial_number())
+               .not_valid_before(now - timedelta(days=1))
+               .not_valid_after(now + timedelta(days=1)))
+    if ocsp_uri:
+        builder = builder.add_extension(x509.AuthorityInformationAccess([
+            x509.AccessDescription(x509.oid.AuthorityInformationAccessOID.OCSP,
+                                   x509.UniformResourceIdentifier(ocsp_uri))]), critical=False)
+    if ocsp_signing:
+        builder = builder.add_extension(x509.ExtendedKeyUsage(
+            [x509.oid.ExtendedKeyUsageOID.OCSP_SIGNING]), critical=False)
+    return builder.sign(issuer_key, hashes.SHA256(), default_backend())
+
+
+def _write_pem(directory, name, cert):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+def _make_response(cert, status, issuer, responder_cert, responder_key, by_hash=False,
+                   include_responder=True, this_update=None, next_update=False):
+    now = datetime.utcnow()
+    if next_update is False:
+        next_update = now + timedelta(days=1)
+    builder = ocsp_lib.OCSPResponseBuilder().add_response(
+        cert=cert, issuer=issuer, algorithm=hashes.SHA1(), cert_status=status,
+        this_update=this_update or now - timedelta(hours=1), next_update=next_update,
+        revocation_time=now - timedelta(hours=2) if status == ocsp_lib.OCSPCertStatus.REVOKED
+        else None,
+        revocation_reason=None)
+    encoding = ocsp_lib.OCSPResponderEncoding.HASH if by_hash \
+        else ocsp_lib.OCSPResponderEncoding.NAME
+    builder = builder.responder_id(encoding, responder_cert)
+    if include_responder and responder_cert is not issuer:
+        builder = builder.certificates([responder_cert])
+    response = builder.sign(responder_key, hashes.SHA256())
+    return response.public_bytes(serialization.Encoding.DER)
+
 
 # pylint: disable=line-too-long
 openssl_confused = ("", """
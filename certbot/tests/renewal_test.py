@@ -91,5 +91,171 @@ class RestoreRequiredConfigElementsTest(test_util.ConfigTestCase):
         self.assertRaises(
             errors.Error, self._call, self.config, renewalparams)
 
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    def test_key_type_success(self, mock_set_by_cli):
+        mock_set_by_cli.return_value = False
+        self._call(self.config, {'key_type': 'ecdsa', 'elliptic_curve': 'secp384r1'})
+        self.assertEqual(self.config.key_type, 'ecdsa')
+        self.assertEqual(self.config.elliptic_curve, 'secp384r1')
+
+class PrefilterLineagesTest(test_util.ConfigTestCase):
+    """Tests for certbot.renewal._prefilter_lineages."""
+
+    def setUp(self):
+        super(PrefilterLineagesTest, self).setUp()
+        self.config.renew_by_default = False
+        self.config.dry_run = False
+        self.config.disable_renew_updates = False
+        self.config.installer = None
+        self.entries = {
+            "due.conf": {"not_after": 0, "autorenew": True,
+                         "renew_before_expiry": "30 days", "installer": None,
+                         "fullchain": "due/fullchain.pem",
+                         "cert": "due/cert.pem", "chain": "due/chain.pem"},
+            "later.conf": {"not_after": 2 ** 32, "autorenew": True,
+                           "renew_before_expiry": "30 days", "installer": None,
+                           "fullchain": "later/fullchain.pem",
+                           "cert": "later/cert.pem", "chain": "later/chain.pem"},
+            "nginx.conf": {"not_after": 2 ** 32, "autorenew": True,
+                           "renew_before_expiry": "30 days", "installer": "nginx",
+                           "fullchain": "nginx/fullchain.pem",
+                           "cert": "nginx/cert.pem", "chain": "nginx/chain.pem"},
+        }
+        self.index = mock.MagicMock()
+        self.index.get.side_effect = self.entries.get
+        self.index.is_due.side_effect = storage.ExpiryIndex.is_due
+        self.index.expiry.side_effect = storage.ExpiryIndex.expiry
+        self.conf_files = ["unknown.conf", "due.conf", "later.conf", "nginx.conf"]
+        self.checker = mock.MagicMock()
+        self.checker.ocsp_revoked_many.side_effect = lambda paths: [False] * len(paths)
+
+    def _call(self):
+        # pylint: disable=protected-access
+        from certbot.renewal import _prefilter_lineages
+        with mock.patch('certbot.renewal.storage.ExpiryIndex', self.index):
+            with mock.patch('certbot.renewal.ocsp.revocation_checker') as mock_checker:
+                mock_checker.return_value = self.checker
+                return _prefilter_lineages(self.config, self.conf_files, self.index)
+
+    def test_skips_lineages_not_due(self):
+        self.assertEqual(self._call(), (
+            ["unknown.conf", "due.conf", "nginx.conf"],
+            ["later/fullchain.pem expires on 2106-02-07"]))
+
+    def test_updates_disabled(self):
+        self.config.disable_renew_updates = True
+        to_process, skipped = self._call()
+        self.assertEqual(to_process, ["unknown.conf", "due.conf"])
+        self.assertEqual(len(skipped), 2)
+
+    def test_revoked_lineages_processed(self):
+        self.config.disable_renew_updates = True
+        self.checker.ocsp_revoked_many.side_effect = lambda paths: [
+            cert == "later/cert.pem" for cert, _ in paths]
+        to_process, skipped = self._call()
+        self.assertEqual(to_process, ["unknown.conf", "due.conf", "later.conf"])
+        self.assertEqual(skipped, ["nginx/fullchain.pem expires on 2106-02-07"])
+        paths = self.checker.ocsp_revoked_many.call_args[0][0]
+        self.assertEqual(sorted(paths), [("later/cert.pem", "later/chain.pem"),
+                                         ("nginx/cert.pem", "nginx/chain.pem")])
+
+    def test_revocation_not_checked_without_autorenew(self):
+        self.entries["later.conf"]["autorenew"] = False
+        self.assertEqual(self._call()[0], ["unknown.conf", "due.conf", "nginx.conf"])
+        self.checker.ocsp_revoked_many.assert_called_once_with([])
+
+    def test_entries_without_chain_processed(self):
+        del self.entries["later.conf"]["chain"]
+        self.assertEqual(self._call(), (self.conf_files, []))
+
+    def test_installer_on_cli(self):
+        self.config.installer = "apache"
+        self.assertEqual(self._call(), (self.conf_files[:], []))
+
+    def test_forced(self):
+        self.config.renew_by_default = True
+        self.assertEqual(self._call(), (self.conf_files, []))
+        self.config.renew_by_default = False
+        self.config.dry_run = True
+        self.assertEqual(self._call(), (self.conf_files, []))
+
+
+class ExclusivePluginsTest(unittest.TestCase):
+    """Tests for certbot.renewal._exclusive_plugins."""
+
+    @classmethod
+    def _call(cls, authenticator, installer=None):
+        # pylint: disable=protected-access
+        from certbot.renewal import _exclusive_plugins
+        return _exclusive_plugins(
+            mock.MagicMock(authenticator=authenticator, installer=installer))
+
+    def test_parallel_safe_authenticators(self):
+        self.assertEqual(self._call("webroot"), [])
+        self.assertEqual(self._call("dns-route53"), [])
+        self.assertEqual(self._call("certbot-dns-route53:dns-route53"), [])
+
+    def test_exclusive_plugins(self):
+        self.assertEqual(self._call("standalone"), ["standalone"])
+        self.assertEqual(self._call("nginx", "nginx"), ["nginx"])
+        self.assertEqual(self._call("webroot", "apache"), ["apache"])
+        self.assertEqual(self._call("manual", "nginx"), ["manual", "nginx"])
+
+
+class RenewLineagesConcurrentlyTest(test_util.ConfigTestCase):
+    """Tests for certbot.renewal._renew_lineages_concurrently."""
+
+    def setUp(self):
+        super(RenewLineagesConcurrentlyTest, self).setUp()
+        self.config.renew_concurrency = 4
+
+    @classmethod
+    def _call(cls, *args, **kwargs):
+        # pylint: disable=protected-access
+        from certbot.renewal import _renew_lineages_concurrently
+        return _renew_lineages_concurrently(*args, **kwargs)
+
+    @mock.patch('certbot.renewal._renew_lineage')
+    @mock.patch('certbot.renewal._load_lineage')
+    def test_results_in_order(self, mock_load, mock_renew):
+        from certbot import renewal
+        files = ["a.conf", "broken.conf", "b.conf", "c.conf"]
+
+        def load(unused_config, renewal_file):
+            if renewal_file == "broken.conf":
+                return None
+            return (mock.MagicMock(authenticator="webroot", installer=None),
+                    mock.MagicMock(fullchain=renewal_file))
+        mock_load.side_effect = load
+        mock_renew.side_effect = lambda _, lineage, *unused_args: (
+            renewal.RENEW_SUCCESS, lineage.fullchain)
+
+        results, parse_failures = self._call(self.config, files)
+
+        self.assertEqual(parse_failures, ["broken.conf"])
+        self.assertEqual(results, [(renewal.RENEW_SUCCESS, name)
+                                   for name in ("a.conf", "b.conf", "c.conf")])
+
+    @mock.patch('certbot.renewal._load_lineage')
+    def test_no_lineages(self, mock_load):
+        mock_load.return_value = None
+        self.assertEqual(self._call(self.config, ["a.conf"]), ([], ["a.conf"]))
+
+    @mock.patch('certbot.renewal.zope.component.provideUtility')
+    @mock.patch('certbot.renewal._renew_lineage')
+    @mock.patch('certbot.renewal._load_lineage')
+    def test_lineage_config_not_global(self, mock_load, mock_renew, mock_provide):
+        from certbot import renewal
+        lineage_config = mock.MagicMock(authenticator="standalone", installer=None)
+        mock_load.return_value = (lineage_config, mock.MagicMock())
+        mock_renew.return_value = (renewal.RENEW_FAILURE, "fullchain")
+
+        results, _ = self._call(self.config, ["a.conf", "b.conf"])
+
+        self.assertEqual(results, [(renewal.RENEW_FAILURE, "fullchain")] * 2)
+        self.assertTrue(mock_renew.call_args[0][0] is lineage_config)
+        self.assertFalse(mock_provide.called)
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
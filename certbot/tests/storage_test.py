@@ -383,6 +383,18 @@ class RenewableCertTests(BaseRenewableCertTest):
         os.unlink(self.test_rc.cert)
         self.assertRaises(errors.CertStorageError, self.test_rc.names)
 
+    def test_cert_info(self):
+        self._write_out_kind("cert", 15, test_util.load_vector("cert_512.pem"))
+        self._write_out_kind("cert", 12, test_util.load_vector("cert-san_512.pem"))
+
+        self.assertEqual(self.test_rc.cert_info().names,
+                         ["example.com", "www.example.com"])
+        self.assertEqual(self.test_rc.cert_info(15).names, ["example.com"])
+        self.assertEqual(self.test_rc.target_expiry,
+                         self.test_rc.cert_info(12).not_after)
+        os.unlink(self.test_rc.cert)
+        self.assertRaises(errors.CertStorageError, self.test_rc.cert_info)
+
     @mock.patch("certbot.storage.cli")
     @mock.patch("certbot.storage.datetime")
     def test_time_interval_judgments(self, mock_datetime, mock_cli):
@@ -463,8 +475,9 @@ class RenewableCertTests(BaseRenewableCertTest):
         self.assertFalse(self.test_rc.autorenewal_is_enabled())
 
     @mock.patch("certbot.storage.cli")
+    @mock.patch("certbot.storage.datetime")
     @mock.patch("certbot.storage.RenewableCert.ocsp_revoked")
-    def test_should_autorenew(self, mock_ocsp, mock_cli):
+    def test_should_autorenew(self, mock_ocsp, mock_datetime, mock_cli):
         """Test should_autorenew on the basis of reasons other than
         expiry time window."""
         # pylint: disable=too-many-statements
@@ -475,10 +488,23 @@ class RenewableCertTests(BaseRenewableCertTest):
         self.test_rc.configuration["renewalparams"]["autorenew"] = "True"
         for kind in ALL_FOUR:
             self._write_out_kind(kind, 12)
+        with open(self.test_rc.cert, "wb") as f:
+            f.write(test_util.load_vector("cert_512.pem"))
+        # 2009-05-01 12:00:00+00:00 (about 5 years prior to expiry)
+        mock_datetime.timedelta = datetime.timedelta
+        mock_datetime.datetime.utcnow.return_value = (
+            datetime.datetime.utcfromtimestamp(1241179200))
         # Mandatory renewal on the basis of OCSP revocation
         mock_ocsp.return_value = True
         self.assertTrue(self.test_rc.should_autorenew())
         mock_ocsp.return_value = False
+        self.assertFalse(self.test_rc.should_autorenew())
+        # OCSP is not queried when the certificate is due for renewal anyway
+        mock_ocsp.reset_mock()
+        mock_datetime.datetime.utcnow.return_value = (
+            datetime.datetime.utcfromtimestamp(1420070400))
+        self.assertTrue(self.test_rc.should_autorenew())
+        self.assertFalse(mock_ocsp.called)
 
     @mock.patch("certbot.storage.relevant_values")
     def test_save_successor(self, mock_rv):
@@ -701,10 +727,26 @@ class RenewableCertTests(BaseRenewableCertTest):
             errors.CertStorageError,
             self.test_rc._update_link_to, "elephant", 17)
 
-    def test_ocsp_revoked(self):
-        # XXX: This is currently hardcoded to False due to a lack of an
-        #      OCSP server to test against.
-        self.assertFalse(self.test_rc.ocsp_revoked())
+    @mock.patch("certbot.storage.ocsp.RevocationChecker.ocsp_revoked")
+    def test_ocsp_revoked(self, mock_revoked):
+        self._write_out_ex_kinds()
+        mock_revoked.return_value = True
+        self.assertTrue(self.test_rc.ocsp_revoked())
+        mock_revoked.assert_called_once_with(self.test_rc.version("cert", 11),
+                                             self.test_rc.version("chain", 11))
+        self.assertTrue(self.test_rc.ocsp_revoked(12))
+        mock_revoked.assert_called_with(self.test_rc.version("cert", 12),
+                                        self.test_rc.version("chain", 12))
+
+    def test_ocsp_revoked_shared_checker(self):
+        from certbot import ocsp
+        self._write_out_ex_kinds()
+        checker = mock.MagicMock()
+        checker.ocsp_revoked.return_value = False
+        with ocsp.shared_revocation_checker(checker):
+            self.assertFalse(self.test_rc.ocsp_revoked(12))
+        checker.ocsp_revoked.assert_called_once_with(self.test_rc.version("cert", 12),
+                                                     self.test_rc.version("chain", 12))
 
     def test_add_time_interval(self):
         from certbot import storage
@@ -909,6 +951,176 @@ class DeleteFilesTest(BaseRenewableCertTest):
             self.config.live_dir, "example.org")))
         self.assertFalse(os.path.exists(archive_dir))
 
+
+class ExpiryIndexTest(BaseRenewableCertTest):
+    """Tests for certbot.storage.ExpiryIndex."""
+    def setUp(self):
+        super(ExpiryIndexTest, self).setUp()
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1, test_util.load_vector("cert_512.pem")
+                                 if kind == "cert" else None)
+        self.test_rc.configuration["renewalparams"] = {}
+        self.renewal_file = self.config_file.filename
+
+    def _index(self):
+        from certbot.storage import ExpiryIndex
+        return ExpiryIndex(self.config)
+
+    def test_round_trip(self):
+        index = self._index()
+        index.update(self.test_rc)
+        index.save()
+
+        entry = self._index().get(self.renewal_file)
+        self.assertTrue(entry is not None)
+        self.assertEqual(entry["fullchain"], self.test_rc.fullchain)
+        self.assertEqual(entry["chain"], self.test_rc.version(
+            "chain", self.test_rc.latest_common_version()))
+        self.assertTrue(entry["installer"] is None)
+        self.assertEqual(self._index().expiry(entry),
+                         pytz.UTC.localize(datetime.datetime(2014, 12, 18, 22, 34, 45)))
+        self.assertEqual(stat.S_IMODE(os.stat(index.path).st_mode), 0o600)
+
+    def test_is_due(self):
+        index = self._index()
+        index.update(self.test_rc)
+        entry = index.get(self.renewal_file)
+        # CERT expired long ago
+        self.assertTrue(index.is_due(entry))
+        entry["not_after"] += 10 ** 10
+        self.assertFalse(index.is_due(entry))
+        entry["not_after"] -= 10 ** 10
+        entry["autorenew"] = False
+        self.assertFalse(index.is_due(entry))
+
+    def test_stale_entry(self):
+        index = self._index()
+        index.update(self.test_rc)
+        self.assertTrue(index.get(self.renewal_file) is not None)
+        # a new file in the archive directory invalidates the entry
+        archive_mtime = os.stat(self.test_rc.archive_dir).st_mtime
+        os.utime(self.test_rc.archive_dir, (archive_mtime + 10, archive_mtime + 10))
+        self.assertTrue(index.get(self.renewal_file) is None)
+        self.assertTrue(index.get(os.path.join(
+            self.config.renewal_configs_dir, "other.conf")) is None)
+
+    def test_corrupted_index(self):
+        index = self._index()
+        with open(index.path, "w") as f:
+            f.write("not json")
+        self.assertTrue(self._index().get(self.renewal_file) is None)
+        with open(index.path, "w") as f:
+            f.write("[]")
+        self.assertTrue(self._index().get(self.renewal_file) is None)
+
+    def _test_invalidated(self, func):
+        index = self._index()
+        index.update(self.test_rc)
+        index.save()
+        func()
+        self.assertTrue(self._index().get(self.renewal_file) is None)
+
+    @mock.patch("certbot.storage.relevant_values")
+    def test_save_successor_invalidates(self, mock_rv):
+        mock_rv.side_effect = lambda x: x
+        self._test_invalidated(lambda: self.test_rc.save_successor(
+            1, b"new cert", None, b"new chain", self.config))
+
+    def test_rename_invalidates(self):
+        from certbot.storage import rename_renewal_config
+        self._test_invalidated(lambda: rename_renewal_config(
+            "example.org", "other.org", self.config))
+
+    def test_delete_invalidates(self):
+        from certbot.storage import delete_files
+        self._test_invalidated(lambda: delete_files(self.config, "example.org"))
+
+    def test_invalidate_without_entry(self):
+        from certbot.storage import invalidate_expiry_index
+        index = self._index()
+        invalidate_expiry_index(self.config, "example.org")
+        self.assertFalse(os.path.exists(index.path))
+
+
+class VersionManifestTest(BaseRenewableCertTest):
+    """Tests for certbot.storage.VersionManifest."""
+
+    def setUp(self):
+        super(VersionManifestTest, self).setUp()
+        for ver in (1, 2, 3):
+            for kind in ALL_FOUR:
+                self._write_out_kind(kind, ver)
+        self._write_out_kind("cert", 4)
+        self.archive_dir = self.test_rc.archive_dir
+
+    def _age_archive(self):
+        """Pretend the archive was last modified long ago."""
+        os.utime(self.archive_dir, (0, 0))
+
+    def _manifest(self):
+        from certbot.storage import VersionManifest
+        return VersionManifest(self.archive_dir)
+
+    def test_scan(self):
+        manifest = self._manifest()
+        self.assertEqual([1, 2, 3, 4], manifest.available_versions("cert"))
+        self.assertEqual([1, 2, 3], manifest.available_versions("privkey"))
+        self.assertEqual(3, manifest.latest_common_version)
+
+    def test_recently_modified_not_trusted(self):
+        self.assertFalse(self._manifest().is_current())
+
+    def test_current(self):
+        self._age_archive()
+        manifest = self._manifest()
+        self.assertTrue(manifest.is_current())
+        self._write_out_kind("chain", 4)
+        self.assertFalse(manifest.is_current())
+
+    def test_add(self):
+        manifest = self._manifest()
+        manifest.add(5)
+        self.assertTrue(manifest.is_current())
+        self.assertEqual([1, 2, 3, 4, 5], manifest.available_versions("cert"))
+        self.assertEqual([1, 2, 3, 5], manifest.available_versions("chain"))
+        self.assertEqual(5, manifest.latest_common_version)
+
+    def test_lineage_reuses_manifest(self):
+        self._age_archive()
+        with mock.patch("certbot.storage.os.listdir",
+                        wraps=os.listdir) as mock_listdir:
+            self.assertEqual(3, self.test_rc.latest_common_version())
+            self.assertEqual(5, self.test_rc.next_free_version())
+            self.assertFalse(self.test_rc.has_pending_deployment())
+            self.assertEqual(4, self.test_rc.newest_available_version("cert"))
+        self.assertEqual(1, mock_listdir.call_count)
+
+    def test_save_successor_updates_manifest(self):
+        self._age_archive()
+        self.test_rc.latest_common_version()
+        with mock.patch("certbot.storage.os.listdir") as mock_listdir:
+            self.assertEqual(5, self.test_rc.save_successor(
+                3, b"new cert", None, b"new chain", self.config))
+            self.assertEqual(5, self.test_rc.latest_common_version())
+            self.assertEqual([1, 2, 3, 5],
+                             self.test_rc.available_versions("privkey"))
+        self.assertFalse(mock_listdir.called)
+
+    def test_no_newest_version(self):
+        # pylint: disable=protected-access
+        with mock.patch.object(self.test_rc, "_version_manifest") as mock_manifest:
+            mock_manifest().available_versions.return_value = []
+            self.assertRaises(errors.CertStorageError,
+                              self.test_rc.newest_available_version, "chain")
+
+    def test_no_common_version(self):
+        os.unlink(self.test_rc.version("cert", 3))
+        for ver in (1, 2):
+            os.unlink(self.test_rc.version("chain", ver))
+        self.assertRaises(errors.CertStorageError,
+                          self.test_rc.latest_common_version)
+
+
 class CertPathForCertNameTest(BaseRenewableCertTest):
     """Test for certbot.storage.cert_path_for_cert_name"""
     def setUp(self):
@@ -52,6 +52,8 @@ dev_extras = [
     # Pin astroid==1.3.5, pylint==1.4.2 as a workaround for #289
     'astroid==1.3.5',
     'coverage',
+    # certbot.plugins.dns_propagation
+    'dnspython',
     'ipdb',
     'pytest',
     'pytest-cov',
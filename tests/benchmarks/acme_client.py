@@ -0,0 +1,70 @@
+"""Micro-benchmark of JWS wrapping and request logging in acme.client.
+
+Compares the compact and pretty-printed JWS encodings of
+`.ClientNetwork._wrap_in_jws` and the cost of `.ClientNetwork._send_request`
+with debug logging enabled and disabled. Run it with::
+
+  python tests/benchmarks/acme_client.py [iterations]
+
+"""
+import logging
+import sys
+import timeit
+
+import josepy as jose
+import mock
+
+from acme import client
+from acme import messages
+from acme import test_util
+
+
+def _wrap_in_jws(net, obj):
+    """Time signing and serializing obj."""
+    return lambda: net._wrap_in_jws(  # pylint: disable=protected-access
+        obj, nonce=b'nonce', url='https://example.com/acme/new-order',
+        acme_version=2)
+
+
+def _send_request(net):
+    """Time sending a request that returns a large JSON response."""
+    response = mock.MagicMock(status_code=200, content=b'{"a": "b"}' * 4096)
+    response.headers = {'Content-Type': 'application/json',
+                        'Replay-Nonce': 'nonce'}
+    net.session = mock.MagicMock()
+    net.session.request.return_value = response
+    return lambda: net._send_request(  # pylint: disable=protected-access
+        'GET', 'https://example.com/acme/authz/1')
+
+
+def main(iterations=200):
+    """Print the time per call of each case."""
+    key = jose.JWKRSA.load(test_util.load_vector('rsa2048_key.pem'))
+    order = messages.NewOrder(identifiers=[
+        messages.Identifier(typ=messages.IDENTIFIER_FQDN,
+                            value='www{0}.example.com'.format(i))
+        for i in range(100)])
+    # Send log records nowhere, so only their formatting is measured.
+    logging.getLogger().addHandler(logging.NullHandler())
+    acme_logger = logging.getLogger(client.__name__)
+
+    cases = [
+        ('_wrap_in_jws, pretty', _wrap_in_jws(
+            client.ClientNetwork(key, compact=False), order)),
+        ('_wrap_in_jws, compact', _wrap_in_jws(
+            client.ClientNetwork(key), order)),
+        ('_send_request, debug on', _send_request(
+            client.ClientNetwork(key))),
+        ('_send_request, debug off', _send_request(
+            client.ClientNetwork(key))),
+    ]
+    for name, func in cases:
+        level = logging.INFO if 'debug off' in name else logging.DEBUG
+        acme_logger.setLevel(level)
+        seconds = timeit.timeit(func, number=iterations)
+        print('{0:<28}{1:10.1f} us/call'.format(
+            name, seconds / iterations * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,95 @@
+"""Micro-benchmark of certificate parsing while inspecting lineages.
+
+Runs the checks Certbot makes on each lineage for `certbot certificates`
+and `certbot renew` (validity dates, names, chain signature, fullchain
+consistency, key match and OCSP loading) over a corpus of lineages. It
+counts certificate parse calls and measures the time per lineage, both
+cold, with `certbot.crypto_util.cert_info`'s cache cleared before each
+check as if every check read its files itself, and warm, with the cache
+shared between the checks. Run it with::
+
+  python tests/benchmarks/cert_info.py [iterations] [lineage_dir...]
+
+Each lineage_dir is a live or archive directory holding cert, chain,
+fullchain and privkey PEM files. The sample archive from the test data
+is used when none is given.
+
+"""
+import collections
+import glob
+import os
+import sys
+import timeit
+
+import mock
+
+from certbot import crypto_util
+from certbot import ocsp
+
+SAMPLE_ARCHIVE = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir,
+                              'certbot', 'tests', 'testdata', 'sample-archive')
+
+Lineage = collections.namedtuple('Lineage', 'cert chain fullchain privkey')
+
+
+def _lineage(directory):
+    """Find the latest version of each file of a lineage directory."""
+    paths = []
+    for kind in Lineage._fields:
+        candidates = sorted(glob.glob(os.path.join(directory, kind + '*.pem')))
+        if not candidates:
+            raise SystemExit('No {0} found in {1}'.format(kind, directory))
+        paths.append(candidates[-1])
+    return Lineage(*paths)
+
+
+def _checks(lineage):
+    """Checks made on a lineage, each of which reads its certificates."""
+    # pylint: disable=protected-access
+    return [
+        lambda: crypto_util.notBefore(lineage.cert),
+        lambda: crypto_util.notAfter(lineage.cert),
+        lambda: crypto_util.cert_info(lineage.cert).names,
+        lambda: crypto_util.verify_renewable_cert_sig(lineage),
+        lambda: crypto_util.verify_fullchain(lineage),
+        lambda: crypto_util.verify_cert_matches_priv_key(lineage.cert, lineage.privkey),
+        lambda: ocsp._ocsp_uri(ocsp._load_cert(lineage.cert)),
+        lambda: ocsp._load_cert(lineage.chain),
+    ]
+
+
+def _inspect(lineages, cold):
+    """Run all checks on all lineages."""
+    def inspect():  # pylint: disable=missing-docstring
+        for lineage in lineages:
+            crypto_util._cert_info_cache.clear()  # pylint: disable=protected-access
+            for check in _checks(lineage):
+                if cold:
+                    crypto_util._cert_info_cache.clear()  # pylint: disable=protected-access
+                check()
+    return inspect
+
+
+def _parse_calls(inspect):
+    """Count the certificate parse calls made by inspect."""
+    with mock.patch('certbot.crypto_util.crypto.load_certificate',
+                    wraps=crypto_util.crypto.load_certificate) as pyopenssl:
+        with mock.patch('certbot.crypto_util.x509.load_pem_x509_certificate',
+                        wraps=crypto_util.x509.load_pem_x509_certificate) as cryptography:
+            inspect()
+    return pyopenssl.call_count + cryptography.call_count
+
+
+def main(iterations=100, *directories):
+    """Print the parse calls and time per lineage, cold and warm."""
+    lineages = [_lineage(directory) for directory in directories or [SAMPLE_ARCHIVE]]
+    for name, cold in (('cold', True), ('warm', False)):
+        inspect = _inspect(lineages, cold)
+        calls = _parse_calls(inspect) / float(len(lineages))
+        elapsed = timeit.timeit(inspect, number=iterations) / (iterations * len(lineages))
+        print('{0:<6}{1:8.1f} parses/lineage{2:10.3f} ms/lineage'.format(
+            name, calls, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main(*([int(sys.argv[1])] + sys.argv[2:] if len(sys.argv) > 1 else []))
@@ -0,0 +1,60 @@
+"""Micro-benchmark of the client side CPU cost of issuance per key type.
+
+For each key type supported by `certbot.crypto_util.make_key`, measures
+generating a private key and signing a CSR with it, which is what Certbot
+does for every certificate it obtains or renews, as well as a single
+signature, which is what a TLS server does for every full handshake. Run
+it with::
+
+  python tests/benchmarks/key_types.py [iterations]
+
+"""
+import sys
+import timeit
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+
+from acme import crypto_util as acme_crypto_util
+from certbot import crypto_util
+
+DOMAINS = ['example.com', 'www.example.com']
+
+CASES = [
+    ('RSA 2048', (2048, 'rsa', None)),
+    ('RSA 3072', (3072, 'rsa', None)),
+    ('RSA 4096', (4096, 'rsa', None)),
+    ('ECDSA secp256r1', (2048, 'ecdsa', 'secp256r1')),
+    ('ECDSA secp384r1', (2048, 'ecdsa', 'secp384r1')),
+]
+
+
+def _issue(args):
+    """Time generating a key and a CSR signed with it."""
+    def issue():  # pylint: disable=missing-docstring
+        key_pem = crypto_util.make_key(*args)
+        acme_crypto_util.make_csr(key_pem, DOMAINS)
+    return issue
+
+
+def _sign(args):
+    """Time a signature with a key, as made during a TLS handshake."""
+    key = serialization.load_pem_private_key(
+        crypto_util.make_key(*args), password=None, backend=default_backend())
+    if isinstance(key, rsa.RSAPrivateKey):
+        return lambda: key.sign(b'handshake', padding.PKCS1v15(), hashes.SHA256())
+    return lambda: key.sign(b'handshake', ec.ECDSA(hashes.SHA256()))
+
+
+def main(iterations=10):
+    """Print the time per call of each case."""
+    for name, args in CASES:
+        issue = timeit.timeit(_issue(args), number=iterations) / iterations
+        sign = timeit.timeit(_sign(args), number=iterations * 10) / (iterations * 10)
+        print('{0:<18}{1:10.1f} ms/issuance{2:10.3f} ms/signature'.format(
+            name, issue * 1e3, sign * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,58 @@
+"""Micro-benchmark of the nginx configuration parsers.
+
+Parses a generated configuration with many server blocks with the
+pyparsing grammar, `certbot_nginx.nginxparser.RawNginxParser`, and with
+the hand-written `certbot_nginx.nginxparser.FastNginxParser` used by
+`certbot_nginx.nginxparser.loads`, checks that both produce the same
+tree and prints the time each takes. Run it with::
+
+  python tests/benchmarks/nginx_parser.py [server_blocks] [iterations]
+
+"""
+import sys
+import timeit
+
+from certbot_nginx import nginxparser
+
+SERVER_BLOCK = """
+# virtual host {i}
+server {{
+    listen 80;
+    listen [::]:443 ssl http2;
+    server_name site{i}.example.com www.site{i}.example.com;
+    root /var/www/site{i};
+    ssl_certificate /etc/letsencrypt/live/site{i}/fullchain.pem; # managed
+    add_header Strict-Transport-Security "max-age=31536000" always;
+
+    location / {{
+        try_files $uri $uri/ /index.php?$args;
+    }}
+    location ~ \\.php$ {{
+        fastcgi_pass unix:/run/php/php-fpm.sock;
+        if ($request_method = 'OPTIONS') {{
+            return 204;
+        }}
+    }}
+}}
+"""
+
+
+def generate(server_blocks):
+    """Generate a configuration with server_blocks virtual hosts."""
+    return "".join(SERVER_BLOCK.format(i=i) for i in range(server_blocks))
+
+
+def main(server_blocks=1000, iterations=3):
+    """Print the time taken by each parser."""
+    source = generate(server_blocks)
+    expected = nginxparser.RawNginxParser(source).as_list()
+    assert nginxparser.FastNginxParser(source).as_list() == expected
+    print('{0} server blocks, {1} KiB'.format(server_blocks, len(source) // 1024))
+    for parser in (nginxparser.RawNginxParser, nginxparser.FastNginxParser):
+        elapsed = timeit.timeit(lambda: parser(source).as_list(),  # pylint: disable=cell-var-from-loop
+                                number=iterations) / iterations
+        print('{0:<18}{1:10.1f} ms'.format(parser.__name__, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
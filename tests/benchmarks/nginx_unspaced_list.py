@@ -0,0 +1,90 @@
+"""Micro-benchmark of nginx parse tree operations.
+
+Builds the `certbot_nginx.nginxparser.UnspacedList` tree of the
+configuration generated by nginx_parser.py, then times the operations the
+Nginx plugin performs on it: copying the tree, checking whether it was
+modified, adding, replacing and removing directives in every server block
+and at the end of the large top level block, and dumping the tree. It
+also times modifications in the middle of a large block whose directives
+are separated by newline entries, like the ones Certbot inserts after
+its comments. Run it with::
+
+  python tests/benchmarks/nginx_unspaced_list.py [server_blocks] [directives]
+
+"""
+import copy
+import sys
+import time
+
+from certbot_nginx import nginxparser
+
+import nginx_parser
+
+
+def _servers(tree):
+    """Get the directives of every server block of the tree."""
+    return [entry[1] for entry in tree if entry and entry[0] == ['server']]
+
+
+def _modify(tree):
+    """Modify every server block like deploying a certificate does."""
+    for server in _servers(tree):
+        server.insert(0, nginxparser.UnspacedList(['\n    ', 'listen', ' ', '443', ' ', 'ssl']))
+        server.append(nginxparser.UnspacedList(['\n    ', 'ssl_certificate', ' ', 'cert.pem']))
+        server.append(nginxparser.UnspacedList(['\n    ', 'ssl_certificate_key', ' ', 'key.pem']))
+        server[2] = nginxparser.UnspacedList(['\n    ', 'root', ' ', '/srv/www'])
+        del server[len(server) - 1]
+
+
+def _modify_top(tree, directives=500):
+    """Add directives at the end of the top level block."""
+    for i in range(directives):
+        tree.insert(len(tree) - 1, nginxparser.UnspacedList(
+            ['\n', 'include', ' ', 'extra{0}.conf'.format(i)]))
+
+
+def _managed_block(directives):
+    """Build a block of directives each followed by a newline entry."""
+    entries = []  # type: list
+    for i in range(directives):
+        entries.extend((['\n    ', 'add_header', ' ', 'X-Header-{0}'.format(i), ' ', 'on'], '\n'))
+    return nginxparser.UnspacedList(entries)
+
+
+def _modify_middle(block, directives=500):
+    """Add, replace and remove directives in the middle of the block."""
+    for i in range(directives):
+        middle = len(block) // 2
+        block.insert(middle, nginxparser.UnspacedList(
+            ['\n    ', 'include', ' ', 'extra{0}.conf'.format(i)]))
+        block.insert(middle + 1, '\n')
+        block[middle + 1] = nginxparser.UnspacedList(['\n    ', 'root', ' ', '/srv/www'])
+        del block[middle + 2]
+
+
+def _time(name, func):
+    """Print the time taken by func and return its result."""
+    start = time.time()
+    result = func()
+    print('{0:<12}{1:10.1f} ms'.format(name, (time.time() - start) * 1e3))
+    return result
+
+
+def main(server_blocks=2000, directives=20000):
+    """Print the time taken by each operation."""
+    source = nginx_parser.generate(server_blocks)
+    raw = nginxparser.FastNginxParser(source).as_list()
+    print('{0} server blocks, {1} KiB'.format(server_blocks, len(source) // 1024))
+    tree = _time('construct', lambda: nginxparser.UnspacedList(raw))
+    _time('deepcopy', lambda: copy.deepcopy(tree))
+    _time('is_dirty', tree.is_dirty)
+    _time('modify', lambda: _modify(tree))
+    _time('modify top', lambda: _modify_top(tree))
+    _time('dumps', lambda: nginxparser.dumps(tree))
+    block = _managed_block(directives)
+    print('{0} directives separated by newlines'.format(directives))
+    _time('modify mid', lambda: _modify_middle(block))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])